@@ -4,9 +4,10 @@ sys.stderr.flush()
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django import forms
+from django.conf import settings
 from django.forms import BaseInlineFormSet
 from django.utils.html import format_html
-from .models import User, Manager, Store, Category, ActionLog, PageView, WorkingHours
+from .models import User, Manager, Store, Category, ActionLog, PageView, WorkingHours, StaffIP
 
 from django.db.models import Count, Avg
 from django.utils import timezone
@@ -172,7 +173,7 @@ class StoreAdmin(admin.ModelAdmin):
 
     # Остальные методы остаются без изменений...
     def is_open_now_display(self, obj):
-        """Отображает статус магазина прямо в списке"""
+        """Отображает статус магазина прямо в списке (по интервалам, без запросов)"""
         if obj.is_open_now():
             return format_html('<span style="color: green; font-weight: bold;">✅ Открыт</span>')
         return format_html('<span style="color: red; font-weight: bold;">❌ Закрыт</span>')
@@ -182,7 +183,8 @@ class StoreAdmin(admin.ModelAdmin):
     def working_hours_preview(self, obj):
         """Предпросмотр режима работы"""
         if obj.pk:  # Проверяем, что магазин сохранен в БД
-            hours = obj.working_hours.all().order_by('day_of_week')
+            # Без order_by, чтобы использовать prefetch_related из get_queryset
+            hours = obj.working_hours.all()
             if not hours:
                 return "Режим работы не установлен"
 
@@ -334,7 +336,7 @@ class PageViewAdmin(admin.ModelAdmin):
     change_list_template = "admin/analytics/pageview/change_list.html"
 
     def is_manager_visit(self, obj):
-        """Показывает, является ли посещение от менеджера"""
+        """Показывает, является ли посещение от менеджера (реестр IP кэширован в памяти)"""
         manager_ips = PageView.get_manager_ips()
         if obj.ip_address in manager_ips:
             return "✅ Менеджер"
@@ -351,29 +353,43 @@ class PageViewAdmin(admin.ModelAdmin):
         # Статистика за последние 30 дней
         visitor_stats = PageView.get_unique_visitors_stats(days=30)
 
-        # Дополнительная статистика
-        total_visits = PageView.objects.count()
-        manager_ips = PageView.get_manager_ips()
-        manager_visits = PageView.objects.filter(ip_address__in=manager_ips).count()
-        client_visits = total_visits - manager_visits
+        # Дополнительная статистика (из суточных агрегатов)
+        totals = PageView.get_visits_totals()
 
         extra_context.update({
             'title': "Статистика посещений",
             'today_visitors': today_visitors,
             'visitor_stats': visitor_stats,
-            'total_visits': total_visits,
-            'manager_visits': manager_visits,
-            'client_visits': client_visits,
+            'total_visits': totals['total_visits'],
+            'manager_visits': totals['manager_visits'],
+            'client_visits': totals['client_visits'],
             'total_days': len(visitor_stats),
         })
 
+        # Приблизительные уникальные по скетчам HyperLogLog (settings.ANALYTICS_APPROXIMATE_UNIQUES)
+        if settings.ANALYTICS_APPROXIMATE_UNIQUES:
+            period = PageView.get_period_unique_visitors(days=30)
+            extra_context.update({
+                'approximate_uniques': True,
+                'period_visitors': period['unique_visitors'],
+                'uniques_error_percent': round(period['relative_error'] * 100, 1),
+            })
+
         return super().changelist_view(request, extra_context=extra_context)
 
 
+class StaffIPAdmin(admin.ModelAdmin):
+    """Реестр IP менеджеров (визиты с них не считаются клиентскими)"""
+    list_display = ('ip_address', 'first_seen')
+    search_fields = ('ip_address',)
+    readonly_fields = ('first_seen',)
+
+
 # Регистрируем все модели ЕДИНООБРАЗНО через admin.site.register()
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Store, StoreAdmin)
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(ActionLog, ActionLogAdmin)
 admin.site.register(PageView, PageViewAdmin)
+admin.site.register(StaffIP, StaffIPAdmin)
 admin.site.register(WorkingHours, WorkingHoursAdmin)
\ No newline at end of file
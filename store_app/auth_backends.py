@@ -1,8 +1,34 @@
+import hashlib
+import logging
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
 
 UserModel = get_user_model()
 
+logger = logging.getLogger(__name__)
+
+# Логины и email, по которым никто не найден, запоминаются в общем кэше, чтобы повторные
+# попытки (перебор, опечатки при массовом входе) не ходили в БД. Отметку снимает сигнал
+# сохранения пользователя (store_app/signals.py)
+UNKNOWN_KEY_PREFIX = 'auth:unknown:'
+
+
+def _unknown_key(identifier):
+    # В ключе хэш: логины и email не лежат в кэше открытым текстом
+    return UNKNOWN_KEY_PREFIX + hashlib.sha256(identifier.encode()).hexdigest()
+
+
+def forget_unknown_identifiers(*identifiers):
+    """Снимает отметку «не найден» с логинов и email"""
+    keys = [_unknown_key(identifier) for identifier in identifiers if identifier]
+    if keys:
+        cache.delete_many(keys)
+
+
 class RoleBasedAuthBackend(ModelBackend):
     """
     Кастомный бэкенд аутентификации, который различает способы входа для разных ролей:
@@ -11,54 +37,46 @@ class RoleBasedAuthBackend(ModelBackend):
 
     Для MANAGER/ADMIN - проверяет username и пароль
     Если пользователь не найден или пароль неверный, возвращает None
+
+    Кандидаты по username и по email выбираются одним запросом по индексам.
     """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
-            print("Аутентификация: username или password отсутствуют")
+            logger.debug("Аутентификация: не передан логин или пароль", extra={'outcome': 'missing_credentials'})
+            return None
+
+        ttl = getattr(settings, 'AUTH_UNKNOWN_IDENTIFIER_TTL', 300)
+        key = _unknown_key(username)
+        if ttl and cache.get(key):
+            logger.debug("Аутентификация %s: не найден (кэш)", username,
+                         extra={'identifier': username, 'outcome': 'unknown_cached'})
             return None
 
-        print(f"Попытка аутентификации: username={username}, password={password}")
-
-        try:
-            # Пытаемся найти по username (для MANAGER / ADMIN) - ПЕРВЫМ!
-            user = UserModel.objects.get(username=username)
-            print(f"Найден пользователь по username: {user.username}, роль: {user.role}")
-
-            if user.role != UserModel.Role.CUSTOMER:
-                print("Пользователь не CUSTOMER - проверяем пароль")
-                if user.check_password(password):
-                    print("Пароль верный! Аутентификация успешна")
-                    return user
-                else:
-                    print("Пароль неверный!")
-            else:
-                print("Пользователь CUSTOMER - пропускаем поиск по username")
-
-        except UserModel.DoesNotExist:
-            print(f"Пользователь с username '{username}' не найден")
-
-        try:
-            # Пытаемся найти по email (для CUSTOMERS) - только если email не пустой
-            if username and '@' in username:  # проверяем, что это похоже на email
-                print(f"Пытаемся найти по email: {username}")
-                user = UserModel.objects.get(email=username)
-                print(f"Найден пользователь по email: {user.username}, роль: {user.role}")
-
-                if user.role == UserModel.Role.CUSTOMER:
-                    print("Пользователь CUSTOMER - проверяем пароль")
-                    if user.check_password(password):
-                        print("Пароль верный! Аутентификация успешна")
-                        return user
-                    else:
-                        print("Пароль неверный!")
-                else:
-                    print("Пользователь не CUSTOMER - пропускаем поиск по email")
-            else:
-                print("Username не похож на email - пропускаем поиск по email")
-
-        except UserModel.DoesNotExist:
-            print(f"Пользователь с email '{username}' не найден")
-
-        print("Аутентификация не удалась")
+        lookup = Q(username=username)
+        if '@' in username:  # похоже на email
+            lookup |= Q(email=username, role=UserModel.Role.CUSTOMER)
+        users = list(UserModel.objects.filter(lookup))
+        # MANAGER / ADMIN входят по username, CUSTOMER - по email; совпадение по username - первым
+        candidates = [user for user in users
+                      if user.username == username and user.role != UserModel.Role.CUSTOMER]
+        candidates += [user for user in users
+                       if user.email == username and user.role == UserModel.Role.CUSTOMER]
+
+        if not candidates:
+            if ttl:
+                cache.set(key, True, ttl)
+            logger.debug("Аутентификация %s: не найден", username,
+                         extra={'identifier': username, 'outcome': 'unknown'})
+            return None
+
+        for user in candidates:
+            if user.check_password(password):
+                logger.debug("Аутентификация %s: успешно", username,
+                             extra={'identifier': username, 'outcome': 'success',
+                                    'user_id': user.pk, 'role': user.role})
+                return user
+
+        logger.debug("Аутентификация %s: неверный пароль", username,
+                     extra={'identifier': username, 'outcome': 'wrong_password'})
         return None
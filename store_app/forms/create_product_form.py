@@ -1,6 +1,7 @@
 # В файле forms.py
 from django import forms
 from ..models import Product, Category, Store
+from ..services import reference_data
 
 
 class CreateProductForm(forms.ModelForm):
@@ -36,6 +37,10 @@ class CreateProductForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['category'].empty_label = "Выберите категорию"
         self.fields['store'].empty_label = "Выберите магазин"
+        # Варианты списков - из кэша справочников, без запроса к БД при выводе формы
+        # (проверка выбранного значения по-прежнему идёт через queryset поля)
+        self.fields['category'].choices = [('', "Выберите категорию")] + reference_data.category_choices()
+        self.fields['store'].choices = [('', "Выберите магазин")] + reference_data.store_choices()
 
         # Убедимся, что поле price имеет правильные атрибуты
         self.fields['price'].widget.attrs.update({
@@ -0,0 +1,37 @@
+# Формы импорта товаров из файла
+import os
+
+from django import forms
+
+from ..models import Product
+from .create_product_form import CreateProductForm
+
+IMPORT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+class ProductImportForm(forms.Form):
+    """Загрузка файла импорта товаров"""
+    file = forms.FileField(label='Файл CSV или XLSX')
+
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if os.path.splitext(uploaded.name)[1].lower() not in IMPORT_EXTENSIONS:
+            raise forms.ValidationError('Поддерживаются файлы CSV и XLSX')
+        return uploaded
+
+
+class ProductImportRowForm(forms.ModelForm):
+    """
+    Проверка одной строки импорта по правилам CreateProductForm.
+    Категория и филиал сопоставляются по справочникам в памяти, а совпадение
+    (название, филиал) с существующим товаром означает обновление, поэтому
+    ни запросов к БД, ни проверки уникальности на строку нет.
+    """
+    external_url = CreateProductForm.base_fields['external_url']
+
+    class Meta:
+        model = Product
+        fields = ['name', 'description', 'price', 'available', 'external_url']
+
+    def validate_unique(self):
+        pass
@@ -0,0 +1,89 @@
+import os
+import time
+import uuid
+from contextlib import redirect_stdout
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.module_loading import import_string
+
+from store_app.auth_backends import forget_unknown_identifiers
+
+UserModel = get_user_model()
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Замеряет, сколько входов в секунду выдерживает бэкенд аутентификации.
+
+    Создаёт временных менеджера и покупателя в транзакции, которая затем откатывается, и
+    вызывает authenticate() по сценариям: менеджер по логину, покупатель по email,
+    неверный пароль, неизвестный логин. По умолчанию пароли хэшируются MD5, чтобы замер
+    показывал затраты самого бэкенда (запросы, вывод), а не PBKDF2.
+    Сравнение реализаций: --backend путь.к.Бэкенду
+    """
+    help = 'Замеряет число входов в секунду для бэкенда аутентификации'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Входов на сценарий')
+        parser.add_argument('--backend', default='store_app.auth_backends.RoleBasedAuthBackend',
+                            help='Класс бэкенда аутентификации')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Хэшировать пароли хэшером из настроек')
+
+    def handle(self, *args, **options):
+        backend = import_string(options['backend'])()
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        self.stdout.write(f"Бэкенд: {options['backend']}, входов на сценарий: {options['iterations']}")
+
+        with override_settings(**hashers):
+            try:
+                with transaction.atomic():
+                    self._run(backend, options['iterations'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, backend, iterations):
+        suffix = uuid.uuid4().hex[:8]
+        password = 'benchmark-password'
+        manager = UserModel.objects.create(username=f'bench_manager_{suffix}', role=UserModel.Role.MANAGER,
+                                           first_name='Тест', last_name='Тест')
+        customer = UserModel.objects.create(username=f'bench_customer_{suffix}', email=f'bench_{suffix}@example.com',
+                                            role=UserModel.Role.CUSTOMER, first_name='Тест', last_name='Тест')
+        # update() в обход User.save, который перехэшировал бы пароль не в формате PBKDF2
+        UserModel.objects.filter(pk__in=[manager.pk, customer.pk]).update(password=make_password(password))
+        unknown = f'bench_unknown_{suffix}@example.com'
+
+        scenarios = [
+            ('Менеджер по логину', manager.username, password),
+            ('Покупатель по email', customer.email, password),
+            ('Неверный пароль', manager.username, 'wrong-password'),
+            ('Неизвестный логин', unknown, password),
+        ]
+        # Вывод бэкенда (print) уходит в /dev/null: его стоимость учитывается, экран не засоряется
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            results = [self._measure(backend, identifier, secret, iterations)
+                       for _, identifier, secret in scenarios]
+        forget_unknown_identifiers(unknown)
+
+        for (name, _, _), (rate, queries) in zip(scenarios, results):
+            self.stdout.write(f"{name}: {rate:,.0f} входов/с, запросов на вход: {queries}")
+
+    def _measure(self, backend, identifier, password, iterations):
+        backend.authenticate(None, username=identifier, password=password)  # прогрев
+        with CaptureQueriesContext(connection) as queries:
+            backend.authenticate(None, username=identifier, password=password)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            backend.authenticate(None, username=identifier, password=password)
+        return iterations / (time.perf_counter() - started), len(queries)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from store_app.services import media_blobs
+
+
+class Command(BaseCommand):
+    """
+    Удаляет файлы изображений товаров, на которые не ссылается ни один товар,
+    вместе с их уменьшенными копиями.
+
+    Файл становится мусором, когда удалён или сменил изображение последний ссылавшийся
+    на него товар; удаляется он не раньше чем через MEDIA_GC_GRACE_SECONDS.
+    Запускать по расписанию, например раз в сутки.
+    """
+    help = 'Удаляет файлы изображений без ссылок из товаров: python manage.py collect_media --recount --orphans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None,
+                            help='Сколько секунд файл должен пробыть без ссылок (по умолчанию MEDIA_GC_GRACE_SECONDS)')
+        parser.add_argument('--recount', action='store_true',
+                            help='Сначала пересчитать ссылки по таблице товаров')
+        parser.add_argument('--orphans', action='store_true',
+                            help='Учесть файлы в хранилище, о которых нет записей')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"Исправлено счётчиков ссылок: {media_blobs.recount()}")
+        if options['orphans']:
+            self.stdout.write(f"Найдено файлов без учёта: {media_blobs.register_orphans()}")
+        collected, derivatives = media_blobs.collect_garbage(options['grace'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Удалено файлов изображений: {collected}, уменьшенных копий: {derivatives}"
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from store_app.services.pageview_partitions import (
+    compact_expired, ensure_partitions, is_partitioned, retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    """
+    Обслуживание хранилища просмотров (запускать по cron, например раз в сутки):
+    - заранее создаёт месячные секции PageView (PostgreSQL);
+    - сворачивает месяцы старше горизонта хранения в суточные агрегаты
+      и удаляет их сырые просмотры (на PostgreSQL - DROP секции целиком).
+    """
+    help = 'Создаёт секции PageView и сворачивает просмотры старше горизонта хранения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int,
+                            help='Сколько месяцев хранить сырые просмотры '
+                                 '(по умолчанию settings.ANALYTICS_PAGEVIEW_RETENTION_MONTHS)')
+        parser.add_argument('--months-ahead', type=int, default=2,
+                            help='На сколько месяцев вперёд создавать секции')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, какие месяцы будут свёрнуты')
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(months=options['retention_months'])
+
+        if is_partitioned():
+            if options['dry_run']:
+                self.stdout.write('Секционированная таблица: секции будут созданы при запуске без --dry-run')
+            else:
+                created = ensure_partitions(months_ahead=options['months_ahead'])
+                for name in created:
+                    self.stdout.write(f'Создана секция {name}')
+        else:
+            self.stdout.write('Таблица просмотров не секционирована, старые строки будут удаляться запросом')
+
+        months = compact_expired(retention_cutoff_day=cutoff, dry_run=options['dry_run'])
+        if not months:
+            self.stdout.write(f'Нет просмотров старше {cutoff:%d.%m.%Y}')
+            return
+
+        action = 'Будут свёрнуты' if options['dry_run'] else 'Свёрнуты'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} месяцы: {', '.join(month.strftime('%Y-%m') for month in months)}"
+        ))
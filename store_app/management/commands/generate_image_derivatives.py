@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from store_app.models import Product
+from store_app.services.image_derivatives import is_ready, refresh_product_derivatives
+
+
+class Command(BaseCommand):
+    """
+    Создаёт уменьшенные копии изображений товаров (WebP и JPEG нескольких ширин).
+
+    Новые изображения обрабатываются в фоне при сохранении товара; команда нужна
+    для товаров, загруженных раньше, и после изменения IMAGE_DERIVATIVES['WIDTHS'] (--force).
+    """
+    help = 'Создаёт уменьшенные копии изображений товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать описание копий у всех товаров')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').only('id', 'image', 'image_derivatives').order_by('id')
+        done = failed = 0
+        for product in products.iterator():
+            if not options['force'] and is_ready(product):
+                continue
+            if refresh_product_derivatives(product.id, product.image.name):
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Копии изображений созданы: {done}, ошибок: {failed}"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store_app.models import Manager
+from store_app.services.product_import import DEFAULT_BATCH_SIZE, import_products
+
+
+class Command(BaseCommand):
+    """
+    Импортирует товары из CSV или XLSX файла.
+
+    Файл читается потоком, товары сохраняются пачками; совпадение (название, филиал)
+    обновляет существующий товар. Колонки: name, category, store (id или "Город, адрес")
+    либо city и address, price, description, available, external_url - подходят и
+    заголовки выгрузки из панели менеджера.
+    """
+    help = 'Импортирует товары из CSV/XLSX: python manage.py import_products products.csv --manager 1'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу CSV или XLSX')
+        parser.add_argument('--manager', type=int, required=True, help='ID менеджера - создателя новых товаров')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Товаров в одной пачке')
+
+    def handle(self, *args, **options):
+        try:
+            manager = Manager.objects.get(pk=options['manager'])
+        except Manager.DoesNotExist:
+            raise CommandError(f"Менеджер {options['manager']} не найден")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_products(file, options['path'], manager, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Не удалось открыть файл: {e}")
+
+        for line, message in report.errors:
+            self.stderr.write(f"Строка {line}: {message}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... и ещё ошибок: {report.error_count - len(report.errors)}")
+        style = self.style.SUCCESS if not report.error_count else self.style.WARNING
+        self.stdout.write(style(report.summary()))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store_app.services.favorites import recount_favorite_counters
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает счётчики избранного (Customer.favorite_count, Product.favorites_count)
+    по таблице FavoriteProduct.
+
+    Счётчики поддерживаются при каждом переключении избранного; команда нужна после
+    ручных правок таблицы избранного или массовых операций в обход services.favorites.
+    """
+    help = 'Пересчитывает счётчики избранного у покупателей и товаров'
+
+    def handle(self, *args, **options):
+        customers, products = recount_favorite_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Счётчики избранного пересчитаны: покупателей {customers}, товаров {products}"
+        ))
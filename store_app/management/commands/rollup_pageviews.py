@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from store_app.models import PageView
+from store_app.services.visitor_rollups import refresh_range
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает суточные агрегаты посещений (PageViewDailyRollup).
+
+    По умолчанию - за вчера и сегодня (для cron). Для первичного заполнения
+    используйте --all или --since.
+    """
+    help = 'Пересчитывает суточную статистику посещений из PageView'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1,
+                            help='Сколько прошедших дней пересчитать помимо сегодняшнего')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Пересчитать начиная с даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--all', action='store_true',
+                            help='Пересчитать всю историю просмотров')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+
+        if options['all']:
+            first = PageView.objects.aggregate(first=Min('timestamp'))['first']
+            if first is None:
+                self.stdout.write('Просмотров нет, пересчитывать нечего')
+                return
+            start_day = first.date()
+        elif options['since']:
+            start_day = options['since']
+        else:
+            if options['days'] < 0:
+                raise CommandError('--days не может быть отрицательным')
+            start_day = today - timedelta(days=options['days'])
+
+        if start_day > today:
+            raise CommandError('Начальная дата в будущем')
+
+        written = refresh_range(start_day, today)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано дней: {(today - start_day).days + 1}, строк агрегатов: {written}'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:28
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0007_workinghours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='description',
+            field=models.TextField(blank=True, verbose_name='Описание'),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Активный'),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='phone',
+            field=models.CharField(blank=True, max_length=20, null=True, validators=[django.core.validators.RegexValidator(message='Номер телефона должен содержать только цифры, пробелы и знак +', regex='^\\+?[0-9\\s-]+$')], verbose_name='Телефон'),
+        ),
+        migrations.CreateModel(
+            name='PageViewDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('url', models.CharField(blank=True, max_length=500, verbose_name='URL страницы')),
+                ('visitor_class', models.CharField(choices=[('CLIENT', 'Клиент'), ('MANAGER', 'Менеджер')], max_length=10, verbose_name='Тип посетителя')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотров')),
+                ('unique_visitors', models.PositiveIntegerField(default=0, verbose_name='Уникальных посетителей')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Суточная статистика посещений',
+                'verbose_name_plural': 'Суточная статистика посещений',
+                'ordering': ['-date', 'url'],
+                'indexes': [models.Index(fields=['url', 'visitor_class', 'date'], name='store_app_p_url_6d11a4_idx')],
+                'unique_together': {('date', 'url', 'visitor_class')},
+            },
+        ),
+    ]
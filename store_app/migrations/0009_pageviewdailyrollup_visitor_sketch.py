@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0008_store_description_store_is_active_store_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageviewdailyrollup',
+            name='visitor_sketch',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Скетч HyperLogLog по сессиям'),
+        ),
+    ]
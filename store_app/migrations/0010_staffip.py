@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_staff_ips(apps, schema_editor):
+    """Заполняет реестр IP менеджеров из уже накопленных просмотров (однократный проход)"""
+    PageView = apps.get_model('store_app', 'PageView')
+    StaffIP = apps.get_model('store_app', 'StaffIP')
+
+    ips = PageView.objects.filter(
+        user__role__in=['MANAGER', 'ADMIN']
+    ).values_list('ip_address', flat=True).distinct()
+    StaffIP.objects.bulk_create(
+        [StaffIP(ip_address=ip) for ip in ips],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0009_pageviewdailyrollup_visitor_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffIP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(unique=True, verbose_name='IP адрес')),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Впервые замечен')),
+            ],
+            options={
+                'verbose_name': 'IP менеджера',
+                'verbose_name_plural': 'IP менеджеров',
+                'ordering': ['ip_address'],
+            },
+        ),
+        migrations.RunPython(fill_staff_ips, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Перевод store_app_pageview в секционированную по месяцам таблицу (только PostgreSQL).
+# На других СУБД миграция ничего не делает - таблица остаётся обычной.
+
+from datetime import date, datetime
+
+from django.db import migrations
+
+TABLE = 'store_app_pageview'
+OLD_TABLE = 'store_app_pageview_unpartitioned'
+SEQUENCE = 'store_app_pageview_partitioned_id_seq'
+MONTHS_AHEAD = 2
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_pageview(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        # Запоминаем определения индексов (кроме первичного ключа), чтобы
+        # пересоздать их на новой таблице с теми же именами
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        indexes = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"')
+        for name in [f'{TABLE}_pkey'] + [name for name, _ in indexes]:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_old"')
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [OLD_TABLE],
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE "{OLD_TABLE}" DROP CONSTRAINT "{constraint}"')
+
+        # Первичный ключ секционированной таблицы обязан включать ключ секционирования
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{OLD_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id", "timestamp")')
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}"."id"')
+        cursor.execute(
+            f"SELECT setval('\"{SEQUENCE}\"', COALESCE((SELECT MAX(id) FROM \"{OLD_TABLE}\"), 0) + 1, false)"
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{SEQUENCE}"\')')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_user_id_fk_store_app_user_id" '
+            f'FOREIGN KEY ("user_id") REFERENCES "store_app_user" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        # Секции: от самого старого месяца с данными до текущего + запас, и DEFAULT для остального
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{OLD_TABLE}"')
+        oldest = cursor.fetchone()[0]
+        today = date.today()
+        month = date((oldest or datetime.now()).year, (oldest or datetime.now()).month, 1)
+        last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month.year}{month.month:02d}" PARTITION OF "{TABLE}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, _add_months(month, 1)],
+            )
+            month = _add_months(month, 1)
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(
+            f'INSERT INTO "{TABLE}" (id, session_key, url, referer, ip_address, user_agent, '
+            f'"timestamp", duration, user_id) '
+            f'SELECT id, session_key, url, referer, ip_address, user_agent, "timestamp", duration, user_id '
+            f'FROM "{OLD_TABLE}"'
+        )
+        cursor.execute(f'DROP TABLE "{OLD_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0010_staffip'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_pageview, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Взвешенный tsvector товара для полнотекстового поиска.
+# GIN-индекс и первичное заполнение - только на PostgreSQL; на других СУБД поле
+# остаётся пустым, а поиск идёт по индексу в памяти (services.product_search).
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX = 'store_app_product_search_vector_gin'
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{INDEX}" ON "store_app_product" USING gin ("search_vector")'
+        )
+        cursor.execute(
+            """
+            UPDATE store_app_product AS product SET search_vector =
+                setweight(to_tsvector('russian', COALESCE(product.name, '')), 'A')
+                || setweight(to_tsvector('russian', COALESCE(category.name, '')), 'B')
+                || setweight(to_tsvector('russian', COALESCE(product.description, '')), 'C')
+            FROM store_app_category AS category
+            WHERE category.id = product.category_id
+            """
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS "{INDEX}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0011_partition_pageview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, drop_search_index),
+    ]
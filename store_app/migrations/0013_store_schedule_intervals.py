@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:53
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def fill_schedule_intervals(apps, schema_editor):
+    """Собирает интервалы работы филиалов из существующих WorkingHours"""
+    Store = apps.get_model('store_app', 'Store')
+    WorkingHours = apps.get_model('store_app', 'WorkingHours')
+
+    intervals = defaultdict(list)
+    for hours in WorkingHours.objects.filter(is_closed=False):
+        if not hours.opening_time or not hours.closing_time:
+            continue
+        day_start = hours.day_of_week * 86400
+        intervals[hours.store_id].append([day_start + _seconds(hours.opening_time),
+                                          day_start + _seconds(hours.closing_time)])
+
+    stores = list(Store.objects.filter(pk__in=intervals))
+    for store in stores:
+        store.schedule_intervals = sorted(intervals[store.pk])
+    Store.objects.bulk_update(stores, ['schedule_intervals'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0012_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='schedule_intervals',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Интервалы работы'),
+        ),
+        migrations.RunPython(fill_schedule_intervals, migrations.RunPython.noop),
+    ]
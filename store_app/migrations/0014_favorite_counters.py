@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(FavoriteProduct, field):
+    counts = (FavoriteProduct.objects.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(count=Count('id')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def fill_favorite_counters(apps, schema_editor):
+    """Заполняет счётчики по существующему избранному"""
+    FavoriteProduct = apps.get_model('store_app', 'FavoriteProduct')
+    apps.get_model('store_app', 'Customer').objects.update(favorite_count=_count(FavoriteProduct, 'user'))
+    apps.get_model('store_app', 'Product').objects.update(favorites_count=_count(FavoriteProduct, 'product'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0013_store_schedule_intervals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Товаров в избранном'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном у покупателей'),
+        ),
+        migrations.RunPython(fill_favorite_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0014_favorite_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='actionlog',
+            name='action_type',
+            field=models.CharField(choices=[('CREATE', 'Создание товара'), ('EDIT', 'Редактирование товара'), ('DELETE', 'Удаление товара'), ('DEACTIVATE', 'Снятие с продажи'), ('ACTIVATE', 'Возврат в продажу'), ('PRICE', 'Изменение цены')], max_length=20, verbose_name='Тип действия'),
+        ),
+    ]
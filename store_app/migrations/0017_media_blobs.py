@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:29
+
+import store_app.services.content_storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_media_blobs(apps, schema_editor):
+    """Заводит учёт ссылок для уже загруженных изображений товаров"""
+    Product = apps.get_model('store_app', 'Product')
+    MediaBlob = apps.get_model('store_app', 'MediaBlob')
+    counts = (Product.objects.exclude(image='').exclude(image__isnull=True)
+              .order_by().values('image').annotate(count=Count('id')))
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=row['image'], refcount=row['count']) for row in counts.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_app', '0016_product_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=store_app.services.content_storage.product_image_storage, upload_to='products/', verbose_name='Изображение товара'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменён')),
+            ],
+            options={
+                'verbose_name': 'Файл изображения',
+                'verbose_name_plural': 'Файлы изображений',
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='store_app_m_refcoun_95f316_idx')],
+            },
+        ),
+        migrations.RunPython(fill_media_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('store_app', '0017_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='store_app_u_email_942e2d_idx'),
+        ),
+    ]
@@ -1,14 +1,15 @@
 # pytest tests/test_models/test_product_models.py -v
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator, MinValueValidator
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.utils.text import slugify
 from enum import Enum
-import os
 from django.conf import settings
 
+from store_app.services.content_storage import product_image_storage
+
 
 phone_validator = RegexValidator(
     regex=r'^\+?[0-9\s-]+$',
@@ -101,6 +102,16 @@ class Store(models.Model):  # Филиалы
         blank=True
     )
 
+    # Недельное расписание в компактном виде: отсортированные интервалы [начало, конец]
+    # в секундах от начала недели (понедельник 00:00). Пересобирается из WorkingHours
+    # сигналами (services.store_schedule), чтобы "открыт сейчас" не требовал запросов
+    schedule_intervals = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name='Интервалы работы'
+    )
+
     def __str__(self):
         return f"{self.city}, {self.address}"
 
@@ -120,19 +131,10 @@ class Store(models.Model):  # Филиалы
 
         return "\n".join(str(hour) for hour in hours)
 
-    def is_open_now(self):
-        """Проверяет, открыт ли филиал в текущий момент"""
-        now = timezone.now()
-        today = now.weekday()
-        current_time = now.time()
-
-        try:
-            today_hours = self.working_hours.get(day_of_week=today)
-            if today_hours.is_closed:
-                return False
-            return today_hours.opening_time <= current_time <= today_hours.closing_time
-        except WorkingHours.DoesNotExist:
-            return False
+    def is_open_now(self, now=None):
+        """Проверяет, открыт ли филиал в текущий момент (без запросов к БД)"""
+        from store_app.services.store_schedule import is_open_at
+        return is_open_at(self.schedule_intervals, now or timezone.now())
 
 
 class Category(models.Model):
@@ -147,15 +149,12 @@ class Category(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.name)
-            unique_slug = base_slug
-            num = 1
-            while Category.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{num}"
-                num += 1
-            self.slug = unique_slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        from store_app.services.slugs import save_with_unique_slug
+
+        # Свободный слаг подбирается одним запросом, при гонке - повторно
+        save_with_unique_slug(self, lambda: super(Category, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
@@ -272,6 +271,9 @@ class Customer(models.Model):  # Пользователь сайта
         )]
     )
 
+    # Число товаров в избранном; поддерживается services.favorites атомарными UPDATE
+    favorite_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Товаров в избранном")
+
     # Служебные поля
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -359,6 +361,11 @@ class User(AbstractUser):  # Пользователь
             self.manager_profile.last_name = self.last_name
             self.manager_profile.save()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['email']),  # Вход покупателей по email (auth_backends)
+        ]
+
 
 class Product(models.Model):  # Продукт
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
@@ -373,6 +380,7 @@ class Product(models.Model):  # Продукт
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='products')  # филиал
     image = models.ImageField(
         upload_to='products/',
+        storage=product_image_storage,  # файлы по хэшу содержимого, одинаковые не дублируются
         verbose_name='Изображение товара',
         blank=True,
         null=True
@@ -398,25 +406,47 @@ class Product(models.Model):  # Продукт
         db_index=True,
         verbose_name="ЧПУ-ссылка"
     )  # для читаемых ссылок
+    # Взвешенный tsvector для полнотекстового поиска (только PostgreSQL, GIN-индекс
+    # создаётся миграцией 0012). Заполняется services.product_search
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Сколько покупателей добавили товар в избранное (поддерживается services.favorites;
+    # имя favorited_by занято обратной связью FavoriteProduct)
+    favorites_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="В избранном у покупателей")
+    # Уменьшенные копии изображения (services.image_derivatives):
+    # {'source': имя исходного файла, 'hash': хэш содержимого, 'widths': [ширины]}
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.name)[:250]  # Ограничение длины
-            unique_slug = base_slug
-            num = 1
-            while Product.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{num}"
-                num += 1
-            self.slug = unique_slug
-        super().save(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Изображение, сохранённое в БД, - чтобы при замене учесть ссылки на файлы
+        instance._stored_image = instance.__dict__.get('image') or None
+        return instance
 
-    def delete(self, *args, **kwargs):
-        # Удаляем файл изображения если он существует
-        if self.image:  # Проверка, что поле image не пустое
-            if os.path.isfile(self.image.path):  # Проверка, что файл существует
-                os.remove(self.image.path)
-        # Удаляем запись из базы данных
-        super().delete(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        from store_app.services import media_blobs
+        from store_app.services.slugs import save_with_unique_slug
+
+        # Изображение сохраняется, только если оно загружено и входит в update_fields
+        update_fields = kwargs.get('update_fields')
+        saves_image = 'image' not in self.get_deferred_fields() and (update_fields is None or 'image' in update_fields)
+
+        with transaction.atomic():
+            if self.slug:
+                super().save(*args, **kwargs)
+            else:
+                # Свободный слаг подбирается одним запросом, при гонке - повторно
+                save_with_unique_slug(self, lambda: super(Product, self).save(*args, **kwargs))
+
+            if not saves_image:
+                return
+            # Файл изображения удаляется не вместе с товаром, а сборщиком мусора, когда на него
+            # не останется ссылок (services.media_blobs)
+            current = self.image.name or None
+            previous = getattr(self, '_stored_image', None)
+            if current != previous:
+                media_blobs.image_replaced(previous, current)
+            self._stored_image = current
 
     def __str__(self):
         return self.name
@@ -516,6 +546,8 @@ class ActionLog(models.Model):
         ('EDIT', 'Редактирование товара'),
         ('DELETE', 'Удаление товара'),
         ('DEACTIVATE', 'Снятие с продажи'),
+        ('ACTIVATE', 'Возврат в продажу'),
+        ('PRICE', 'Изменение цены'),
     ]
 
     user = models.ForeignKey(
@@ -592,98 +624,160 @@ class PageView(models.Model):
     @classmethod
     def get_unique_visitors_stats(cls, days=30):
         """
-        Статистика уникальных посетителей по дням (исключая менеджеров)
+        Статистика уникальных посетителей по дням (исключая менеджеров по IP).
+        Читается из суточных агрегатов PageViewDailyRollup, а не из сырых просмотров.
         """
-        from django.db.models import Count, Q
         from django.utils import timezone
         from datetime import timedelta
 
-        start_date = timezone.now() - timedelta(days=days)
+        start_date = (timezone.now() - timedelta(days=days)).date()
 
-        stats = cls.objects.filter(
-            timestamp__gte=start_date
-        ).exclude(
-            Q(user__role='MANAGER') | Q(user__role='ADMIN')
-        ).extra(
-            {'date': "DATE(timestamp)"}
-        ).values('date').annotate(
-            unique_visitors=Count('session_key', distinct=True)
-        ).order_by('date')
+        stats = PageViewDailyRollup.objects.filter(
+            date__gte=start_date,
+            url=PageViewDailyRollup.SITE_TOTAL,
+            visitor_class=PageViewDailyRollup.VisitorClass.CLIENT,
+        ).values('date', 'unique_visitors').order_by('date')
 
         return list(stats)
 
     @classmethod
     def get_today_unique_visitors(cls):
         """
-        Количество уникальных посетителей за сегодня
+        Количество уникальных посетителей за сегодня (исключая менеджеров по IP)
         """
-        from django.db.models import Q
         from django.utils import timezone
 
         today = timezone.now().date()
 
-        return cls.objects.filter(
-            timestamp__date=today
-        ).exclude(
-            Q(user__role='MANAGER') | Q(user__role='ADMIN')
-        ).values('session_key').distinct().count()
+        return PageViewDailyRollup.objects.filter(
+            date=today,
+            url=PageViewDailyRollup.SITE_TOTAL,
+            visitor_class=PageViewDailyRollup.VisitorClass.CLIENT,
+        ).values_list('unique_visitors', flat=True).first() or 0
 
     @classmethod
-    def get_unique_visitors_stats(cls, days=30):
+    def get_period_unique_visitors(cls, days=30):
         """
-        Статистика уникальных посетителей по дням (исключая менеджеров по IP)
+        Приблизительное число уникальных посетителей за весь период (исключая менеджеров).
+        Объединяет скетчи HyperLogLog по дням; возвращает оценку и относительную ошибку.
         """
-        from django.db.models import Count, Q
         from django.utils import timezone
         from datetime import timedelta
+        from store_app.services.visitor_rollups import unique_visitors_for_range
 
-        start_date = timezone.now() - timedelta(days=days)
+        today = timezone.now().date()
+        sketch = unique_visitors_for_range(today - timedelta(days=days), today)
+        return {
+            'unique_visitors': sketch.count(),
+            'relative_error': sketch.relative_error,
+        }
 
-        # Получаем IP адреса менеджеров и админов
-        manager_ips = cls.objects.filter(
-            Q(user__role='MANAGER') | Q(user__role='ADMIN')
-        ).values_list('ip_address', flat=True).distinct()
+    @classmethod
+    def get_visits_totals(cls):
+        """Общее число посещений, в том числе менеджеров и клиентов (по агрегатам)"""
+        from django.db.models import Sum
+
+        rows = PageViewDailyRollup.objects.filter(
+            url=PageViewDailyRollup.SITE_TOTAL
+        ).values('visitor_class').annotate(views=Sum('views'))
+        by_class = {row['visitor_class']: row['views'] for row in rows}
+
+        manager_visits = by_class.get(PageViewDailyRollup.VisitorClass.MANAGER, 0)
+        client_visits = by_class.get(PageViewDailyRollup.VisitorClass.CLIENT, 0)
+        return {
+            'total_visits': manager_visits + client_visits,
+            'manager_visits': manager_visits,
+            'client_visits': client_visits,
+        }
 
-        stats = cls.objects.filter(
-            timestamp__gte=start_date
-        ).exclude(
-            ip_address__in=manager_ips  # Исключаем по IP
-        ).extra(
-            {'date': "DATE(timestamp)"}
-        ).values('date').annotate(
-            unique_visitors=Count('session_key', distinct=True)
-        ).order_by('date')
+    @classmethod
+    def get_manager_ips(cls):
+        """Получить множество IP адресов менеджеров и админов (из реестра StaffIP)"""
+        from store_app.services.staff_ips import get_staff_ips
+        return get_staff_ips()
 
-        return list(stats)
+    def __str__(self):
+        return f"{self.url} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
-    @classmethod
-    def get_today_unique_visitors(cls):
-        """
-        Количество уникальных посетителей за сегодня (исключая менеджеров по IP)
-        """
-        from django.db.models import Q
-        from django.utils import timezone
 
-        today = timezone.now().date()
+class StaffIP(models.Model):
+    """
+    IP адреса, с которых заходили менеджеры и админы.
+    Пополняется AnalyticsMiddleware; визиты с этих адресов не считаются клиентскими.
+    """
+    ip_address = models.GenericIPAddressField(unique=True, verbose_name="IP адрес")
+    first_seen = models.DateTimeField(default=timezone.now, verbose_name="Впервые замечен")
 
-        # Получаем IP адреса менеджеров и админов
-        manager_ips = cls.objects.filter(
-            Q(user__role='MANAGER') | Q(user__role='ADMIN')
-        ).values_list('ip_address', flat=True).distinct()
+    class Meta:
+        verbose_name = "IP менеджера"
+        verbose_name_plural = "IP менеджеров"
+        ordering = ['ip_address']
 
-        return cls.objects.filter(
-            timestamp__date=today
-        ).exclude(
-            ip_address__in=manager_ips  # Исключаем по IP
-        ).values('session_key').distinct().count()
+    def __str__(self):
+        return self.ip_address
 
-    @classmethod
-    def get_manager_ips(cls):
-        """Получить список IP адресов менеджеров и админов"""
-        from django.db.models import Q
-        return list(cls.objects.filter(
-            Q(user__role='MANAGER') | Q(user__role='ADMIN')
-        ).values_list('ip_address', flat=True).distinct())
+
+class MediaBlob(models.Model):
+    """
+    Файл изображения в хранилище и число товаров, которые на него ссылаются.
+    Счётчик поддерживается services.media_blobs; файлы без ссылок удаляет
+    команда collect_media.
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name="Имя файла")
+    refcount = models.PositiveIntegerField(default=0, verbose_name="Ссылок")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменён")
+
+    class Meta:
+        verbose_name = "Файл изображения"
+        verbose_name_plural = "Файлы изображений"
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class PageViewDailyRollup(models.Model):
+    """
+    Суточные агрегаты посещений: по дню, странице и типу посетителя.
+    Строка с пустым url - итог по всему сайту за день (уникальных посетителей
+    по страницам нельзя просто сложить). Пересчитываются из PageView
+    сервисом store_app.services.visitor_rollups.
+    Если включён приблизительный подсчёт, в visitor_sketch лежит скетч HyperLogLog,
+    который объединяется со скетчами других дней для уникальных за период.
+    """
+    SITE_TOTAL = ''
+
+    class VisitorClass(models.TextChoices):
+        CLIENT = 'CLIENT', 'Клиент'
+        MANAGER = 'MANAGER', 'Менеджер'
+
+    date = models.DateField(verbose_name="Дата")
+    url = models.CharField(max_length=500, blank=True, verbose_name="URL страницы")
+    visitor_class = models.CharField(
+        max_length=10,
+        choices=VisitorClass.choices,
+        verbose_name="Тип посетителя"
+    )
+    views = models.PositiveIntegerField(default=0, verbose_name="Просмотров")
+    unique_visitors = models.PositiveIntegerField(default=0, verbose_name="Уникальных посетителей")
+    visitor_sketch = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Скетч HyperLogLog по сессиям"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Пересчитано")
+
+    class Meta:
+        verbose_name = "Суточная статистика посещений"
+        verbose_name_plural = "Суточная статистика посещений"
+        ordering = ['-date', 'url']
+        unique_together = ('date', 'url', 'visitor_class')
+        indexes = [
+            models.Index(fields=['url', 'visitor_class', 'date']),
+        ]
 
     def __str__(self):
-        return f"{self.url} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.date} {self.url or 'весь сайт'} ({self.get_visitor_class_display()})"
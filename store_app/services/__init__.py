@@ -0,0 +1,2 @@
+# Сервисный слой приложения: фоновые очереди, кэши, индексы и прочая
+# инфраструктура, которую используют представления, middleware и админка.
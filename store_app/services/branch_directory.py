@@ -0,0 +1,174 @@
+# Справочник филиалов для страниц "Контакты" и "Филиалы".
+# Неизменяемая часть (филиалы по городам, расписание для показа, координаты для карты)
+# строится одним проходом по активным филиалам и хранится в памяти процесса до изменения
+# Store или WorkingHours: сигналы увеличивают версию справочника в кэше.
+# На каждый запрос пересчитываются только флаги "открыт сейчас" (по Store.schedule_intervals),
+# а JSON для карт сериализуется заново лишь когда меняется набор открытых филиалов.
+import json
+import logging
+import threading
+
+from django.utils import timezone
+
+from store_app.models import Store
+from store_app.services.catalog_cache import bump_cache_version, get_cache_version
+from store_app.services.store_schedule import is_open_at
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'branches:version'
+
+# Допустимые координаты для карты (территория России)
+LATITUDE_RANGE = (30.0, 80.0)
+LONGITUDE_RANGE = (40.0, 180.0)
+
+
+def _schedule(working_hours):
+    schedule = []
+    for hours in working_hours:
+        if hours.is_closed:
+            time_str = "Выходной"
+        else:
+            open_time = hours.opening_time.strftime('%H:%M') if hours.opening_time else '--:--'
+            close_time = hours.closing_time.strftime('%H:%M') if hours.closing_time else '--:--'
+            time_str = f"{open_time} - {close_time}"
+
+        schedule.append({
+            'day': hours.get_day_of_week_display(),
+            'time': time_str,
+            'is_closed': hours.is_closed,
+        })
+    return schedule
+
+
+def _coordinates(store):
+    """Координаты филиала, если они заданы и попадают в допустимые пределы"""
+    if not store.latitude or not store.longitude:
+        return None, None
+    try:
+        latitude = float(store.latitude)
+        longitude = float(store.longitude)
+    except (TypeError, ValueError):
+        logger.warning("Некорректные координаты филиала %s", store.id)
+        return None, None
+
+    if (LATITUDE_RANGE[0] <= latitude <= LATITUDE_RANGE[1]
+            and LONGITUDE_RANGE[0] <= longitude <= LONGITUDE_RANGE[1]):
+        return latitude, longitude
+    logger.warning("Координаты филиала %s вне допустимых пределов: %s, %s", store.id, latitude, longitude)
+    return None, None
+
+
+class BranchDirectory:
+    """Снимок справочника филиалов: данные без флагов "открыт сейчас" и интервалы работы"""
+
+    def __init__(self, stores):
+        self.branches = []     # данные филиалов в порядке город, адрес
+        self.intervals = {}    # id филиала -> интервалы работы
+        for store in stores:
+            latitude, longitude = _coordinates(store)
+            self.branches.append({
+                'id': store.id,
+                'city': store.city,
+                'address': store.address,
+                'phone': store.phone or 'Не указан',
+                'description': store.description,
+                'latitude': latitude,
+                'longitude': longitude,
+                'schedule': _schedule(store.working_hours.all()),
+            })
+            self.intervals[store.id] = store.schedule_intervals
+
+        self.city_names = sorted({branch['city'] for branch in self.branches})
+        self._lock = threading.Lock()
+        self._payloads = {}    # (город, открытые филиалы) -> (cities_json, stores_json)
+
+    def context(self, city=None, now=None):
+        """Контекст шаблона basement/branches.html на момент now"""
+        now = now or timezone.now()
+        branches = []
+        open_ids = []
+        for branch in self.branches:
+            if city and branch['city'] != city:
+                continue
+            is_open = is_open_at(self.intervals[branch['id']], now)
+            if is_open:
+                open_ids.append(branch['id'])
+            branches.append(dict(
+                branch,
+                is_open_now=is_open,
+                status_color='green' if is_open else 'red',
+                status_text='Открыт' if is_open else 'Закрыт',
+            ))
+
+        cities = []
+        for branch in branches:
+            if not cities or cities[-1]['city'] != branch['city']:
+                cities.append({'city': branch['city'], 'branches': [], 'branches_with_coords': []})
+            cities[-1]['branches'].append(branch)
+            if branch['latitude'] and branch['longitude']:
+                cities[-1]['branches_with_coords'].append(branch)
+        for city_data in cities:
+            city_data['branch_count'] = len(city_data['branches'])
+
+        cities_json, stores_json = self._payload(city, tuple(open_ids), cities)
+        return {
+            'cities': cities,
+            'cities_json': cities_json,
+            'stores_json': stores_json,
+            'total_branches': len(branches),
+            'active_branches': len(open_ids),
+        }
+
+    def _payload(self, city, open_ids, cities):
+        key = (city, open_ids)
+        with self._lock:
+            payload = self._payloads.get(key)
+        if payload is None:
+            cities_json = json.dumps([
+                {'city': city_data['city'], 'branches': city_data['branches_with_coords']}
+                for city_data in cities if city_data['branches_with_coords']
+            ], ensure_ascii=False)
+            stores_json = json.dumps([
+                branch for city_data in cities for branch in city_data['branches_with_coords']
+            ], ensure_ascii=False)
+            payload = (cities_json, stores_json)
+            with self._lock:
+                # Флаги меняются несколько раз в день - старые варианты не нужны
+                if len(self._payloads) > 64:
+                    self._payloads.clear()
+                self._payloads[key] = payload
+        return payload
+
+
+_directory = None
+_directory_version = None
+_directory_lock = threading.Lock()
+
+
+def get_branch_directory():
+    """Справочник процесса; перестраивается, если версия в кэше изменилась"""
+    global _directory, _directory_version
+    version = get_cache_version(VERSION_KEY)
+    if _directory is None or _directory_version != version:
+        with _directory_lock:
+            if _directory is None or _directory_version != version:
+                stores = Store.objects.filter(is_active=True).prefetch_related('working_hours')
+                _directory = BranchDirectory(stores)
+                _directory_version = version
+    return _directory
+
+
+def invalidate_branch_directory():
+    """Вызывается сигналами при изменении филиалов и расписаний"""
+    bump_cache_version(VERSION_KEY)
+
+
+def empty_context():
+    return {
+        'cities': [],
+        'cities_json': json.dumps([], ensure_ascii=False),
+        'stores_json': json.dumps([], ensure_ascii=False),
+        'total_branches': 0,
+        'active_branches': 0,
+    }
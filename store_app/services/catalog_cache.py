@@ -0,0 +1,128 @@
+# Кэш страниц каталога (buy_page и главная).
+# Ключ - версия каталога + путь + нормализованные параметры фильтров. Версия хранится
+# в кэше и увеличивается сигналами при сохранении/удалении товаров, филиалов и категорий,
+# поэтому после любого изменения каталога старые страницы просто перестают читаться.
+# Полная страница кэшируется только для анонимных посетителей (в шапке есть данные
+# пользователя). Фрагмент бесконечной прокрутки не содержит персональных данных -
+# избранное подставляется на странице скриптом из user_favorites, - поэтому он общий
+# для всех покупателей и для всех остальных посетителей.
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+
+VERSION_KEY = 'catalog:version'
+DEFAULT_TTL = 300  # сек
+
+CACHED_PARAMS = (
+    'city', 'store', 'category', 'price_min', 'price_max', 'search', 'lat', 'lon', 'radius', 'cursor', 'page',
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def get_cache_version(key, cache=None):
+    """
+    Текущее значение счётчика версии в кэше. Начальное значение - время в мс: если ключ
+    вытеснен из кэша, новая версия не совпадёт ни с одной из прежних.
+    """
+    cache = cache or _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(key, cache=None):
+    """Увеличивает счётчик версии: всё, что закэшировано под старой версией, устаревает"""
+    cache = cache or _cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключа ещё нет - новая версия от текущего времени
+        cache.set(key, int(time.time() * 1000), timeout=None)
+        return cache.get(key)
+
+
+def get_catalog_version():
+    return get_cache_version(VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Делает недействительными все закэшированные страницы каталога"""
+    return bump_cache_version(VERSION_KEY)
+
+
+def normalized_params(query_dict):
+    """Значимые параметры фильтров без пустых значений, в постоянном порядке"""
+    params = []
+    for name in CACHED_PARAMS:
+        value = ' '.join((query_dict.get(name) or '').split())
+        if value:
+            params.append((name, value))
+    return params
+
+
+def _is_products_fragment(request):
+    cursor = request.GET.get('cursor')
+    page = request.GET.get('page', '1')
+    return (request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            and (cursor or page not in ('', '1')))
+
+
+def page_cache_key(request):
+    """
+    Ключ кэша для запроса или None, если ответ персональный
+    и кэшировать его нельзя.
+    """
+    if request.method != 'GET':
+        return None
+
+    user = request.user
+    if _is_products_fragment(request):
+        # Во фрагменте от пользователя зависит только наличие кнопок избранного
+        is_customer = user.is_authenticated and getattr(user, 'role', None) == 'CUSTOMER'
+        audience = 'customer' if is_customer else 'guest'
+    elif user.is_authenticated or len(get_messages(request)):
+        return None
+    else:
+        audience = 'anonymous'
+
+    raw = '|'.join([request.path, audience] + [f'{name}={value}' for name, value in normalized_params(request.GET)])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'catalog:page:{get_catalog_version()}:{digest}'
+
+
+def cache_catalog_page(view):
+    """Декоратор представления каталога: отдаёт и сохраняет ответ в кэше страниц"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = page_cache_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cache = _cache()
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Catalog-Cache'] = 'hit'
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                getattr(settings, 'CATALOG_PAGE_CACHE_TTL', DEFAULT_TTL),
+            )
+            response['X-Catalog-Cache'] = 'miss'
+        return response
+    return wrapper
@@ -0,0 +1,133 @@
+# Счётчики фильтров каталога (фасеты) для страницы покупки.
+# Для текущего состояния фильтров считается, сколько доступных товаров найдётся
+# в каждом городе, филиале и категории, и диапазон цен. Всё берётся из одного
+# сгруппированного запроса по (филиал, город, категория) с учётом поиска, цены и радиуса;
+# дальше группы перекрёстно фильтруются в памяти: счётчик каждого фасета учитывает
+# все остальные фильтры, но не свой собственный, чтобы было видно альтернативы.
+# Результат запоминается по сигнатуре фильтров до изменения каталога или на FACETS_CACHE_TTL.
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+
+from store_app.models import Product
+from store_app.services.product_search import search_products
+from store_app.services.store_locator import get_store_locator, parse_location
+
+DEFAULT_CACHE_TTL = 60  # сек
+MAX_CACHED_SIGNATURES = 512
+
+FILTER_PARAMS = ('city', 'store', 'category', 'price_min', 'price_max', 'search', 'lat', 'lon', 'radius')
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(value) if value not in (None, '') else None
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def facet_signature(params):
+    """Нормализованная сигнатура фильтров: одинаковые запросы дают один ключ"""
+    return (
+        (params.get('city') or '').strip(),
+        _to_int(params.get('store')),
+        _to_int(params.get('category')),
+        _to_decimal(params.get('price_min')),
+        _to_decimal(params.get('price_max')),
+        ' '.join((params.get('search') or '').lower().split()),
+        parse_location(params),
+    )
+
+
+def compute_facets(signature):
+    """Счётчики по городам, филиалам, категориям и диапазон цен (один запрос к БД)"""
+    city, store_id, category_id, price_min, price_max, search, location = signature
+
+    products = Product.objects.filter(available=True)
+    if location:
+        products = products.filter(store_id__in=get_store_locator().within_radius(*location))
+    if price_min is not None:
+        products = products.filter(price__gte=price_min)
+    if price_max is not None:
+        products = products.filter(price__lte=price_max)
+    if search:
+        products = search_products(products, search)
+
+    groups = products.order_by().values('store_id', 'store__city', 'category_id').annotate(
+        count=Count('id'), min_price=Min('price'), max_price=Max('price'),
+    )
+
+    cities = {}
+    stores = {}
+    categories = {}
+    total = 0
+    price_range = [None, None]
+    for group in groups:
+        in_city = not city or group['store__city'] == city
+        in_store = store_id is None or group['store_id'] == store_id
+        in_category = category_id is None or group['category_id'] == category_id
+        count = group['count']
+
+        if in_category:
+            cities[group['store__city']] = cities.get(group['store__city'], 0) + count
+            if in_city:
+                stores[group['store_id']] = stores.get(group['store_id'], 0) + count
+        if in_city and in_store:
+            categories[group['category_id']] = categories.get(group['category_id'], 0) + count
+            if in_category:
+                total += count
+                if price_range[0] is None or group['min_price'] < price_range[0]:
+                    price_range[0] = group['min_price']
+                if price_range[1] is None or group['max_price'] > price_range[1]:
+                    price_range[1] = group['max_price']
+
+    return {
+        'cities': cities,
+        'stores': stores,
+        'categories': categories,
+        'total': total,
+        'price_min': price_range[0],
+        'price_max': price_range[1],
+    }
+
+
+_memo = OrderedDict()  # сигнатура -> (время расчёта, фасеты)
+_memo_lock = threading.Lock()
+
+
+def get_facets(params):
+    """Фасеты для параметров запроса (request.GET) с запоминанием по сигнатуре"""
+    signature = facet_signature(params)
+    ttl = getattr(settings, 'FACETS_CACHE_TTL', DEFAULT_CACHE_TTL)
+    now = time.monotonic()
+
+    with _memo_lock:
+        cached = _memo.get(signature)
+        if cached is not None and now - cached[0] < ttl:
+            _memo.move_to_end(signature)
+            return cached[1]
+
+    facets = compute_facets(signature)
+    with _memo_lock:
+        _memo[signature] = (now, facets)
+        _memo.move_to_end(signature)
+        while len(_memo) > MAX_CACHED_SIGNATURES:
+            _memo.popitem(last=False)
+    return facets
+
+
+def invalidate_facets():
+    """Сбрасывает запомненные фасеты (вызывается при изменении товаров и филиалов)"""
+    with _memo_lock:
+        _memo.clear()
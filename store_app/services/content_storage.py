@@ -0,0 +1,60 @@
+# Хранилище изображений товаров с адресацией по содержимому.
+# Имя файла - sha256 содержимого: products/ab/ab12...ef.jpg. Одинаковое фото, загруженное
+# для товара в каждом филиале, лежит на диске один раз, а файл по такому URL никогда
+# не меняется - его можно кэшировать в браузере и CDN без срока.
+# Сколько товаров ссылается на файл, учитывает services.media_blobs; ненужные файлы
+# удаляет команда collect_media, а не удаление товара.
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def file_hash(content):
+    """sha256 содержимого файла (поток возвращается в начало)"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(name, digest):
+    """Имя файла по хэшу: папка из upload_to, два символа хэша, хэш и исходное расширение"""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], f'{digest}{extension}').replace('\\', '/')
+
+
+def digest_from_name(name):
+    """Хэш содержимого из имени файла, сохранённого этим хранилищем (иначе None)"""
+    stem = os.path.splitext(os.path.basename(name or ''))[0]
+    if len(stem) == 64 and all(char in '0123456789abcdef' for char in stem):
+        return stem
+    return None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище в MEDIA_ROOT, сохраняющее файлы под именем из хэша содержимого"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, file_hash(content))
+        # То же содержимое уже лежит в хранилище - второй раз не пишем
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+_product_image_storage = ContentAddressedStorage()
+
+
+def product_image_storage():
+    """Хранилище поля Product.image (вызываемый объект - чтобы миграции не фиксировали путь)"""
+    return _product_image_storage
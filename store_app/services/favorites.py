@@ -0,0 +1,136 @@
+# Избранное покупателей.
+# Набор id избранных товаров каждого покупателя хранится в кэше и сбрасывается при
+# переключении, поэтому страницы каталога получают избранное без запросов к БД.
+# Счётчики Customer.favorite_count и Product.favorites_count меняются атомарными
+# UPDATE ... SET n = n ± 1 в той же транзакции, что и сама запись избранного:
+# пересчитывать COUNT(*) по таблице избранного больше не нужно.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Count, Exists, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from store_app.models import Customer, FavoriteProduct, Product
+
+DEFAULT_CACHE_TTL = 24 * 60 * 60  # сек
+
+
+def _cache_key(customer_id):
+    return f'favorites:{customer_id}'
+
+
+def customer_id_for(user):
+    """id профиля покупателя или None (без запроса к БД)"""
+    if not user.is_authenticated or getattr(user, 'role', None) != 'CUSTOMER':
+        return None
+    return user.customer_profile_id
+
+
+def get_favorite_ids(customer_id):
+    """Множество id избранных товаров покупателя (из кэша, при промахе - один запрос)"""
+    key = _cache_key(customer_id)
+    favorite_ids = cache.get(key)
+    if favorite_ids is None:
+        favorite_ids = frozenset(
+            FavoriteProduct.objects.filter(user_id=customer_id).values_list('product_id', flat=True)
+        )
+        cache.set(key, favorite_ids, getattr(settings, 'FAVORITES_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return favorite_ids
+
+
+def user_favorite_ids(user):
+    """id избранных товаров пользователя для шаблонов каталога (для не-покупателей пусто)"""
+    customer_id = customer_id_for(user)
+    if customer_id is None:
+        return []
+    return sorted(get_favorite_ids(customer_id))
+
+
+def with_favorite_flag(queryset, user):
+    """
+    Аннотирует товары флагом is_favorite (EXISTS по индексу (user, product)),
+    чтобы шаблон карточки не искал товар в списке избранного.
+    """
+    customer_id = customer_id_for(user)
+    if customer_id is None:
+        return queryset.annotate(is_favorite=Value(False, output_field=BooleanField()))
+    return queryset.annotate(is_favorite=Exists(
+        FavoriteProduct.objects.filter(user_id=customer_id, product_id=OuterRef('pk'))
+    ))
+
+
+def invalidate_favorites(*customer_ids):
+    cache.delete_many([_cache_key(customer_id) for customer_id in customer_ids])
+
+
+def toggle_favorite(customer_id, product_id):
+    """
+    Добавляет товар в избранное или убирает его оттуда.
+    Возвращает (статус 'added' / 'removed', число товаров в избранном покупателя).
+    Если товара нет - Product.DoesNotExist.
+    """
+    with transaction.atomic():
+        # У FavoriteProduct нет зависимых объектов и обработчиков сигналов - это один DELETE
+        removed, _ = FavoriteProduct.objects.filter(user_id=customer_id, product_id=product_id).delete()
+        if removed:
+            Product.objects.filter(pk=product_id).update(favorites_count=F('favorites_count') - 1)
+            status, delta = 'removed', -1
+        else:
+            try:
+                with transaction.atomic():
+                    # Внешние ключи проверяются при фиксации, поэтому наличие товара
+                    # определяется по числу обновлённых строк счётчика
+                    if not Product.objects.filter(pk=product_id).update(favorites_count=F('favorites_count') + 1):
+                        raise Product.DoesNotExist(f'Товар {product_id} не найден')
+                    FavoriteProduct.objects.create(user_id=customer_id, product_id=product_id)
+            except IntegrityError:
+                # Этот товар только что добавил в избранное параллельный запрос
+                return 'added', Customer.objects.values_list('favorite_count', flat=True).get(pk=customer_id)
+            status, delta = 'added', 1
+
+        Customer.objects.filter(pk=customer_id).update(favorite_count=F('favorite_count') + delta)
+        count = Customer.objects.values_list('favorite_count', flat=True).get(pk=customer_id)
+
+    invalidate_favorites(customer_id)
+    return status, count
+
+
+def products_deleting(product_ids):
+    """
+    Перед удалением товаров: их избранное удалится каскадом, поэтому счётчики
+    покупателей уменьшаются заранее - одним UPDATE на всех затронутых покупателей.
+    """
+    favorites = FavoriteProduct.objects.filter(product_id__in=product_ids)
+    customer_ids = list(favorites.order_by().values_list('user_id', flat=True).distinct())
+    if customer_ids:
+        removed = (favorites.filter(user_id=OuterRef('pk'))
+                   .order_by().values('user_id').annotate(count=Count('id')).values('count'))
+        Customer.objects.filter(pk__in=customer_ids).update(
+            favorite_count=F('favorite_count') - Subquery(removed, output_field=IntegerField())
+        )
+        invalidate_favorites(*customer_ids)
+    return customer_ids
+
+
+def product_deleting(product):
+    products_deleting([product.pk])
+
+
+def customer_deleting(customer):
+    """Перед удалением покупателя: уменьшает счётчики товаров из его избранного"""
+    Product.objects.filter(favorited_by__user=customer).update(favorites_count=F('favorites_count') - 1)
+    invalidate_favorites(customer.pk)
+
+
+def _favorites_subquery(field):
+    counts = (FavoriteProduct.objects.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(count=Count('id')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def recount_favorite_counters():
+    """Пересчитывает все счётчики избранного по таблице FavoriteProduct (два UPDATE)"""
+    customers = Customer.objects.update(favorite_count=_favorites_subquery('user'))
+    products = Product.objects.update(favorites_count=_favorites_subquery('product'))
+    cache.delete_many([_cache_key(pk) for pk in Customer.objects.values_list('pk', flat=True)])
+    return customers, products
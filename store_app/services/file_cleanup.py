@@ -0,0 +1,22 @@
+# Удаление файлов из хранилища.
+# Вызывается сборщиком мусора изображений (services.media_blobs.collect_garbage) после
+# фиксации транзакции, в которой удалены записи о файлах: при откате файлы остаются на месте.
+import logging
+
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+def delete_files(names, storage=None):
+    """Удаляет файлы из хранилища, ошибки только логируются. Возвращает число удалённых"""
+    storage = storage or default_storage
+    deleted = 0
+    for name in names:
+        try:
+            if storage.exists(name):
+                storage.delete(name)
+                deleted += 1
+        except Exception:
+            logger.exception("Не удалось удалить файл %s", name)
+    return deleted
@@ -0,0 +1,100 @@
+# HyperLogLog - вероятностный подсчёт уникальных значений за фиксированную память.
+# Скетч из m = 2**precision регистров оценивает число уникальных сессий
+# с относительной ошибкой около 1.04 / sqrt(m) и объединяется с другими скетчами
+# той же точности без потерь: объединение двух дней = скетч по обоим дням.
+import hashlib
+import math
+import zlib
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+DEFAULT_PRECISION = 12  # 4096 регистров, ошибка ~1.6%
+
+
+def _alpha(m):
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+class HyperLogLog:
+    """Скетч HyperLogLog на 64-битном хэше blake2b"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision должна быть от {MIN_PRECISION} до {MAX_PRECISION}")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError("Число регистров не соответствует точности")
+        self.registers = bytearray(registers)
+
+    @property
+    def relative_error(self):
+        """Стандартная относительная ошибка оценки"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value):
+        """Добавляет значение (строку или bytes) в скетч"""
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        hashed = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+        index = hashed >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rest = hashed & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Объединяет с другим скетчем той же точности (на месте)"""
+        if other.precision != self.precision:
+            raise ValueError("Нельзя объединить скетчи разной точности")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Оценка числа уникальных значений"""
+        harmonic_sum = math.fsum(2.0 ** -r for r in self.registers)
+        estimate = _alpha(self.m) * self.m * self.m / harmonic_sum
+
+        # Поправка для малых значений (linear counting)
+        if estimate <= 2.5 * self.m:
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        """Сериализация: байт точности + сжатый массив регистров"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(precision=data[0], registers=zlib.decompress(data[1:]))
+
+    @classmethod
+    def merged(cls, sketches, precision=DEFAULT_PRECISION):
+        """Скетч-объединение набора скетчей (пустой, если их нет)"""
+        result = None
+        for sketch in sketches:
+            if result is None:
+                result = cls(precision=sketch.precision, registers=sketch.registers)
+            else:
+                result.merge(sketch)
+        return result if result is not None else cls(precision=precision)
+
+    def __repr__(self):
+        return f"<HyperLogLog p={self.precision} ≈{self.count()}>"
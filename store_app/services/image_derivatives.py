@@ -0,0 +1,174 @@
+# Уменьшенные копии изображений товаров для карточек и страницы товара.
+# Для каждой ширины из настроек создаются WebP и JPEG (маленькие исходники не увеличиваются).
+# Файлы лежат по пути из хэша содержимого исходника: одинаковые картинки разных товаров
+# используют одни и те же копии, а URL копии никогда не меняет содержимое.
+# Копии готовит пул фоновых потоков после фиксации транзакции, поэтому сохранение товара
+# не ждёт Pillow; пока копий нет, шаблонный тег product_image выводит исходник.
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from store_app.models import Product
+from store_app.services import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,              # False - создавать копии сразу после фиксации, в том же потоке
+    'WORKERS': 2,                 # Потоков в пуле
+    'WIDTHS': (320, 640, 1280),   # Ширины копий, px
+    'QUALITY': 80,
+}
+
+ROOT = 'derivatives'
+FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+
+def get_derivative_settings():
+    conf = dict(DEFAULT_SETTINGS)
+    conf.update(getattr(settings, 'IMAGE_DERIVATIVES', {}))
+    return conf
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def derivative_name(digest, width, extension):
+    return f'{ROOT}/{digest[:2]}/{digest}/{width}.{extension}'
+
+
+def is_ready(product):
+    """Копии соответствуют текущему изображению товара"""
+    derivatives = product.image_derivatives or {}
+    return bool(product.image) and derivatives.get('source') == product.image.name and bool(derivatives.get('widths'))
+
+
+def _encode(image, width, image_format, quality):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+    has_alpha = resized.mode in ('RGBA', 'LA') or (resized.mode == 'P' and 'transparency' in resized.info)
+    if image_format == 'JPEG':
+        if has_alpha:
+            # JPEG без прозрачности - подкладываем белый фон
+            rgba = resized.convert('RGBA')
+            resized = Image.new('RGB', rgba.size, 'white')
+            resized.paste(rgba, mask=rgba.getchannel('A'))
+        elif resized.mode != 'RGB':
+            resized = resized.convert('RGB')
+    elif resized.mode not in ('RGB', 'RGBA'):
+        resized = resized.convert('RGBA' if has_alpha else 'RGB')
+
+    buffer = io.BytesIO()
+    resized.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, storage=None):
+    """
+    Создаёт копии изображения товара name, которых ещё нет в хранилище storage.
+    Возвращает {'source', 'hash', 'widths'} или None, если файл не читается как изображение.
+    """
+    storage = storage or default_storage
+    conf = get_derivative_settings()
+    try:
+        with Product._meta.get_field('image').storage.open(name, 'rb') as file:
+            data = file.read()
+        digest = content_hash(data)
+        with Image.open(io.BytesIO(data)) as original:
+            image = ImageOps.exif_transpose(original)
+            widths = sorted({min(width, image.width) for width in conf['WIDTHS']})
+            for width in widths:
+                for extension, image_format in FORMATS:
+                    path = derivative_name(digest, width, extension)
+                    if storage.exists(path):
+                        continue  # та же картинка уже обработана для другого товара
+                    storage.save(path, ContentFile(_encode(image, width, image_format, conf['QUALITY'])))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Не удалось создать копии изображения %s", name, exc_info=True)
+        return None
+    return {'source': name, 'hash': digest, 'widths': widths}
+
+
+def refresh_product_derivatives(product_id, name):
+    """Создаёт копии и сохраняет их описание у товара, если изображение не сменилось за это время"""
+    derivatives = generate_derivatives(name)
+    if derivatives is None:
+        return False
+    updated = Product.objects.filter(pk=product_id, image=name).update(image_derivatives=derivatives)
+    if updated:
+        # Закэшированные страницы каталога ещё ссылаются на исходник
+        catalog_cache.bump_catalog_version()
+    return bool(updated)
+
+
+class DerivativePool:
+    """Пул фоновых потоков для создания копий"""
+
+    def __init__(self, workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-derivatives')
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def submit(self, product_id, name):
+        future = self._executor.submit(self._run, product_id, name)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def join(self):
+        """Ждёт завершения поставленных задач (для команд и тестов)"""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, product_id, name):
+        # Поток пула держит своё соединение с БД - закрываем протухшие
+        close_old_connections()
+        try:
+            refresh_product_derivatives(product_id, name)
+        except Exception:
+            logger.exception("Ошибка создания копий изображения товара %s", product_id)
+        finally:
+            close_old_connections()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_derivative_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DerivativePool(get_derivative_settings()['WORKERS'])
+    return _pool
+
+
+def schedule_derivatives(product):
+    """Ставит создание копий нового изображения товара после фиксации транзакции"""
+    if not product.image or is_ready(product):
+        return
+    product_id, name = product.pk, product.image.name
+
+    def run():
+        if get_derivative_settings()['ENABLED']:
+            get_derivative_pool().submit(product_id, name)
+        else:
+            refresh_product_derivatives(product_id, name)
+
+    transaction.on_commit(run)
@@ -0,0 +1,75 @@
+# Постраничная выдача по курсору (keyset pagination).
+# Вместо OFFSET следующая страница выбирается условием "строго после последней
+# показанной строки" по полям сортировки. Стоимость страницы не зависит от её номера,
+# а добавление товаров во время прокрутки не сдвигает и не дублирует выдачу.
+# Курсор - непрозрачная строка (base64 от JSON со значениями полей сортировки).
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или выдан для другой сортировки"""
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def encode_cursor(ordering, obj):
+    """Курсор, указывающий на позицию сразу после obj"""
+    values = [getattr(obj, field) for field, _ in _parse_ordering(ordering)]
+    payload = json.dumps({'o': list(ordering), 'v': values}, cls=DjangoJSONEncoder,
+                         separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(ordering, token):
+    """Значения полей сортировки из курсора"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+        cursor_ordering = payload['o']
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor('Некорректный курсор')
+
+    if cursor_ordering != list(ordering) or not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Курсор не соответствует сортировке')
+    return values
+
+
+def _after_position(ordering, values):
+    """
+    Условие "после строки с такими значениями" для сортировки ordering:
+    a > x OR (a = x AND (b > y OR (b = y AND c > z))).
+    Дополнительное a >= x позволяет СУБД начать чтение индекса с нужной позиции.
+    """
+    fields = _parse_ordering(ordering)
+    condition = None
+    for (field, descending), value in reversed(list(zip(fields, values))):
+        strict = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+        condition = strict if condition is None else strict | (Q(**{field: value}) & condition)
+
+    first_field, first_descending = fields[0]
+    return Q(**{f"{first_field}__{'lte' if first_descending else 'gte'}": values[0]}) & condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=12):
+    """
+    Страница queryset после курсора. ordering должен однозначно упорядочивать строки
+    (последнее поле - уникальное, например id). Возвращает (объекты, курсор следующей
+    страницы или None, если страница последняя).
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after_position(ordering, decode_cursor(ordering, cursor)))
+
+    items = list(queryset[:per_page + 1])
+    if len(items) <= per_page:
+        return items, None
+    items = items[:per_page]
+    return items, encode_cursor(ordering, items[-1])
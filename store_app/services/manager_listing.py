@@ -0,0 +1,110 @@
+# Список товаров в панели менеджера.
+# Фильтры и сортировка выполняются в БД, связанные категория и филиал подгружаются
+# тем же запросом (select_related), а из таблиц читаются только нужные колонки.
+# Один и тот же queryset используется для постраничного вывода и для выгрузки в CSV,
+# которая идёт потоком по курсору и не держит весь список в памяти.
+import csv
+
+from django.core.paginator import Paginator
+
+from store_app.models import Product
+
+PER_PAGE = 50
+EXPORT_CHUNK_SIZE = 2000
+
+# Колонки, по которым можно сортировать: параметр sort=<колонка> или sort=-<колонка>
+SORT_FIELDS = {
+    'name': ('name',),
+    'category': ('category__name',),
+    'store': ('store__city', 'store__address'),
+    'price': ('price',),
+    'status': ('available',),
+    'updated': ('updated_at',),
+}
+
+# Порядок по умолчанию: сначала доступные, внутри - по дате обновления
+DEFAULT_ORDERING = ('-available', 'updated_at')
+NEWEST_ORDERING = ('-available', '-updated_at')
+
+LIST_FIELDS = (
+    'id', 'name', 'slug', 'price', 'available', 'updated_at',
+    'category__name', 'store__city', 'store__address',
+)
+
+EXPORT_COLUMNS = (
+    ('id', 'ID'),
+    ('name', 'Название'),
+    ('category__name', 'Категория'),
+    ('store__city', 'Город'),
+    ('store__address', 'Адрес филиала'),
+    ('price', 'Цена'),
+    ('available', 'Доступен'),
+    ('updated_at', 'Обновлён'),
+)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(params):
+    """Фильтры списка из параметров запроса"""
+    status = params.get('status')
+    return {
+        'store': _to_int(params.get('store')),
+        'category': _to_int(params.get('category')),
+        'status': status if status in ('available', 'unavailable') else '',
+        'q': (params.get('q') or '').strip(),
+        'sort': params.get('sort') or '',
+    }
+
+
+def ordering_for(sort):
+    """Сортировка для параметра sort; id в конце делает порядок однозначным"""
+    if sort == 'newest':
+        return NEWEST_ORDERING + ('id',)
+    descending = sort.startswith('-')
+    fields = SORT_FIELDS.get(sort.lstrip('-'))
+    if not fields:
+        return DEFAULT_ORDERING + ('id',)
+    prefix = '-' if descending else ''
+    return tuple(prefix + field for field in fields) + (prefix + 'id',)
+
+
+def manager_products(filters):
+    """Товары для панели менеджера с применёнными фильтрами и сортировкой"""
+    products = Product.objects.select_related('category', 'store')
+    if filters['store']:
+        products = products.filter(store_id=filters['store'])
+    if filters['category']:
+        products = products.filter(category_id=filters['category'])
+    if filters['status']:
+        products = products.filter(available=filters['status'] == 'available')
+    if filters['q']:
+        products = products.filter(name__icontains=filters['q'])
+    return products.order_by(*ordering_for(filters['sort']))
+
+
+def paginate(products, page_number, per_page=PER_PAGE):
+    """Страница списка: только колонки, которые выводит таблица"""
+    return Paginator(products.only(*LIST_FIELDS), per_page).get_page(page_number)
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(products):
+    """Строки CSV (заголовок и товары) для StreamingHttpResponse"""
+    writer = csv.writer(_Echo())
+    fields = [field for field, _ in EXPORT_COLUMNS]
+    # BOM - чтобы Excel открыл файл в UTF-8
+    yield '\ufeff' + writer.writerow([title for _, title in EXPORT_COLUMNS])
+    for row in products.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow(row)
@@ -0,0 +1,168 @@
+# Учёт ссылок товаров на файлы изображений (таблица MediaBlob) и сборка мусора.
+# Счётчик меняется в той же транзакции, что и товар: сохранение с новым изображением,
+# замена и очистка изображения, удаление товара - одиночное, каскадное и массовое.
+# Файлы с нулевым счётчиком удаляет collect_garbage (команда collect_media), но не раньше
+# чем через MEDIA_GC_GRACE_SECONDS: повторная загрузка того же фото за это время
+# снова сошлётся на уже лежащий файл. Вместе с файлом удаляются его уменьшенные копии.
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from store_app.models import MediaBlob, Product
+from store_app.services import file_cleanup, image_derivatives
+from store_app.services.content_storage import digest_from_name, product_image_storage
+
+DEFAULT_GRACE_SECONDS = 3600
+GC_BATCH_SIZE = 500
+IMAGE_ROOT = 'products'
+
+
+def _change(names, sign):
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    MediaBlob.objects.bulk_create([MediaBlob(name=name) for name in counts], ignore_conflicts=True)
+    # Один UPDATE на каждое встречающееся число ссылок (обычно одно - 1)
+    by_count = defaultdict(list)
+    for name, count in counts.items():
+        by_count[count].append(name)
+    now = timezone.now()
+    for count, group in by_count.items():
+        if sign > 0:
+            refcount = F('refcount') + count
+        else:
+            refcount = Greatest(F('refcount') - count, Value(0))
+        MediaBlob.objects.filter(name__in=group).update(refcount=refcount, updated_at=now)
+
+
+def acquire(names):
+    """Товары стали ссылаться на файлы names (имя может повторяться)"""
+    _change(names, 1)
+
+
+def release(names):
+    """Товары перестали ссылаться на файлы names; файл без ссылок станет мусором"""
+    _change(names, -1)
+
+
+def image_replaced(previous, current):
+    if current:
+        acquire([current])
+    if previous:
+        release([previous])
+
+
+def recount():
+    """
+    Пересчитывает счётчики по таблице товаров - после правок в обход учёта
+    (bulk_create, изменения в БД вручную). Возвращает число исправленных записей.
+    """
+    names = (
+        Product.objects.exclude(image='').exclude(image__isnull=True)
+        .order_by().values_list('image', flat=True).distinct()
+    )
+    actual = Coalesce(Subquery(
+        Product.objects.filter(image=OuterRef('name')).order_by()
+        .values('image').annotate(count=Count('id')).values('count')
+    ), 0)
+    with transaction.atomic():
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name) for name in names.iterator()], ignore_conflicts=True, batch_size=GC_BATCH_SIZE,
+        )
+        return MediaBlob.objects.exclude(refcount=actual).update(refcount=actual, updated_at=timezone.now())
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}'
+    for name in directories:
+        yield from _walk(storage, f'{directory}/{name}')
+
+
+def register_orphans(storage=None):
+    """
+    Заводит записи с нулевым счётчиком для файлов изображений, о которых учёт не знает
+    (загружены, но товар так и не сохранился, или лежат с до-учётных времён).
+    Возвращает число таких файлов.
+    """
+    storage = storage or product_image_storage()
+    if not storage.exists(IMAGE_ROOT):
+        return 0
+    registered = 0
+    batch = []
+    for name in _walk(storage, IMAGE_ROOT):
+        batch.append(name)
+        if len(batch) >= GC_BATCH_SIZE:
+            registered += _register(batch)
+            batch = []
+    return registered + _register(batch)
+
+
+def _register(names):
+    known = set(MediaBlob.objects.filter(name__in=names).values_list('name', flat=True))
+    referenced = set(Product.objects.filter(image__in=names).values_list('image', flat=True))
+    orphans = [MediaBlob(name=name) for name in names if name not in known and name not in referenced]
+    MediaBlob.objects.bulk_create(orphans, ignore_conflicts=True)
+    return len(orphans)
+
+
+def _derivative_files(names, storage):
+    """Уменьшенные копии файлов names, если другие товары не используют те же копии"""
+    files = []
+    for name in names:
+        digest = digest_from_name(name)
+        if digest is None:
+            if not storage.exists(name):
+                continue
+            with storage.open(name, 'rb') as file:
+                digest = image_derivatives.content_hash(file.read())
+        digest = digest[:32]
+        if Product.objects.filter(image_derivatives__hash=digest).exists():
+            continue
+        directory = f'{image_derivatives.ROOT}/{digest[:2]}/{digest}'
+        if default_storage.exists(directory):
+            files.extend(f'{directory}/{file}' for file in default_storage.listdir(directory)[1])
+    return files
+
+
+def collect_garbage(grace_seconds=None, storage=None):
+    """
+    Удаляет файлы изображений без ссылок дольше grace_seconds и их уменьшенные копии.
+    Файлы удаляются после фиксации удаления записей. Возвращает (файлов, копий).
+    """
+    storage = storage or product_image_storage()
+    if grace_seconds is None:
+        grace_seconds = getattr(settings, 'MEDIA_GC_GRACE_SECONDS', DEFAULT_GRACE_SECONDS)
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    collected = derivatives = 0
+    while True:
+        with transaction.atomic():
+            names = list(
+                MediaBlob.objects.select_for_update().filter(refcount=0, updated_at__lte=cutoff)
+                .order_by('id').values_list('name', flat=True)[:GC_BATCH_SIZE]
+            )
+            if not names:
+                break
+            # На файл могли сослаться в обход учёта - такой файл не мусор, счётчик исправляется
+            referenced = Counter(Product.objects.filter(image__in=names).values_list('image', flat=True))
+            if referenced:
+                acquire(list(referenced.elements()))
+            garbage = [name for name in names if name not in referenced]
+            derivative_files = _derivative_files(garbage, storage)
+            MediaBlob.objects.filter(name__in=garbage).delete()
+
+            def delete(garbage=garbage, derivative_files=derivative_files):
+                file_cleanup.delete_files(garbage, storage)
+                file_cleanup.delete_files(derivative_files, default_storage)
+
+            transaction.on_commit(delete)
+        collected += len(garbage)
+        derivatives += len(derivative_files)
+    return collected, derivatives
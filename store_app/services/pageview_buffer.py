@@ -0,0 +1,175 @@
+# Буферизованная запись просмотров страниц.
+# Middleware кладёт несохранённые PageView в ограниченную очередь, а фоновый поток
+# сбрасывает их в БД пачками через bulk_create — по размеру пачки или по таймеру.
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from store_app.models import PageView
+from store_app.services import visitor_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,           # False - писать каждый просмотр сразу (старое поведение)
+    'MAX_QUEUE_SIZE': 10000,   # Сколько просмотров может ждать записи
+    'BATCH_SIZE': 500,         # Размер одной пачки bulk_create
+    'FLUSH_INTERVAL': 2.0,     # Максимальная задержка записи, сек
+}
+
+
+def get_buffer_settings():
+    """Настройки буфера с учётом переопределений из settings.ANALYTICS_BUFFER"""
+    conf = dict(DEFAULT_SETTINGS)
+    conf.update(getattr(settings, 'ANALYTICS_BUFFER', {}))
+    return conf
+
+
+class PageViewBuffer:
+    """
+    Ограниченная очередь просмотров страниц с фоновой пакетной записью.
+
+    Если очередь переполнена, просмотр отбрасывается и учитывается в счётчике dropped,
+    запрос при этом не ждёт. При остановке процесса оставшиеся записи дописываются.
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=500, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._worker = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, page_view):
+        """Ставит несохранённый PageView в очередь. Возвращает False, если он отброшен"""
+        try:
+            self._queue.put_nowait(page_view)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            # Не засоряем лог: первое отбрасывание и дальше каждое тысячное
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Очередь просмотров переполнена, отброшено событий: %s", dropped)
+            return False
+
+        with self._stats_lock:
+            self.enqueued += 1
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        """Запускает фоновый поток записи (повторный вызов ничего не делает)"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stopping.clear()
+        self._worker = threading.Thread(target=self._run, name='pageview-buffer', daemon=True)
+        self._worker.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=5.0):
+        """Останавливает фоновый поток и дописывает всё, что осталось в очереди"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+        self.flush()
+        if self.dropped:
+            logger.warning("Буфер просмотров остановлен, всего отброшено событий: %s", self.dropped)
+
+    def flush(self):
+        """Синхронно записывает содержимое очереди пачками. Возвращает число записанных строк"""
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                total += self._write(batch)
+        return total
+
+    def stats(self):
+        """Счётчики буфера для мониторинга"""
+        with self._stats_lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self._queue.qsize(),
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # Фоновый поток держит своё соединение с БД - закрываем протухшие
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            PageView.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Ошибка записи пачки просмотров (%s шт.)", len(batch))
+            with self._stats_lock:
+                self.failed += len(batch)
+            return 0
+
+        with self._stats_lock:
+            self.written += len(batch)
+
+        # Суточные агрегаты для админки догоняют запись
+        visitor_rollups.record_page_views(batch)
+        return len(batch)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def is_buffer_enabled():
+    return get_buffer_settings()['ENABLED']
+
+
+def get_pageview_buffer():
+    """Буфер процесса; создаётся и запускается при первом обращении"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                conf = get_buffer_settings()
+                _buffer = PageViewBuffer(
+                    max_queue_size=conf['MAX_QUEUE_SIZE'],
+                    batch_size=conf['BATCH_SIZE'],
+                    flush_interval=conf['FLUSH_INTERVAL'],
+                )
+                _buffer.start()
+    return _buffer
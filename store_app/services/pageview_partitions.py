@@ -0,0 +1,151 @@
+# Помесячное хранение PageView и свёртка старых данных.
+# На PostgreSQL таблица store_app_pageview секционирована по timestamp (PARTITION BY RANGE,
+# см. миграцию 0011): одна секция на месяц плюс DEFAULT-секция для строк вне диапазонов.
+# Запросы с условием по timestamp (пересчёт агрегатов за день) читают только нужную секцию.
+# Месяцы старше горизонта хранения сначала сворачиваются в PageViewDailyRollup,
+# затем секция удаляется целиком (DROP TABLE вместо DELETE миллионов строк).
+# На других СУБД (SQLite в тестах) таблица обычная, а старые строки удаляются запросом.
+import logging
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from store_app.models import PageView
+
+logger = logging.getLogger(__name__)
+
+TABLE = PageView._meta.db_table
+DEFAULT_RETENTION_MONTHS = 12
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    """Первое число месяца, отстоящего от day на months (может быть отрицательным)"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year}{month.month:02d}'
+
+
+def retention_cutoff(today=None, months=None):
+    """
+    Первый день самого старого хранимого месяца. Сырые просмотры до этой даты
+    свёрнуты в агрегаты и удалены.
+    """
+    today = today or date.today()
+    if months is None:
+        months = getattr(settings, 'ANALYTICS_PAGEVIEW_RETENTION_MONTHS', DEFAULT_RETENTION_MONTHS)
+    return add_months(month_start(today), -months)
+
+
+def is_partitioned():
+    """Секционирована ли таблица просмотров (только PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions():
+    """Месячные секции таблицы: {первое число месяца: имя секции}"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    prefix = f'{TABLE}_p'
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """Создаёт секцию на месяц, если её ещё нет"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" PARTITION OF "{TABLE}" '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [datetime.combine(month, datetime.min.time()),
+             datetime.combine(add_months(month, 1), datetime.min.time())],
+        )
+
+
+def ensure_partitions(months_ahead=2, today=None):
+    """Заранее создаёт секции на текущий и следующие months_ahead месяцев"""
+    if not is_partitioned():
+        return []
+
+    current = month_start(today or date.today())
+    existing = existing_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        try:
+            with transaction.atomic():
+                create_partition(month)
+        except Exception:
+            # Например, в DEFAULT-секции уже лежат строки этого месяца
+            logger.exception("Не удалось создать секцию просмотров за %s", month)
+            continue
+        created.append(partition_name(month))
+    return created
+
+
+def compact_expired(retention_cutoff_day=None, dry_run=False):
+    """
+    Сворачивает в суточные агрегаты и удаляет просмотры старше горизонта хранения.
+    Возвращает список обработанных месяцев (первые числа).
+    """
+    from store_app.services.visitor_rollups import refresh_range
+
+    cutoff = retention_cutoff_day or retention_cutoff()
+    partitions = existing_partitions() if is_partitioned() else {}
+
+    # Месяцы с просроченными данными: устаревшие секции и месяцы, где остались строки
+    months = set(month for month in partitions if month < cutoff)
+    months.update(
+        month_start(month) for month in
+        PageView.objects.filter(timestamp__lt=cutoff).dates('timestamp', 'month')
+    )
+    compacted = sorted(months)
+    if dry_run:
+        return compacted
+
+    for month in compacted:
+        next_month = add_months(month, 1)
+        last_day = min(next_month, cutoff).toordinal() - 1
+        # Пересчёт читает только секцию этого месяца (условие по timestamp)
+        refresh_range(month, date.fromordinal(last_day), respect_retention=False)
+
+        with transaction.atomic():
+            if month in partitions:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE "{partitions[month]}"')
+            # Остатки месяца в DEFAULT-секции или в обычной таблице
+            PageView.objects.filter(
+                timestamp__gte=datetime.combine(month, datetime.min.time()),
+                timestamp__lt=datetime.combine(min(next_month, cutoff), datetime.min.time()),
+            ).delete()
+        logger.info("Просмотры за %s свёрнуты в агрегаты и удалены", month.strftime('%Y-%m'))
+    return compacted
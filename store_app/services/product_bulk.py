@@ -0,0 +1,199 @@
+# Массовые операции с товарами из панели менеджера: удаление, снятие с продажи и возврат,
+# изменение цен. Журнал действий пишется одним bulk_create (со старым и новым значением
+# по каждому товару), сами товары меняются одним UPDATE или удалением по queryset
+# в транзакции. Обработчики сигналов товара на время операции отключаются (bulk_operation),
+# а производные данные - поисковые индексы, фасеты, версия кэша каталога, счётчики
+# избранного - обновляются один раз на всю пачку. Ссылки на файлы изображений
+# снимаются в той же транзакции, сами файлы удаляет сборщик мусора (services.media_blobs).
+import threading
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from store_app.models import ActionLog, Product
+from store_app.services import (
+    catalog_cache, catalog_facets, favorites, media_blobs, product_search, search_suggestions,
+)
+
+MIN_PRICE = Decimal('0.01')
+# Наибольшая цена, которая помещается в Product.price (max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('99999999.99')
+# Множитель процентного изменения передаётся в БД как DecimalField(max_digits=12, decimal_places=6)
+MAX_FACTOR = Decimal('999999.999999')
+LOG_BATCH_SIZE = 1000
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_operation():
+    """Внутри блока сигналы товара не обновляют производные данные по одному товару"""
+    previous = in_bulk_operation()
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def in_bulk_operation():
+    return getattr(_state, 'active', False)
+
+
+def products_deleted(product_ids):
+    """Обновляет производные данные каталога после удаления пачки товаров"""
+    for product_id in product_ids:
+        product_search.unindex_product(product_id)
+        search_suggestions.product_deleted(product_id)
+    catalog_facets.invalidate_facets()
+    catalog_cache.bump_catalog_version()
+
+
+def delete_products(user, product_ids):
+    """
+    Удаляет товары с записью в журнал действий.
+    Возвращает число удалённых товаров.
+    """
+    with transaction.atomic():
+        products = list(Product.objects.filter(id__in=product_ids).only('id', 'name', 'image'))
+        if not products:
+            return 0
+        ids = [product.id for product in products]
+
+        ActionLog.objects.bulk_create([
+            ActionLog(
+                user=user,
+                action_type='DELETE',
+                product_name=product.name,
+                product_id=product.id,
+                details=f"Товар удален: {product.name}",
+            )
+            for product in products
+        ])
+
+        favorites.products_deleting(ids)
+        with bulk_operation():
+            Product.objects.filter(id__in=ids).delete()
+
+        media_blobs.release([product.image.name for product in products if product.image])
+
+    products_deleted(ids)
+    return len(products)
+
+
+def products_updated(rows):
+    """Обновляет производные данные каталога после UPDATE пачки товаров (id, название, доступен)"""
+    for product_id, name, available in rows:
+        if available:
+            search_suggestions.product_saved(Product(pk=product_id, name=name, available=True))
+        else:
+            search_suggestions.product_deleted(product_id)
+    catalog_facets.invalidate_facets()
+    catalog_cache.bump_catalog_version()
+
+
+def _log_changes(user, action_type, changes, field, details):
+    """Журнал пачкой: changes - [(id, название, старое значение, новое значение)]"""
+    ActionLog.objects.bulk_create([
+        ActionLog(
+            user=user,
+            action_type=action_type,
+            product_name=name,
+            product_id=product_id,
+            changed_fields={field: {'old': str(old), 'new': str(new)}},
+            details=details,
+        )
+        for product_id, name, old, new in changes
+    ], batch_size=LOG_BATCH_SIZE)
+
+
+def set_availability(user, products, available):
+    """
+    Снимает товары queryset с продажи (available=False) или возвращает в продажу.
+    Меняются и попадают в журнал только товары, у которых статус действительно меняется.
+    Возвращает число изменённых товаров.
+    """
+    with transaction.atomic():
+        changing = products.filter(available=not available).order_by().select_for_update()
+        rows = list(changing.values_list('id', 'name'))
+        if not rows:
+            return 0
+        ids = [product_id for product_id, _ in rows]
+        Product.objects.filter(id__in=ids).update(available=available, updated_at=timezone.now())
+
+        if available:
+            action_type, details = 'ACTIVATE', 'Товар возвращён в продажу'
+        else:
+            action_type, details = 'DEACTIVATE', 'Товар снят с продажи'
+        _log_changes(user, action_type, [
+            (product_id, name, not available, available) for product_id, name in rows
+        ], 'available', details)
+
+    products_updated([(product_id, name, available) for product_id, name in rows])
+    return len(rows)
+
+
+def change_prices(user, products, price=None, percent=None):
+    """
+    Устанавливает товарам queryset цену price или меняет цену на percent процентов
+    (округление до копеек, не ниже MIN_PRICE). Возвращает число изменённых товаров.
+    """
+    if (price is None) == (percent is None):
+        raise ValueError('Укажите либо новую цену, либо процент изменения')
+    try:
+        price = Decimal(price) if price is not None else None
+        percent = Decimal(percent) if percent is not None else None
+    except (InvalidOperation, TypeError):
+        raise ValueError('Некорректное число')
+    # NaN и бесконечность создаются без ошибки, но ломают сравнения и quantize
+    if any(value is not None and not value.is_finite() for value in (price, percent)):
+        raise ValueError('Некорректное число')
+
+    factor = None
+    if price is not None:
+        if price > MAX_PRICE:
+            raise ValueError(f'Цена не может быть больше {MAX_PRICE}')
+        price = price.quantize(Decimal('0.01'))
+        if price < MIN_PRICE:
+            raise ValueError('Цена должна быть положительной')
+        new_price = Value(price, output_field=DecimalField(max_digits=10, decimal_places=2))
+        details = f"Цена установлена: {price}"
+    else:
+        if percent <= -100:
+            raise ValueError('Цену нельзя уменьшить на 100% и более')
+        if percent > (MAX_FACTOR - 1) * 100:
+            raise ValueError('Слишком большой процент изменения')
+        factor = (1 + percent / 100).quantize(Decimal('0.000001'))
+        new_price = Greatest(
+            Round(F('price') * Value(factor, output_field=DecimalField(max_digits=12, decimal_places=6)), 2,
+                  output_field=DecimalField(max_digits=10, decimal_places=2)),
+            Value(MIN_PRICE, output_field=DecimalField(max_digits=10, decimal_places=2)),
+        )
+        details = f"Цена изменена на {percent}%"
+
+    with transaction.atomic():
+        selected = products.order_by().select_for_update()
+        old_prices = {product_id: (name, old) for product_id, name, old in selected.values_list('id', 'name', 'price')}
+        if not old_prices:
+            return 0
+        if factor is not None:
+            highest = max(old for _, old in old_prices.values())
+            if (highest * factor).quantize(Decimal('0.01')) > MAX_PRICE:
+                raise ValueError(f'Новая цена превысит {MAX_PRICE}')
+        updated = Product.objects.filter(id__in=old_prices)
+        updated.update(price=new_price, updated_at=timezone.now())
+
+        changes = [
+            (product_id, old_prices[product_id][0], old_prices[product_id][1], new)
+            for product_id, new in updated.values_list('id', 'price')
+            if new != old_prices[product_id][1]
+        ]
+        _log_changes(user, 'PRICE', changes, 'price', details)
+
+    catalog_facets.invalidate_facets()
+    catalog_cache.bump_catalog_version()
+    return len(changes)
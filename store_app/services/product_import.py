@@ -0,0 +1,287 @@
+# Импорт товаров из CSV или XLSX.
+# Файл читается построчно (CSV - через csv.reader по потоку, XLSX - openpyxl в режиме
+# read_only), каждая строка проверяется формой ProductImportRowForm, категория и филиал
+# ищутся в словарях, загруженных один раз из кэша справочников. Товары пишутся пачками через
+# bulk_create(update_conflicts=True): совпадение (название, филиал) обновляет товар.
+# Производные данные каталога (поиск, подсказки, фасеты, кэш страниц) обновляются по пачкам.
+import csv
+import io
+import logging
+import time
+import zipfile
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from store_app.forms.product_import_form import ProductImportRowForm
+from store_app.models import Product
+from store_app.services import (
+    catalog_cache, catalog_facets, product_search, reference_data, search_suggestions, slugs,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Названия колонок: внутреннее имя -> допустимые заголовки (в нижнем регистре).
+# Русские заголовки совпадают с выгрузкой CSV из панели менеджера
+COLUMN_ALIASES = {
+    'name': ('name', 'название', 'название товара'),
+    'category': ('category', 'категория'),
+    'store': ('store', 'филиал', 'магазин'),
+    'city': ('city', 'город'),
+    'address': ('address', 'адрес', 'адрес филиала'),
+    'price': ('price', 'цена'),
+    'description': ('description', 'описание'),
+    'available': ('available', 'доступен', 'в наличии'),
+    'external_url': ('external_url', 'url', 'ссылка', 'ссылка на товар'),
+}
+
+# Значения колонки доступности, означающие "нет"; пустое значение - доступен
+FALSE_VALUES = ('0', 'false', 'no', 'нет', '-', 'нет в наличии')
+
+# Обновляются всегда; необязательные колонки (OPTIONAL_FIELDS) - только если они есть в файле,
+# иначе файл с одними ценами стёр бы описание, ссылку и наличие
+UPDATE_FIELDS = ['category', 'price', 'updated_at']
+OPTIONAL_FIELDS = ['description', 'available', 'external_url']
+
+
+class ImportReport:
+    """Итоги импорта: сохранённые строки, ошибки по номерам строк, скорость"""
+
+    def __init__(self):
+        self.rows = 0
+        self.saved = 0
+        self.errors = []          # [(номер строки, сообщение)]
+        self.error_count = 0
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else self.rows
+
+    def summary(self):
+        return (f"Строк: {self.rows}, сохранено: {self.saved}, ошибок: {self.error_count}, "
+                f"{self.seconds:.1f} с ({self.rows_per_second} строк/с)")
+
+
+def _normalize_key(value):
+    return ' '.join(str(value or '').lower().replace('ё', 'е').split())
+
+
+def _map_header(header):
+    """Номер колонки для каждого известного поля"""
+    columns = {}
+    for position, title in enumerate(header):
+        title = _normalize_key(title)
+        for field, aliases in COLUMN_ALIASES.items():
+            if title in aliases and field not in columns:
+                columns[field] = position
+    missing = [field for field in ('name', 'category', 'price') if field not in columns]
+    if missing:
+        raise ValueError(f"В заголовке нет колонок: {', '.join(missing)}")
+    if 'store' not in columns and not ('city' in columns and 'address' in columns):
+        raise ValueError("В заголовке нет колонки филиала (store или city и address)")
+    return columns
+
+
+def iter_csv_rows(file):
+    """Строки CSV-файла (байтовый поток) по одной; разделитель определяется по началу файла"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(file):
+    """Строки первого листа XLSX по одной (openpyxl в режиме потокового чтения)"""
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+        raise ValueError('Файл XLSX повреждён или не является книгой Excel')
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_rows(file, name):
+    if name.lower().endswith('.xlsx'):
+        return iter_xlsx_rows(file)
+    return iter_csv_rows(file)
+
+
+class ProductImporter:
+    """Импорт потока строк (первая строка - заголовок) от имени менеджера"""
+
+    def __init__(self, manager, batch_size=DEFAULT_BATCH_SIZE):
+        self.manager = manager
+        self.batch_size = batch_size
+        self.update_fields = UPDATE_FIELDS
+        self.categories = {
+            _normalize_key(category['name']): category['id'] for category in reference_data.categories()
+        }
+        self.stores = {}
+        for store in reference_data.stores():
+            self.stores[str(store['id'])] = store['id']
+            self.stores[_normalize_key(f"{store['city']}, {store['address']}")] = store['id']
+
+    def run(self, rows):
+        report = ImportReport()
+        rows = iter(rows)
+        try:
+            columns = _map_header(next(rows))
+            self.update_fields = UPDATE_FIELDS + [field for field in OPTIONAL_FIELDS if field in columns]
+        except StopIteration:
+            report.add_error(1, 'Файл пуст')
+            return report.finish()
+        except ValueError as e:
+            report.add_error(1, str(e))
+            return report.finish()
+
+        batch = {}
+        for line, row in enumerate(rows, start=2):
+            if not any(str(value).strip() for value in row):
+                continue
+            report.rows += 1
+            product = self._build(row, columns, line, report)
+            if product is None:
+                continue
+            # Повтор (название, филиал) в одной пачке - побеждает последняя строка
+            batch[(product.name, product.store_id)] = product
+            if len(batch) >= self.batch_size:
+                report.saved += self._save(list(batch.values()))
+                batch = {}
+        if batch:
+            report.saved += self._save(list(batch.values()))
+
+        report.finish()
+        logger.info("Импорт товаров: %s", report.summary())
+        return report
+
+    def _value(self, row, columns, field):
+        position = columns.get(field)
+        if position is None or position >= len(row):
+            return ''
+        return str(row[position]).strip()
+
+    def _build(self, row, columns, line, report):
+        category_id = self.categories.get(_normalize_key(self._value(row, columns, 'category')))
+        if 'store' in columns:
+            store_key = self._value(row, columns, 'store')
+        else:
+            store_key = f"{self._value(row, columns, 'city')}, {self._value(row, columns, 'address')}"
+        store_id = self.stores.get(store_key) or self.stores.get(_normalize_key(store_key))
+
+        available = _normalize_key(self._value(row, columns, 'available'))
+        data = {
+            'name': self._value(row, columns, 'name'),
+            'description': self._value(row, columns, 'description'),
+            'price': self._value(row, columns, 'price').replace(' ', '').replace(',', '.'),
+            'available': 'False' if available in FALSE_VALUES else 'True',
+            'external_url': self._value(row, columns, 'external_url'),
+        }
+        form = ProductImportRowForm(data)
+        errors = []
+        if not form.is_valid():
+            errors = [f"{field}: {' '.join(messages)}" for field, messages in form.errors.items()]
+        if category_id is None:
+            errors.append(f"category: категория «{self._value(row, columns, 'category')}» не найдена")
+        if store_id is None:
+            errors.append(f"store: филиал «{store_key}» не найден")
+        if errors:
+            report.add_error(line, '; '.join(errors))
+            return None
+
+        product = form.save(commit=False)
+        product.category_id = category_id
+        product.store_id = store_id
+        product.created_by = self.manager
+        product.updated_at = timezone.now()
+        return product
+
+    def _save(self, products):
+        # Слаг, выданный пачке, может успеть занять параллельное сохранение -
+        # тогда пачка откатывается и слаги подбираются заново
+        for attempt in range(1, slugs.MAX_ATTEMPTS + 1):
+            try:
+                saved = self._save_batch(products)
+                break
+            except IntegrityError:
+                if attempt == slugs.MAX_ATTEMPTS:
+                    raise
+
+        # Индексы в памяти процесса перестроятся при следующем обращении
+        product_search.reset_inverted_index()
+        search_suggestions.reset_suggestion_index()
+        # Если импорт идёт внутри внешней транзакции - только после её фиксации
+        transaction.on_commit(catalog_facets.invalidate_facets)
+        transaction.on_commit(catalog_cache.bump_catalog_version)
+        return saved
+
+    def _save_batch(self, products):
+        with transaction.atomic():
+            # Существующие товары сохраняют свой слаг, новым подбирается свободный
+            existing = self._existing_slugs(products)
+            new = []
+            for product in products:
+                product.slug = existing.get((product.name, product.store_id)) or ''
+                if not product.slug:
+                    new.append(product)
+            bases = [slugs.slug_base(Product, product.name) or 'product' for product in new]
+            for product, slug in zip(new, slugs.allocate_slugs(Product, bases)):
+                product.slug = slug
+
+            saved = Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['name', 'store'],
+                update_fields=self.update_fields,
+            )
+            ids = [product.pk for product in saved if product.pk]
+            if ids:
+                product_search.update_search_vectors(Product.objects.filter(pk__in=ids))
+        return len(saved)
+
+    def _existing_slugs(self, products):
+        """Слаги уже существующих товаров пачки: (название, филиал) -> slug"""
+        names = {product.name for product in products}
+        stores = {product.store_id for product in products}
+        return {
+            (name, store_id): slug
+            for name, store_id, slug in Product.objects.filter(name__in=names, store_id__in=stores)
+            .values_list('name', 'store_id', 'slug')
+        }
+
+
+def import_products(file, name, manager, batch_size=DEFAULT_BATCH_SIZE):
+    """Импортирует товары из загруженного файла (CSV или XLSX). Возвращает ImportReport"""
+    importer = ProductImporter(manager, batch_size=batch_size)
+    try:
+        return importer.run(iter_rows(file, name))
+    except ValueError as e:
+        report = ImportReport()
+        report.add_error(1, str(e))
+        return report.finish()
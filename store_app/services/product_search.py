@@ -0,0 +1,236 @@
+# Полнотекстовый поиск по каталогу товаров.
+# На PostgreSQL у товара хранится взвешенный tsvector (Product.search_vector, словарь 'russian'):
+# название - вес A, категория - B, описание - C. Вектор пересчитывается сигналами при сохранении
+# товара и категории, поиск идёт по GIN-индексу и сортируется по ts_rank.
+# На других СУБД (SQLite в разработке и тестах) используется инвертированный индекс в памяти
+# процесса: слово -> {id товара: вес}. Префиксы слов ищутся бинарным поиском по отсортированному
+# словарю, поэтому время поиска не зависит от размера каталога.
+import logging
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast
+
+from store_app.models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'russian'
+
+# Веса полей для индекса в памяти - те же, что ts_rank по умолчанию даёт весам A, B, C
+WEIGHT_NAME = 1.0
+WEIGHT_CATEGORY = 0.4
+WEIGHT_DESCRIPTION = 0.2
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре (ё приравнивается к е)"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def use_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector_expression():
+    """Выражение взвешенного tsvector товара (для UPDATE по queryset)"""
+    category_name = Subquery(
+        Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """
+    Пересчитывает search_vector у товаров queryset одним UPDATE.
+    Нужен после массовых операций (bulk_create, update), которые не вызывают сигналы.
+    """
+    if not use_postgres():
+        return 0
+    return queryset.order_by().update(search_vector=search_vector_expression())
+
+
+class InvertedIndex:
+    """Инвертированный индекс товаров в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}    # слово -> {id товара: вес}
+        self._tokens = []      # отсортированный список слов для поиска по префиксу
+        self._documents = {}   # id товара -> слова, под которыми он записан
+        self.built = False
+
+    def build(self, rows):
+        """Строит индекс заново из строк (id, название, описание, название категории)"""
+        with self._lock:
+            self._postings = {}
+            self._documents = {}
+            for product_id, name, description, category_name in rows:
+                self._add(product_id, name, description, category_name)
+            self._tokens = sorted(self._postings)
+            self.built = True
+
+    def add(self, product_id, name, description, category_name):
+        with self._lock:
+            self._remove(product_id)
+            for token in self._add(product_id, name, description, category_name):
+                if len(self._postings[token]) == 1:
+                    insort(self._tokens, token)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._tokens = []
+            self._documents = {}
+            self.built = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    def search(self, terms):
+        """
+        Товары, в которых есть слова, начинающиеся с каждого из terms.
+        Возвращает {id товара: релевантность}
+        """
+        with self._lock:
+            result = None
+            for term in terms:
+                scores = {}
+                position = bisect_left(self._tokens, term)
+                while position < len(self._tokens) and self._tokens[position].startswith(term):
+                    for product_id, weight in self._postings[self._tokens[position]].items():
+                        if weight > scores.get(product_id, 0):
+                            scores[product_id] = weight
+                    position += 1
+
+                if result is None:
+                    result = scores
+                else:
+                    result = {
+                        product_id: score + scores[product_id]
+                        for product_id, score in result.items() if product_id in scores
+                    }
+                if not result:
+                    return {}
+            return result or {}
+
+    def _add(self, product_id, name, description, category_name):
+        weights = {}
+        for text, weight in ((description, WEIGHT_DESCRIPTION),
+                             (category_name, WEIGHT_CATEGORY),
+                             (name, WEIGHT_NAME)):
+            for token in tokenize(text):
+                weights[token] = max(weight, weights.get(token, 0))
+
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[product_id] = weight
+        self._documents[product_id] = tuple(weights)
+        return weights
+
+    def _remove(self, product_id):
+        for token in self._documents.pop(product_id, ()):
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._tokens, token)
+                if position < len(self._tokens) and self._tokens[position] == token:
+                    del self._tokens[position]
+
+
+_index = InvertedIndex()
+_build_lock = threading.Lock()
+
+
+def get_inverted_index():
+    """Индекс процесса; строится одним запросом при первом поиске"""
+    if not _index.built:
+        with _build_lock:
+            if not _index.built:
+                rows = Product.objects.order_by().values_list(
+                    'id', 'name', 'description', 'category__name'
+                ).iterator(chunk_size=2000)
+                _index.build(rows)
+                logger.info("Поисковый индекс товаров построен: %s шт.", len(_index))
+    return _index
+
+
+def reset_inverted_index():
+    """Сбрасывает индекс процесса - он будет перестроен при следующем поиске"""
+    _index.clear()
+
+
+def index_product(product):
+    """Обновляет поисковые данные товара после сохранения"""
+    if use_postgres():
+        update_search_vectors(Product.objects.filter(pk=product.pk))
+    elif _index.built:
+        _index.add(product.pk, product.name, product.description, product.category.name)
+
+
+def unindex_product(product_id):
+    if not use_postgres() and _index.built:
+        _index.remove(product_id)
+
+
+def reindex_category(category):
+    """После переименования категории обновляет товары этой категории"""
+    products = Product.objects.filter(category=category)
+    if use_postgres():
+        update_search_vectors(products)
+    elif _index.built:
+        for product_id, name, description in products.values_list('id', 'name', 'description'):
+            _index.add(product_id, name, description, category.name)
+
+
+def _no_results(queryset):
+    # Пустой результат с той же аннотацией, чтобы по нему можно было сортировать
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+
+def search_products(queryset, query):
+    """
+    Фильтрует queryset товаров по поисковой строке и сортирует по релевантности.
+    Каждое слово запроса ищется как префикс слова в названии, категории или описании.
+    Результат аннотирован полем search_rank.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return _no_results(queryset)
+
+    if use_postgres():
+        # Слова состоят только из \w, поэтому безопасны для синтаксиса to_tsquery
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG
+        )
+        # ts_rank возвращает real; double precision точно переносится в курсор и обратно
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), search_query), FloatField()),
+        ).order_by('-search_rank', 'name', 'id')
+
+    scores = get_inverted_index().search(terms)
+    if not scores:
+        return _no_results(queryset)
+    return queryset.filter(pk__in=scores).annotate(
+        search_rank=Case(
+            *[When(pk=product_id, then=Value(score)) for product_id, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    ).order_by('-search_rank', 'name', 'id')
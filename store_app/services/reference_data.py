@@ -0,0 +1,45 @@
+# Справочные данные каталога для фильтров и выпадающих списков: категории, филиалы, города.
+# Меняются редко, а нужны почти каждой странице (buy_page, панель менеджера, форма товара),
+# поэтому читаются через двухуровневый кэш (services.tiered_cache). Сигналы сохранения и
+# удаления Category и Store увеличивают версию пространства имён.
+# Значения - словари, а не объекты моделей: их безопасно делить между запросами и потоками.
+from store_app.models import Category, Store
+from store_app.services.tiered_cache import get_tiered_cache
+
+NAMESPACE = 'reference'
+
+
+def categories():
+    """Категории по названию: [{'id', 'name', 'slug'}]"""
+    return get_tiered_cache().get_or_set_versioned(
+        NAMESPACE, 'categories',
+        lambda: list(Category.objects.order_by('name').values('id', 'name', 'slug')),
+    )
+
+
+def stores():
+    """Все филиалы по городу и адресу: [{'id', 'city', 'address', 'is_active'}]"""
+    return get_tiered_cache().get_or_set_versioned(
+        NAMESPACE, 'stores',
+        lambda: list(Store.objects.order_by('city', 'address').values('id', 'city', 'address', 'is_active')),
+    )
+
+
+def cities():
+    """Города, в которых есть филиалы, по алфавиту"""
+    return sorted({store['city'] for store in stores()})
+
+
+def category_choices():
+    """Варианты для поля категории формы товара: [(id, название)]"""
+    return [(category['id'], category['name']) for category in categories()]
+
+
+def store_choices():
+    """Варианты для поля филиала формы товара: [(id, "Город, адрес")]"""
+    return [(store['id'], f"{store['city']}, {store['address']}") for store in stores()]
+
+
+def invalidate_reference_data():
+    """Вызывается сигналами при изменении категорий и филиалов"""
+    get_tiered_cache().bump_version(NAMESPACE)
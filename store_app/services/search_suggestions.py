@@ -0,0 +1,235 @@
+# Подсказки поиска из памяти процесса.
+# Названия доступных товаров и категорий хранятся в отсортированных массивах ключей;
+# подсказки по префиксу ищутся бинарным поиском (bisect) без обращения к БД.
+# Ключи - хвосты названия с начала каждого слова ("apple iphone 15", "iphone 15", "15"),
+# поэтому подсказка находится и по слову из середины названия.
+# Индекс строится один раз на процесс и обновляется сигналами сохранения/удаления.
+# Изменения из других процессов подхватываются полной перестройкой раз в
+# SEARCH_SUGGESTIONS_REBUILD_INTERVAL секунд.
+import logging
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from store_app.models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REBUILD_INTERVAL = 600  # сек
+PRODUCTS_LIMIT = 10
+CATEGORIES_LIMIT = 5
+
+_WORD_START_RE = re.compile(r'(?:^|(?<=\s))\S')
+
+
+def normalize(text):
+    """Нижний регистр, ё как е, одиночные пробелы"""
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+def suggestion_keys(name):
+    """Хвосты нормализованного названия, начинающиеся с каждого слова"""
+    normalized = normalize(name)
+    return {normalized[match.start():] for match in _WORD_START_RE.finditer(normalized)}
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей (ключ, id) с поиском по префиксу"""
+
+    def __init__(self):
+        self._entries = []   # [(ключ, id)] по возрастанию
+        self._names = {}     # id -> отображаемое название
+
+    def build(self, items):
+        self._names = dict(items)
+        self._entries = sorted(
+            (key, object_id) for object_id, name in self._names.items() for key in suggestion_keys(name)
+        )
+
+    def add(self, object_id, name):
+        if self._names.get(object_id) == name:
+            return
+        self.remove(object_id)
+        self._names[object_id] = name
+        for key in suggestion_keys(name):
+            insort(self._entries, (key, object_id))
+
+    def remove(self, object_id):
+        name = self._names.pop(object_id, None)
+        if name is None:
+            return
+        for key in suggestion_keys(name):
+            position = bisect_left(self._entries, (key, object_id))
+            if position < len(self._entries) and self._entries[position] == (key, object_id):
+                del self._entries[position]
+
+    def lookup(self, prefix, limit):
+        """До limit объектов, у которых слово названия начинается с prefix: [(id, название)]"""
+        found = {}
+        position = bisect_left(self._entries, (prefix,))
+        while len(found) < limit and position < len(self._entries):
+            key, object_id = self._entries[position]
+            if not key.startswith(prefix):
+                break
+            if object_id not in found:
+                found[object_id] = self._names[object_id]
+            position += 1
+        return list(found.items())
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def entry_count(self):
+        return len(self._entries)
+
+    def memory_bytes(self):
+        """Приблизительный объём памяти массивов, ключей и названий"""
+        total = sys.getsizeof(self._entries) + sys.getsizeof(self._names)
+        for entry in self._entries:
+            total += sys.getsizeof(entry) + sys.getsizeof(entry[0])
+        for name in self._names.values():
+            total += sys.getsizeof(name)
+        return total
+
+
+class SuggestionIndex:
+    """Индексы подсказок по товарам и категориям одного процесса"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.products = PrefixIndex()
+        self.categories = PrefixIndex()
+        self.built_at = None
+        self.build_seconds = 0.0
+
+    @property
+    def built(self):
+        return self.built_at is not None
+
+    def build(self):
+        """Перестраивает индекс из БД: по одному запросу на товары и категории"""
+        started = time.monotonic()
+        products = PrefixIndex()
+        products.build(
+            Product.objects.filter(available=True).order_by().values_list('id', 'name')
+            .iterator(chunk_size=2000)
+        )
+        categories = PrefixIndex()
+        categories.build(Category.objects.order_by().values_list('id', 'name'))
+
+        with self._lock:
+            self.products = products
+            self.categories = categories
+            self.built_at = time.monotonic()
+            self.build_seconds = self.built_at - started
+        logger.info(
+            "Индекс подсказок построен за %.3f с: товаров %s, категорий %s",
+            self.build_seconds, len(products), len(categories),
+        )
+
+    def clear(self):
+        with self._lock:
+            self.products = PrefixIndex()
+            self.categories = PrefixIndex()
+            self.built_at = None
+
+    def suggest(self, query, products_limit=PRODUCTS_LIMIT, categories_limit=CATEGORIES_LIMIT):
+        prefix = normalize(query)
+        with self._lock:
+            products = self.products.lookup(prefix, products_limit) if prefix else []
+            categories = self.categories.lookup(prefix, categories_limit) if prefix else []
+        return {
+            'products': [{'id': object_id, 'name': name} for object_id, name in products],
+            'categories': [{'id': object_id, 'name': name} for object_id, name in categories],
+        }
+
+    def update_product(self, product):
+        with self._lock:
+            if product.available:
+                self.products.add(product.pk, product.name)
+            else:
+                self.products.remove(product.pk)
+
+    def remove_product(self, product_id):
+        with self._lock:
+            self.products.remove(product_id)
+
+    def update_category(self, category):
+        with self._lock:
+            self.categories.add(category.pk, category.name)
+
+    def remove_category(self, category_id):
+        with self._lock:
+            self.categories.remove(category_id)
+
+    def stats(self):
+        """Размер индекса для мониторинга"""
+        with self._lock:
+            return {
+                'built': self.built,
+                'products': len(self.products),
+                'categories': len(self.categories),
+                'entries': self.products.entry_count + self.categories.entry_count,
+                'memory_bytes': self.products.memory_bytes() + self.categories.memory_bytes(),
+                'build_seconds': round(self.build_seconds, 4),
+                'age_seconds': round(time.monotonic() - self.built_at, 1) if self.built else None,
+            }
+
+
+_index = SuggestionIndex()
+_build_lock = threading.Lock()
+
+
+def _is_stale():
+    interval = getattr(settings, 'SEARCH_SUGGESTIONS_REBUILD_INTERVAL', DEFAULT_REBUILD_INTERVAL)
+    return bool(interval) and time.monotonic() - _index.built_at > interval
+
+
+def get_suggestion_index():
+    """Индекс процесса; строится при первом обращении и периодически перестраивается"""
+    if not _index.built or _is_stale():
+        with _build_lock:
+            if not _index.built or _is_stale():
+                _index.build()
+    return _index
+
+
+def rebuild_suggestion_index():
+    with _build_lock:
+        _index.build()
+    return _index
+
+
+def reset_suggestion_index():
+    _index.clear()
+
+
+def suggest(query):
+    return get_suggestion_index().suggest(query)
+
+
+# Обновления из сигналов: если индекс ещё не построен, он прочитает актуальные данные сам
+
+def product_saved(product):
+    if _index.built:
+        _index.update_product(product)
+
+
+def product_deleted(product_id):
+    if _index.built:
+        _index.remove_product(product_id)
+
+
+def category_saved(category):
+    if _index.built:
+        _index.update_category(category)
+
+
+def category_deleted(category_id):
+    if _index.built:
+        _index.remove_category(category_id)
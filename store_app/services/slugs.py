@@ -0,0 +1,92 @@
+# Подбор уникальных слагов для товаров и категорий.
+# Вместо цикла "exists() на каждый суффикс" все занятые варианты base, base-1, base-2...
+# читаются одним запросом, а свободный суффикс выбирается в памяти. Гонку двух
+# одновременных сохранений ловит уникальный индекс: при IntegrityError по слагу
+# подбор повторяется. Для импорта слаги выдаются пачкой - один запрос на группу оснований.
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+SUFFIX_RESERVE = 5        # место под "-NNNN" в пределах max_length поля
+MAX_ATTEMPTS = 5
+BASES_PER_QUERY = 200
+
+
+def slug_base(model, name):
+    """Основа слага: slugify названия с запасом длины под суффикс"""
+    max_length = model._meta.get_field('slug').max_length
+    return slugify(name)[:max_length - SUFFIX_RESERVE]
+
+
+def _make_slug(base, number):
+    return f'{base}-{number}' if number else base
+
+
+def _candidates_q(base):
+    """Слаги вида base и base-N (LIKE по префиксу идёт по индексу слага)"""
+    pattern = rf'^{re.escape(base)}-[0-9]+$'
+    return Q(slug=base) | Q(slug__startswith=f'{base}-', slug__regex=pattern)
+
+
+def _taken_numbers(model, bases):
+    """Занятые номера суффиксов по основаниям: base -> {0 (сам base), N (base-N), ...}"""
+    taken = {base: set() for base in bases}
+    bases = list(taken)
+    for start in range(0, len(bases), BASES_PER_QUERY):
+        condition = Q()
+        for base in bases[start:start + BASES_PER_QUERY]:
+            condition |= _candidates_q(base)
+        for slug in model._default_manager.filter(condition).values_list('slug', flat=True):
+            if slug in taken:
+                taken[slug].add(0)
+            prefix, _, suffix = slug.rpartition('-')
+            # "base-01" и "base-0" не совпадают ни с одним выдаваемым слагом
+            if prefix in taken and suffix.isdigit() and str(int(suffix)) == suffix:
+                taken[prefix].add(int(suffix))
+    return taken
+
+
+def allocate_slugs(model, bases):
+    """
+    Свободные слаги для списка оснований (по одному на элемент, без повторов внутри списка).
+    Выбирается наименьший свободный вариант: base, base-1, base-2...
+    """
+    taken = _taken_numbers(model, bases)
+    slugs = []
+    # Основание может само быть вариантом другого (phones-1 и phones), поэтому
+    # выданные слаги проверяются и по общему множеству
+    assigned = set()
+    for base in bases:
+        numbers = taken[base]
+        number = 0
+        while number in numbers or _make_slug(base, number) in assigned:
+            number += 1
+        numbers.add(number)
+        slug = _make_slug(base, number)
+        assigned.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def allocate_slug(model, name):
+    return allocate_slugs(model, [slug_base(model, name)])[0]
+
+
+def save_with_unique_slug(instance, save):
+    """
+    Сохраняет объект без слага (save - вызов сохранения модели), подобрав свободный слаг.
+    Если слаг успели занять между подбором и INSERT, подбор повторяется.
+    """
+    model = type(instance)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        instance.slug = allocate_slug(model, instance.name)
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            slug, instance.slug = instance.slug, ''
+            if attempt == MAX_ATTEMPTS or not model._default_manager.filter(slug=slug).exists():
+                raise
@@ -0,0 +1,64 @@
+# Реестр IP-адресов менеджеров и админов.
+# Раньше множество считалось DISTINCT-запросом по всей таблице PageView при каждом
+# обращении (в админке - на каждую строку списка). Теперь IP сохраняются в StaffIP,
+# когда middleware видит запрос менеджера/админа, а в памяти процесса держится
+# frozenset, который перечитывается из БД раз в ANALYTICS_STAFF_IPS_TTL секунд.
+import threading
+import time
+
+from django.conf import settings
+
+from store_app.models import StaffIP, User
+
+DEFAULT_TTL = 300  # сек
+
+STAFF_ROLES = (User.Role.MANAGER, User.Role.ADMIN)
+
+_staff_ips = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def is_staff_user(user):
+    """Считаются ли визиты пользователя визитами менеджера"""
+    return user.is_authenticated and (user.role in STAFF_ROLES or user.is_superuser)
+
+
+def get_staff_ips():
+    """Множество IP менеджеров и админов (frozenset, кэш процесса с TTL)"""
+    global _staff_ips, _loaded_at
+
+    ttl = getattr(settings, 'ANALYTICS_STAFF_IPS_TTL', DEFAULT_TTL)
+    staff_ips = _staff_ips
+    if staff_ips is not None and time.monotonic() - _loaded_at < ttl:
+        return staff_ips
+
+    with _lock:
+        if _staff_ips is None or time.monotonic() - _loaded_at >= ttl:
+            _staff_ips = frozenset(StaffIP.objects.values_list('ip_address', flat=True))
+            _loaded_at = time.monotonic()
+        return _staff_ips
+
+
+def register_staff_ip(ip_address):
+    """
+    Добавляет IP в реестр, если его там ещё нет. Пишет в БД только для новых
+    адресов, поэтому повторные запросы менеджера ничего не стоят.
+    """
+    global _staff_ips
+
+    if not ip_address or ip_address in get_staff_ips():
+        return False
+
+    StaffIP.objects.get_or_create(ip_address=ip_address)
+    with _lock:
+        _staff_ips = (_staff_ips or frozenset()) | {ip_address}
+    return True
+
+
+def invalidate_staff_ips():
+    """Сбрасывает кэш процесса; следующее обращение перечитает реестр из БД"""
+    global _staff_ips, _loaded_at
+    with _lock:
+        _staff_ips = None
+        _loaded_at = 0.0
@@ -0,0 +1,195 @@
+# Поиск ближайших филиалов.
+# Активные филиалы с координатами хранятся в k-d дереве в памяти процесса. Точки - единичные
+# векторы на сфере (x, y, z): евклидово расстояние между ними (хорда) монотонно по расстоянию
+# по поверхности, поэтому ближайшие по хорде - ближайшие и по дуге, без искажений у полюсов
+# и на 180-м меридиане. Расстояние для ответа считается по формуле гаверсинусов.
+# Дерево перестраивается при изменении филиалов и расписаний (та же версия, что у справочника филиалов).
+import heapq
+import math
+import threading
+
+from django.utils import timezone
+
+from store_app.models import Store
+from store_app.services.branch_directory import VERSION_KEY
+from store_app.services.catalog_cache import get_cache_version
+from store_app.services.store_schedule import is_open_at
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_RADIUS_KM = 20000
+
+
+def to_unit_vector(latitude, longitude):
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Расстояние по поверхности Земли между двумя точками, км"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _chord_squared(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+def _radius_to_chord_squared(radius_km):
+    angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def valid_coordinates(latitude, longitude):
+    return (latitude is not None and longitude is not None
+            and -90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0)
+
+
+class KDTree:
+    """k-d дерево по точкам в трёхмерном пространстве"""
+
+    def __init__(self, points):
+        # points: [(вектор, значение)]
+        self._root = self._build(list(points), 0)
+        self.size = len(points)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda point: point[0][axis])
+        middle = len(points) // 2
+        return (
+            points[middle],
+            axis,
+            self._build(points[:middle], depth + 1),
+            self._build(points[middle + 1:], depth + 1),
+        )
+
+    def nearest(self, target, k, accept=None):
+        """
+        k ближайших к target точек, удовлетворяющих accept(значение).
+        Возвращает [(квадрат хорды, значение)] по возрастанию расстояния.
+        """
+        heap = []  # max-куча по расстоянию: (-d2, счётчик, значение)
+        counter = 0
+
+        def visit(node):
+            nonlocal counter
+            if node is None:
+                return
+            (vector, value), axis, left, right = node
+            delta = target[axis] - vector[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+
+            visit(near)
+            if accept is None or accept(value):
+                distance = _chord_squared(target, vector)
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, counter, value))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, counter, value))
+                counter += 1
+            # Дальнее поддерево может содержать более близкие точки, только если
+            # секущая плоскость ближе текущего k-го результата
+            if len(heap) < k or delta * delta < -heap[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self._root)
+        return [(-distance, value) for distance, _, value in sorted(heap, reverse=True)]
+
+    def within(self, target, chord_squared):
+        """Все значения точек на расстоянии хорды не больше sqrt(chord_squared)"""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (vector, value), axis, left, right = node
+            if _chord_squared(target, vector) <= chord_squared:
+                found.append(value)
+            delta = target[axis] - vector[axis]
+            if delta <= 0 or delta * delta <= chord_squared:
+                stack.append(left)
+            if delta >= 0 or delta * delta <= chord_squared:
+                stack.append(right)
+        return found
+
+
+class StoreLocator:
+    """Снимок активных филиалов с координатами и k-d дерево по ним"""
+
+    def __init__(self, stores):
+        self.stores = {}
+        points = []
+        for store in stores:
+            if not valid_coordinates(store.latitude, store.longitude):
+                continue
+            self.stores[store.id] = store
+            points.append((to_unit_vector(store.latitude, store.longitude), store.id))
+        self.tree = KDTree(points)
+
+    def nearest(self, latitude, longitude, k=5, only_open=True, now=None):
+        """
+        k ближайших филиалов к точке. Возвращает [(филиал, расстояние в км, открыт ли)]
+        """
+        now = now or timezone.now()
+        accept = None
+        if only_open:
+            def accept(store_id):
+                return is_open_at(self.stores[store_id].schedule_intervals, now)
+
+        result = []
+        for _, store_id in self.tree.nearest(to_unit_vector(latitude, longitude), k, accept):
+            store = self.stores[store_id]
+            result.append((
+                store,
+                haversine_km(latitude, longitude, store.latitude, store.longitude),
+                is_open_at(store.schedule_intervals, now),
+            ))
+        return result
+
+    def within_radius(self, latitude, longitude, radius_km):
+        """id филиалов не дальше radius_km от точки"""
+        return self.tree.within(to_unit_vector(latitude, longitude), _radius_to_chord_squared(radius_km))
+
+
+def parse_location(params):
+    """
+    Точка и радиус из параметров запроса (lat, lon, radius в км).
+    Возвращает (широта, долгота, радиус) или None, если параметры не заданы или некорректны.
+    """
+    try:
+        latitude = float(params.get('lat'))
+        longitude = float(params.get('lon'))
+        radius = float(params.get('radius'))
+    except (TypeError, ValueError):
+        return None
+    if not valid_coordinates(latitude, longitude) or not 0 < radius <= MAX_RADIUS_KM:
+        return None
+    return latitude, longitude, radius
+
+
+_locator = None
+_locator_version = None
+_locator_lock = threading.Lock()
+
+
+def get_store_locator():
+    """Индекс процесса; перестраивается при изменении филиалов"""
+    global _locator, _locator_version
+    version = get_cache_version(VERSION_KEY)
+    if _locator is None or _locator_version != version:
+        with _locator_lock:
+            if _locator is None or _locator_version != version:
+                stores = Store.objects.filter(
+                    is_active=True, latitude__isnull=False, longitude__isnull=False,
+                ).only('id', 'city', 'address', 'phone', 'latitude', 'longitude', 'schedule_intervals')
+                _locator = StoreLocator(stores)
+                _locator_version = version
+    return _locator
@@ -0,0 +1,49 @@
+# Недельное расписание филиалов в виде интервалов.
+# Строки WorkingHours филиала сворачиваются в отсортированный список интервалов
+# [начало, конец] в секундах от понедельника 00:00 и сохраняются в Store.schedule_intervals.
+# Проверка "открыт ли сейчас" - бинарный поиск по этому списку без обращения к БД.
+from bisect import bisect_right
+from operator import itemgetter
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def build_intervals(working_hours):
+    """Интервалы работы из записей WorkingHours (выходные и неполные записи пропускаются)"""
+    intervals = []
+    for hours in working_hours:
+        if hours.is_closed or not hours.opening_time or not hours.closing_time:
+            continue
+        day_start = hours.day_of_week * SECONDS_PER_DAY
+        intervals.append([day_start + _seconds(hours.opening_time),
+                          day_start + _seconds(hours.closing_time)])
+    intervals.sort()
+    return intervals
+
+
+def week_second(moment):
+    """Секунда недели для момента времени"""
+    return moment.weekday() * SECONDS_PER_DAY + _seconds(moment.time())
+
+
+def is_open_at(intervals, moment):
+    """Попадает ли момент в один из интервалов (границы включительно)"""
+    if not intervals:
+        return False
+    second = week_second(moment)
+    position = bisect_right(intervals, second, key=itemgetter(0)) - 1
+    return position >= 0 and second <= intervals[position][1]
+
+
+def rebuild_store_schedule(store_id):
+    """Пересобирает интервалы филиала из его WorkingHours. Возвращает интервалы"""
+    from store_app.models import Store, WorkingHours
+
+    intervals = build_intervals(WorkingHours.objects.filter(store_id=store_id))
+    # update() вместо save(): не трогаем updated_at и сигналы сохранения филиала
+    Store.objects.filter(pk=store_id).update(schedule_intervals=intervals)
+    return intervals
@@ -0,0 +1,237 @@
+# Двухуровневый кэш: LRU с TTL в памяти процесса перед общим кэшем Django (CACHES).
+# Локальный уровень снимает для горячих ключей даже обращение к общему кэшу, общий -
+# делит вычисленное значение между процессами. При промахе значение вычисляет один поток
+# процесса и, через блокировку в общем кэше (cache.add), один процесс: остальные ждут
+# готового значения, а не идут в БД все разом.
+# Ключи версионируются по пространствам имён: bump_version делает старые значения
+# недостижимыми - в этом процессе сразу, в остальных не позже чем через LOCAL_TTL.
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from store_app.services.catalog_cache import bump_cache_version, get_cache_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ALIAS': 'default',          # общий кэш из CACHES
+    'LOCAL_MAX_ENTRIES': 1024,   # ключей в памяти процесса
+    'LOCAL_TTL': 5,              # сколько секунд значение живёт в памяти процесса
+    'TTL': 3600,                 # время жизни в общем кэше, сек
+    'LOCK_TIMEOUT': 10,          # блокировка вычисления в общем кэше, сек
+    'LOCK_WAIT': 5,              # сколько ждать значения, которое вычисляет другой процесс
+}
+
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+def get_tiered_cache_settings():
+    conf = dict(DEFAULT_SETTINGS)
+    conf.update(getattr(settings, 'TIERED_CACHE', {}))
+    return conf
+
+
+class LocalLRU:
+    """Потокобезопасный LRU со сроком жизни записей"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # ключ -> (истекает, значение)
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= now:
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """Кэш в памяти процесса перед общим кэшем с защитой от одновременного вычисления"""
+
+    def __init__(self, alias='default', local_max_entries=1024, local_ttl=5, ttl=3600,
+                 lock_timeout=10, lock_wait=5):
+        self.alias = alias
+        self.local = LocalLRU(local_max_entries)
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self._inflight = {}          # ключ -> Event вычисляющего потока
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """Счётчики попаданий для мониторинга"""
+        with self._stats_lock:
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'local_entries': len(self.local),
+            }
+
+    def _lookup(self, key):
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('shared_hits')
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        self.shared.set(key, value, self.ttl if ttl is None else ttl)
+        self.local.set(key, value, self.local_ttl)
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    def get_or_set(self, key, compute, ttl=None):
+        """
+        Значение ключа из памяти процесса или общего кэша; при промахе - compute().
+        Одновременные промахи по одному ключу вычисляются один раз.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Значение уже вычисляет другой поток процесса
+            event.wait(self.lock_wait)
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            self._count('misses')
+            return compute()
+
+        try:
+            return self._compute_once(key, compute, ttl)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _compute_once(self, key, compute, ttl):
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        if not self.shared.add(lock_key, token, self.lock_timeout):
+            # Значение вычисляет другой процесс - ждём его, но не дольше lock_wait
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                value = self.shared.get(key, _MISSING)
+                if value is not _MISSING:
+                    self._count('shared_hits')
+                    self.local.set(key, value, self.local_ttl)
+                    return value
+            logger.warning("Не дождались значения кэша %s, вычисляем сами", key)
+            token = None
+
+        self._count('misses')
+        try:
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            # Снимаем только свою блокировку: чужую, взятую после истечения нашей, не трогаем
+            if token is not None and self.shared.get(lock_key) == token:
+                self.shared.delete(lock_key)
+
+    def version(self, namespace):
+        """Версия пространства имён (в памяти процесса не дольше local_ttl)"""
+        version_key = f'{namespace}:version'
+        version = self.local.get(version_key)
+        if version is _MISSING:
+            version = get_cache_version(version_key, self.shared)
+            self.local.set(version_key, version, self.local_ttl)
+        return version
+
+    def bump_version(self, namespace):
+        """Делает недействительными все значения пространства имён"""
+        version_key = f'{namespace}:version'
+        self.local.delete(version_key)
+        return bump_cache_version(version_key, self.shared)
+
+    def get_or_set_versioned(self, namespace, key, compute, ttl=None):
+        return self.get_or_set(f'{namespace}:{self.version(namespace)}:{key}', compute, ttl)
+
+    def clear_local(self):
+        self.local.clear()
+
+
+_tiered_cache = None
+_tiered_cache_lock = threading.Lock()
+
+
+def get_tiered_cache():
+    global _tiered_cache
+    if _tiered_cache is None:
+        with _tiered_cache_lock:
+            if _tiered_cache is None:
+                conf = get_tiered_cache_settings()
+                _tiered_cache = TieredCache(
+                    alias=conf['ALIAS'],
+                    local_max_entries=conf['LOCAL_MAX_ENTRIES'],
+                    local_ttl=conf['LOCAL_TTL'],
+                    ttl=conf['TTL'],
+                    lock_timeout=conf['LOCK_TIMEOUT'],
+                    lock_wait=conf['LOCK_WAIT'],
+                )
+    return _tiered_cache
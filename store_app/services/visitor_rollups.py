@@ -0,0 +1,278 @@
+# Суточные агрегаты посещений (PageViewDailyRollup).
+# День пересчитывается целиком из сырых PageView одним сгруппированным запросом
+# по диапазону timestamp, поэтому стоимость зависит от трафика за день, а не от всей истории.
+# Текущий день обновляет путь записи просмотров (не чаще раза в ROLLUP_REFRESH_INTERVAL),
+# прошлые дни - команда rollup_pageviews.
+#
+# При ANALYTICS_APPROXIMATE_UNIQUES = True в каждой строке хранится скетч HyperLogLog
+# по сессиям: уникальные считаются приблизительно, без COUNT(DISTINCT), записанные пачки
+# вливаются в агрегаты инкрементально, а скетчи дней объединяются для любого периода.
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, Value, When, CharField
+from django.utils import timezone
+
+from store_app.models import PageView, PageViewDailyRollup
+from store_app.services.hyperloglog import DEFAULT_PRECISION, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 60  # сек
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def _visitor_class_expression(manager_ips):
+    """Тип посетителя по IP: менеджеры и админы отделяются так же, как в статистике"""
+    if not manager_ips:
+        return Value(PageViewDailyRollup.VisitorClass.CLIENT, output_field=CharField())
+    return Case(
+        When(ip_address__in=manager_ips, then=Value(PageViewDailyRollup.VisitorClass.MANAGER)),
+        default=Value(PageViewDailyRollup.VisitorClass.CLIENT),
+        output_field=CharField(),
+    )
+
+
+def use_sketches():
+    """Включён ли приблизительный подсчёт уникальных через HyperLogLog"""
+    return getattr(settings, 'ANALYTICS_APPROXIMATE_UNIQUES', False)
+
+
+def _sketch_precision():
+    return getattr(settings, 'ANALYTICS_HLL_PRECISION', DEFAULT_PRECISION)
+
+
+def _sketch_groups(rows, manager_ips):
+    """
+    Группирует строки (url, ip, session_key) по странице и типу посетителя,
+    плюс итог по сайту. Возвращает {(url, visitor_class): [просмотры, скетч]}
+    """
+    precision = _sketch_precision()
+    groups = {}
+    for url, ip_address, session_key in rows:
+        if ip_address in manager_ips:
+            visitor_class = PageViewDailyRollup.VisitorClass.MANAGER
+        else:
+            visitor_class = PageViewDailyRollup.VisitorClass.CLIENT
+
+        for key in ((url, visitor_class), (PageViewDailyRollup.SITE_TOTAL, visitor_class)):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, HyperLogLog(precision)]
+            group[0] += 1
+            group[1].add(session_key)
+    return groups
+
+
+def _sketch_rollups(day, page_views, manager_ips):
+    rows = page_views.values_list('url', 'ip_address', 'session_key').iterator(chunk_size=2000)
+    return [
+        PageViewDailyRollup(
+            date=day,
+            url=url,
+            visitor_class=visitor_class,
+            views=views,
+            unique_visitors=sketch.count(),
+            visitor_sketch=sketch.to_bytes(),
+        )
+        for (url, visitor_class), (views, sketch) in _sketch_groups(rows, set(manager_ips)).items()
+    ]
+
+
+def refresh_day(day, manager_ips=None):
+    """Пересчитывает агрегаты за один день. Возвращает число записанных строк"""
+    if manager_ips is None:
+        manager_ips = PageView.get_manager_ips()
+
+    start, end = _day_bounds(day)
+    page_views = PageView.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by()
+
+    if use_sketches():
+        rollups = _sketch_rollups(day, page_views, manager_ips)
+    else:
+        rollups = _exact_rollups(day, page_views, manager_ips)
+
+    with transaction.atomic():
+        PageViewDailyRollup.objects.filter(date=day).delete()
+        PageViewDailyRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def _exact_rollups(day, page_views, manager_ips):
+    page_views = page_views.annotate(visitor_class=_visitor_class_expression(manager_ips))
+
+    per_url = page_views.values('url', 'visitor_class').annotate(
+        views=Count('id'),
+        unique_visitors=Count('session_key', distinct=True),
+    )
+    site_totals = page_views.values('visitor_class').annotate(
+        views=Count('id'),
+        unique_visitors=Count('session_key', distinct=True),
+    )
+
+    # Без GROUP BY (тип посетителя - константа) агрегат пустого дня даёт строку с нулями
+    return [
+        PageViewDailyRollup(date=day, **row) for row in per_url
+    ] + [
+        PageViewDailyRollup(date=day, url=PageViewDailyRollup.SITE_TOTAL, **row)
+        for row in site_totals if row['views']
+    ]
+
+
+def refresh_range(start_day, end_day, respect_retention=True):
+    """
+    Пересчитывает агрегаты за каждый день диапазона включительно.
+    Дни раньше горизонта хранения пропускаются: их сырые просмотры уже свёрнуты
+    и удалены, пересчёт затёр бы агрегаты нулями.
+    """
+    if respect_retention:
+        from store_app.services.pageview_partitions import retention_cutoff
+        start_day = max(start_day, retention_cutoff())
+
+    manager_ips = PageView.get_manager_ips()
+    day = start_day
+    written = 0
+    while day <= end_day:
+        written += refresh_day(day, manager_ips=manager_ips)
+        day += timedelta(days=1)
+    return written
+
+
+def merge_page_views(page_views):
+    """
+    Вливает только что записанные просмотры в агрегаты их дней через скетчи.
+    Объединение скетчей идемпотентно, поэтому уникальные не задваиваются.
+    """
+    manager_ips = set(PageView.get_manager_ips())
+    rows_by_day = defaultdict(list)
+    for page_view in page_views:
+        rows_by_day[page_view.timestamp.date()].append(
+            (page_view.url, page_view.ip_address, page_view.session_key)
+        )
+
+    for day, rows in rows_by_day.items():
+        groups = _sketch_groups(rows, manager_ips)
+        # Параллельный процесс мог создать ту же строку - одна повторная попытка
+        for attempt in range(2):
+            try:
+                _merge_day(day, groups)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+
+
+def _merge_day(day, groups):
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (rollup.url, rollup.visitor_class): rollup
+            for rollup in PageViewDailyRollup.objects.select_for_update().filter(
+                date=day, url__in={url for url, _ in groups}
+            )
+        }
+        to_create = []
+        to_update = []
+        for (url, visitor_class), (views, sketch) in groups.items():
+            rollup = existing.get((url, visitor_class))
+            if rollup is None:
+                to_create.append(PageViewDailyRollup(
+                    date=day,
+                    url=url,
+                    visitor_class=visitor_class,
+                    views=views,
+                    unique_visitors=sketch.count(),
+                    visitor_sketch=sketch.to_bytes(),
+                ))
+                continue
+
+            if rollup.visitor_sketch:
+                sketch.merge(HyperLogLog.from_bytes(rollup.visitor_sketch))
+            rollup.views += views
+            rollup.unique_visitors = sketch.count()
+            rollup.visitor_sketch = sketch.to_bytes()
+            rollup.updated_at = now
+            to_update.append(rollup)
+
+        PageViewDailyRollup.objects.bulk_create(to_create)
+        PageViewDailyRollup.objects.bulk_update(
+            to_update, ['views', 'unique_visitors', 'visitor_sketch', 'updated_at']
+        )
+
+
+def unique_visitors_for_range(start_day, end_day, visitor_class=PageViewDailyRollup.VisitorClass.CLIENT):
+    """
+    Приблизительное число уникальных посетителей за период: объединение скетчей
+    итоговых строк дней. Возвращает скетч-объединение (HyperLogLog).
+    """
+    sketches = PageViewDailyRollup.objects.filter(
+        date__gte=start_day,
+        date__lte=end_day,
+        url=PageViewDailyRollup.SITE_TOTAL,
+        visitor_class=visitor_class,
+        visitor_sketch__isnull=False,
+    ).values_list('visitor_sketch', flat=True)
+    return HyperLogLog.merged(
+        (HyperLogLog.from_bytes(data) for data in sketches.iterator()),
+        precision=_sketch_precision(),
+    )
+
+
+def record_page_views(page_views):
+    """
+    Точка входа пути записи: вызывается после сохранения просмотров.
+    Со скетчами пачка вливается в агрегаты сразу, иначе текущий день
+    периодически пересчитывается целиком.
+    """
+    if not use_sketches():
+        return refresh_if_due()
+    try:
+        merge_page_views(page_views)
+    except Exception:
+        logger.exception("Ошибка обновления скетчей посещений")
+        return False
+    return True
+
+
+_last_refresh = 0.0
+_last_refreshed_day = None
+_refresh_lock = threading.Lock()
+
+
+def refresh_if_due():
+    """
+    Обновляет агрегаты текущего дня, если с прошлого обновления в этом процессе
+    прошло больше ROLLUP_REFRESH_INTERVAL. При смене суток добивает и вчерашний день.
+    """
+    global _last_refresh, _last_refreshed_day
+
+    interval = getattr(settings, 'ANALYTICS_ROLLUP_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+    if time.monotonic() - _last_refresh < interval:
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+
+    try:
+        today = timezone.now().date()
+        try:
+            if _last_refreshed_day is not None and _last_refreshed_day < today:
+                refresh_range(_last_refreshed_day, today)
+            else:
+                refresh_day(today)
+        except Exception:
+            logger.exception("Ошибка пересчёта суточной статистики посещений")
+            return False
+        _last_refreshed_day = today
+        _last_refresh = time.monotonic()
+        return True
+    finally:
+        _refresh_lock.release()
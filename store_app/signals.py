@@ -0,0 +1,109 @@
+# Обработчики сигналов моделей: поддержание производных данных в актуальном состоянии.
+# Массовые операции (services.product_bulk) обновляют их сами, один раз на пачку.
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from store_app import auth_backends
+from store_app.models import Category, Customer, Product, Store, User, WorkingHours
+from store_app.services import (
+    branch_directory, catalog_cache, catalog_facets, favorites, image_derivatives, media_blobs,
+    product_bulk, product_search, reference_data, search_suggestions,
+)
+from store_app.services.store_schedule import rebuild_store_schedule
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Пересчёт поисковых данных и подсказок товара"""
+    if product_bulk.in_bulk_operation():
+        return
+    product_search.index_product(instance)
+    search_suggestions.product_saved(instance)
+    catalog_facets.invalidate_facets()
+
+
+@receiver(post_save, sender=Product)
+def product_image_saved(sender, instance, **kwargs):
+    """Уменьшенные копии нового изображения готовятся в фоне после фиксации"""
+    image_derivatives.schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if product_bulk.in_bulk_operation():
+        return
+    # Файл изображения может быть общим с другими товарами - удалит его сборщик мусора
+    if instance.image:
+        media_blobs.release([instance.image.name])
+    product_search.unindex_product(instance.pk)
+    search_suggestions.product_deleted(instance.pk)
+    catalog_facets.invalidate_facets()
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    """Избранное товара удаляется каскадом - счётчики покупателей уменьшаются заранее"""
+    if product_bulk.in_bulk_operation():
+        return
+    favorites.product_deleting(instance)
+
+
+@receiver(pre_delete, sender=Customer)
+def customer_deleting(sender, instance, **kwargs):
+    favorites.customer_deleting(instance)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    """Название категории входит в поисковые данные её товаров"""
+    if not created:
+        product_search.reindex_category(instance)
+    search_suggestions.category_saved(instance)
+    # Только после фиксации: запрос, пришедший до COMMIT, закэшировал бы старый список
+    # под новой версией
+    transaction.on_commit(reference_data.invalidate_reference_data)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    search_suggestions.category_deleted(instance.pk)
+    transaction.on_commit(reference_data.invalidate_reference_data)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_changed(sender, instance, **kwargs):
+    """Город филиала входит в счётчики фильтров и в справочники филиалов"""
+    catalog_facets.invalidate_facets()
+    transaction.on_commit(branch_directory.invalidate_branch_directory)
+    transaction.on_commit(reference_data.invalidate_reference_data)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    """Любое изменение каталога делает закэшированные страницы устаревшими"""
+    if product_bulk.in_bulk_operation():
+        return
+    # После фиксации: страница, собранная до COMMIT, попала бы в кэш под новой версией
+    transaction.on_commit(catalog_cache.bump_catalog_version)
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def working_hours_changed(sender, instance, **kwargs):
+    """Пересборка компактного расписания филиала и справочника филиалов"""
+    rebuild_store_schedule(instance.store_id)
+    transaction.on_commit(branch_directory.invalidate_branch_directory)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Новый логин или email мог быть запомнен бэкендом аутентификации как неизвестный"""
+    # После фиксации: вход до COMMIT не видит пользователя и снова пометил бы его неизвестным
+    transaction.on_commit(lambda: auth_backends.forget_unknown_identifiers(instance.username, instance.email))
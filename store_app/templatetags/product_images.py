@@ -0,0 +1,45 @@
+# Вывод изображения товара с уменьшенными копиями (services.image_derivatives):
+# {% load product_images %}
+# {% product_image product sizes="(max-width: 767px) 100vw, 200px" css_class="img-fluid" %}
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from store_app.services.image_derivatives import derivative_name, is_ready
+
+register = template.Library()
+
+DEFAULT_SIZES = '100vw'
+
+
+def _srcset(digest, widths, extension):
+    return ', '.join(f'{default_storage.url(derivative_name(digest, width, extension))} {width}w' for width in widths)
+
+
+@register.simple_tag
+def product_image(product, sizes=DEFAULT_SIZES, css_class='', style='', alt=None):
+    """
+    <picture> с WebP и JPEG всех ширин (srcset) - браузер сам выбирает подходящую копию.
+    Пока копии не готовы - обычный <img> с исходным изображением.
+    """
+    if not product.image:
+        return ''
+    alt = product.name if alt is None else alt
+    if not is_ready(product):
+        return format_html(
+            '<img src="{}" class="{}" style="{}" alt="{}" loading="lazy" decoding="async">',
+            product.image.url, css_class, style, alt,
+        )
+
+    digest = product.image_derivatives['hash']
+    widths = product.image_derivatives['widths']
+    # display: contents - <picture> не влияет на вёрстку, классы и стили работают как у <img>
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" style="{}" alt="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(digest, widths, 'webp'), sizes,
+        default_storage.url(derivative_name(digest, widths[len(widths) // 2], 'jpg')),
+        _srcset(digest, widths, 'jpg'), sizes, css_class, style, alt,
+    )
@@ -1,8 +1,16 @@
 
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from store_app.models import Product, Store, Category, FavoriteProduct
+from store_app.services.catalog_cache import cache_catalog_page
+from store_app.services.catalog_facets import get_facets
+from store_app.services import favorites as favorites_service
+from store_app.services.keyset_pagination import InvalidCursor, keyset_page
+from store_app.services import manager_listing, reference_data
+from store_app.services.product_search import search_products
+from store_app.services.search_suggestions import suggest
+from store_app.services.store_locator import get_store_locator, parse_location
 from django.contrib import messages
 from django.db.models import Count
 import random
@@ -13,16 +21,13 @@ def home(request):
     return buy_page(request)
 
 
+@cache_catalog_page
 def buy_page(request):
     """Страница покупки техники - переносим сюда основную логику из home"""
-    # Получаем все уникальные города
-    cities = Store.objects.values_list('city', flat=True).distinct().order_by('city')
-
-    # Получаем все категории, отсортированные по имени
-    categories = Category.objects.all().order_by('name')
-
-    # Получаем все филиалы, отсортированные по городу и адресу
-    stores = Store.objects.all().order_by('city', 'address')
+    # Города, категории и филиалы для фильтров - из кэша справочников
+    cities = reference_data.cities()
+    categories = reference_data.categories()
+    stores = reference_data.stores()
 
     # Начальный запрос для доступных товаров
     products = Product.objects.filter(available=True).select_related('category', 'store')
@@ -34,16 +39,26 @@ def buy_page(request):
     price_min = request.GET.get('price_min')
     price_max = request.GET.get('price_max')
     search_query = request.GET.get('search', '')
+    cursor = request.GET.get('cursor')
     page = int(request.GET.get('page', 1))
 
     # Применяем фильтры
     if selected_city:
         products = products.filter(store__city=selected_city)
-        stores = stores.filter(city=selected_city)
+        stores = [store for store in stores if store['city'] == selected_city]
 
     if selected_store:
         products = products.filter(store_id=selected_store)
 
+    # Филиалы в радиусе от точки пользователя - по индексу в памяти,
+    # без вычисления расстояния для каждой строки в SQL
+    location = parse_location(request.GET)
+    if location:
+        nearby_store_ids = get_store_locator().within_radius(*location)
+        products = products.filter(store_id__in=nearby_store_ids)
+        nearby_store_ids = set(nearby_store_ids)
+        stores = [store for store in stores if store['id'] in nearby_store_ids]
+
     if selected_category:
         products = products.filter(category_id=selected_category)
 
@@ -53,9 +68,12 @@ def buy_page(request):
     if price_max:
         products = products.filter(price__lte=price_max)
 
-    # Поиск по названию товара
+    # Полнотекстовый поиск, результаты по релевантности
     if search_query:
-        products = products.filter(name__icontains=search_query)
+        products = search_products(products, search_query)
+        ordering = ('-search_rank', 'name', 'id')
+    else:
+        ordering = ('name', 'price', 'id')
 
     # Количество товаров на страницу
     products_per_page = 12
@@ -64,37 +82,39 @@ def buy_page(request):
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
 
     # Если это AJAX-запрос для пагинации, возвращаем только товары
-    if is_ajax and page > 1:
-        start_index = (page - 1) * products_per_page
-        end_index = start_index + products_per_page
-
-        # Получаем товары для текущей страницы
-        paginated_products = list(products[start_index:end_index])
-
-        # Получаем список избранных товаров для авторизованного пользователя
-        user_favorites = []
-        if request.user.is_authenticated and request.user.role == 'CUSTOMER' and hasattr(request.user,
-                                                                                         'customer_profile'):
-            user_favorites = FavoriteProduct.objects.filter(
-                user=request.user.customer_profile
-            ).values_list('product_id', flat=True)
-
+    if is_ajax and (cursor or page > 1):
+        next_cursor = None
+        if cursor:
+            # Следующая страница после курсора - без OFFSET
+            try:
+                paginated_products, next_cursor = keyset_page(
+                    products, ordering, cursor, products_per_page
+                )
+            except InvalidCursor:
+                return HttpResponseBadRequest('Некорректный курсор')
+        else:
+            # Старые клиенты с номером страницы
+            start_index = (page - 1) * products_per_page
+            end_index = start_index + products_per_page
+            paginated_products = list(products.order_by(*ordering)[start_index:end_index])
+
+        # Избранное во фрагмент не попадает: страница отмечает его сама,
+        # поэтому фрагмент общий для всех и кэшируется
         context = {
             'products': paginated_products,
-            'user_favorites': list(user_favorites),
+            'next_cursor': next_cursor,
         }
 
         return render(request, 'home_products_partial.html', context)
 
-    # Первоначальная загрузка страницы (не AJAX)
-    initial_products = products[:products_per_page]
+    # Первоначальная загрузка страницы (не AJAX). Она не кэшируется для вошедших
+    # пользователей, поэтому состояние избранного можно отметить прямо в карточках
+    initial_products, next_cursor = keyset_page(
+        favorites_service.with_favorite_flag(products, request.user), ordering, None, products_per_page
+    )
 
     # Получаем список избранных товаров для авторизованного пользователя
-    user_favorites = []
-    if request.user.is_authenticated and request.user.role == 'CUSTOMER' and hasattr(request.user, 'customer_profile'):
-        user_favorites = FavoriteProduct.objects.filter(
-            user=request.user.customer_profile
-        ).values_list('product_id', flat=True)
+    user_favorites = favorites_service.user_favorite_ids(request.user)
 
     # Проверяем, применены ли фильтры
     filters_applied = any([
@@ -102,19 +122,31 @@ def buy_page(request):
         price_min, price_max, search_query
     ])
 
+    # Количество товаров для каждого варианта фильтров при текущем выборе
+    facets = get_facets(request.GET)
+    city_options = [(city, facets['cities'].get(city, 0)) for city in cities]
+    # Справочники общие для всех запросов - счётчики добавляются в копии
+    categories = [
+        dict(category, facet_count=facets['categories'].get(category['id'], 0)) for category in categories
+    ]
+    stores = [dict(store, facet_count=facets['stores'].get(store['id'], 0)) for store in stores]
+
     context = {
         'products': initial_products,
         'cities': cities,
+        'city_options': city_options,
         'stores': stores,
         'categories': categories,
+        'facets': facets,
         'selected_city': selected_city,
         'selected_store': selected_store,
         'selected_category': selected_category,
         'selected_price_min': price_min,
         'selected_price_max': price_max,
         'selected_search': search_query,
-        'user_favorites': list(user_favorites),
+        'user_favorites': user_favorites,
         'filters_applied': filters_applied,
+        'next_cursor': next_cursor,
     }
 
     return render(request, 'dashboard/home.html', context)
@@ -131,6 +163,7 @@ def manager_dashboard(request):
     - Доступные товары (available=True) показываются первыми
     - Недоступные товары (available=False) сортируются по дате обновления (updated_at)
     - Самые "старые" недоступные товары показываются внизу списка
+    Фильтры, сортировка по колонкам (sort) и постраничный вывод (page) выполняются в БД.
     """
     # Проверяем, что пользователь менеджер
     if request.user.role != 'MANAGER':
@@ -138,40 +171,56 @@ def manager_dashboard(request):
         return redirect('home')
 
     # Получаем параметры фильтрации из GET-запроса
-    selected_store = request.GET.get('store')
-    selected_category = request.GET.get('category')
+    filters = manager_listing.parse_filters(request.GET)
+    products = manager_listing.manager_products(filters)
+    page = manager_listing.paginate(products, request.GET.get('page'))
 
-    # Получаем все товары с правильной сортировкой
-    products = Product.objects.all().order_by(
-        '-available',  # Сначала доступные (True), потом недоступные (False)
-        '-updated_at' if request.GET.get('sort') == 'newest' else 'updated_at'
-    )
-
-    # Применяем фильтры
-    if selected_store:
-        products = products.filter(store_id=selected_store)
-    if selected_category:
-        products = products.filter(category_id=selected_category)
-
-    # Получаем все филиалы и категории для выпадающих списков
-    stores = Store.objects.all()
-    categories = Category.objects.all()
+    # Филиалы и категории для выпадающих списков - из кэша справочников
+    stores = reference_data.stores()
+    categories = reference_data.categories()
 
     context = {
-        'products': products,
+        'products': page.object_list,
+        'page_obj': page,
         'stores': stores,
         'categories': categories,
-        'selected_store': selected_store,
-        'selected_category': selected_category,
+        'selected_store': filters['store'],
+        'selected_category': filters['category'],
+        'selected_status': filters['status'],
+        'search_query': filters['q'],
+        'current_sort': filters['sort'],
+        # Повторный клик по заголовку колонки меняет направление сортировки
+        'sort_links': {
+            column: f'-{column}' if filters['sort'] == column else column
+            for column in manager_listing.SORT_FIELDS
+        },
     }
     return render(request, 'dashboard/manager.html', context)
 
 
+@login_required
+def export_manager_products(request):
+    """Выгрузка списка товаров панели менеджера (с теми же фильтрами) в CSV потоком"""
+    if request.user.role != 'MANAGER':
+        messages.error(request, 'Доступ только для менеджеров')
+        return redirect('home')
+
+    products = manager_listing.manager_products(manager_listing.parse_filters(request.GET))
+    response = StreamingHttpResponse(
+        manager_listing.export_rows(products), content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="products.csv"'
+    return response
+
+
 def get_stores_by_city(request):
     """AJAX-функция для получения филиалов по городу"""
     city = request.GET.get('city')
-    stores = Store.objects.filter(city=city).values('id', 'address')
-    return JsonResponse({'stores': list(stores)})
+    stores = [
+        {'id': store['id'], 'address': store['address']}
+        for store in reference_data.stores() if store['city'] == city
+    ]
+    return JsonResponse({'stores': stores})
 
 
 @login_required
@@ -186,10 +235,8 @@ def customer_profile(request):
 
     # Получаем количество избранных товаров
     favorite_count = 0
-    if hasattr(request.user, 'customer_profile'):
-        favorite_count = FavoriteProduct.objects.filter(
-            user=request.user.customer_profile
-        ).count()
+    if request.user.customer_profile:
+        favorite_count = request.user.customer_profile.favorite_count
 
     context = {
         'user': request.user,
@@ -231,36 +278,19 @@ def toggle_favorite(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Метод не разрешен'}, status=405)
 
-    if request.user.role != 'CUSTOMER' or not hasattr(request.user, 'customer_profile'):
+    if request.user.role != 'CUSTOMER' or not request.user.customer_profile_id:
         return JsonResponse({'error': 'Доступ только для покупателей'}, status=403)
 
     product_id = request.POST.get('product_id')
     if not product_id:
         return JsonResponse({'error': 'ID товара не указан'}, status=400)
 
+    # Одна запись в избранное и атомарные счётчики вместо get_or_create и COUNT(*)
     try:
-        product = Product.objects.get(id=product_id)
-    except Product.DoesNotExist:
+        status, favorite_count = favorites_service.toggle_favorite(request.user.customer_profile_id, product_id)
+    except (Product.DoesNotExist, ValueError):
         return JsonResponse({'error': 'Товар не найден'}, status=404)
 
-    customer_profile = request.user.customer_profile
-
-    # Проверяем, есть ли уже товар в избранном
-    favorite, created = FavoriteProduct.objects.get_or_create(
-        user=customer_profile,
-        product=product
-    )
-
-    if not created:
-        # Если уже был в избранном - удаляем
-        favorite.delete()
-        status = 'removed'
-    else:
-        status = 'added'
-
-    # Получаем общее количество избранных товаров
-    favorite_count = FavoriteProduct.objects.filter(user=customer_profile).count()
-
     return JsonResponse({
         'status': status,
         'count': favorite_count
@@ -327,51 +357,36 @@ def update_product_availability(request):
 
 
 def search_suggestions(request):
-    """AJAX-подсказки для поиска"""
+    """AJAX-подсказки для поиска (из индекса в памяти, без запросов к БД)"""
     query = request.GET.get('q', '')
 
     if len(query) < 2:
         return JsonResponse({'suggestions': []})
 
-    # Ищем товары по названию
-    products = Product.objects.filter(
-        name__icontains=query,
-        available=True
-    ).values('id', 'name')[:10]
-
-    # Ищем категории
-    categories = Category.objects.filter(
-        name__icontains=query
-    ).values('id', 'name')[:5]
-
-    suggestions = {
-        'products': list(products),
-        'categories': list(categories),
-    }
-
-    return JsonResponse(suggestions)
+    return JsonResponse(suggest(query))
 
 
 def featured_products(request):
     """Рекомендованные товары (может использоваться на главной)"""
-    # Берем случайные доступные товары
-    available_products = list(Product.objects.filter(available=True))
+    # Берем случайные доступные товары: выбираем id, а загружаем только выбранные
+    available_ids = list(Product.objects.filter(available=True).values_list('id', flat=True))
 
-    if len(available_products) > 6:
-        featured = random.sample(available_products, 6)
+    if len(available_ids) > 6:
+        featured_ids = random.sample(available_ids, 6)
     else:
-        featured = available_products
+        featured_ids = available_ids
+
+    featured = list(favorites_service.with_favorite_flag(
+        Product.objects.filter(id__in=featured_ids), request.user
+    ))
+    featured.sort(key=lambda product: featured_ids.index(product.id))
 
     # Получаем список избранных товаров для авторизованного пользователя
-    user_favorites = []
-    if request.user.is_authenticated and request.user.role == 'CUSTOMER' and hasattr(request.user, 'customer_profile'):
-        user_favorites = FavoriteProduct.objects.filter(
-            user=request.user.customer_profile
-        ).values_list('product_id', flat=True)
+    user_favorites = favorites_service.user_favorite_ids(request.user)
 
     context = {
         'featured_products': featured,
-        'user_favorites': list(user_favorites),
+        'user_favorites': user_favorites,
     }
 
     return render(request, 'partials/featured_products.html', context)
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib.auth.decorators import login_required
 from store_app.models import Product, FavoriteProduct
+from store_app.services import favorites as favorites_service
 
 
 @login_required
@@ -11,13 +12,13 @@ def favorites_view(request):
     if request.user.role != 'CUSTOMER':
         return render(request, 'error.html', {'message': 'Доступ запрещен'}, status=403)
 
-    favorites = FavoriteProduct.objects.filter(
-        user=request.user.customer_profile
-    ).select_related('product')
+    favorites = list(FavoriteProduct.objects.filter(
+        user_id=request.user.customer_profile_id
+    ).select_related('product'))
 
     return render(request, 'favorites.html', {
         'favorites': favorites,
-        'favorite_count': favorites.count()
+        'favorite_count': len(favorites)
     })
 
 
@@ -32,26 +33,17 @@ def toggle_favorite(request):
     if not product_id:
         return JsonResponse({'status': 'error', 'message': 'Не указан ID товара'}, status=400)
 
+    customer_id = favorites_service.customer_id_for(request.user)
+    if customer_id is None:
+        return JsonResponse({'status': 'error', 'message': 'Профиль покупателя не найден'}, status=404)
+
     try:
-        product = Product.objects.get(id=product_id)
-        customer = request.user.customer_profile
-    except (Product.DoesNotExist, AttributeError) as e:
+        action, count = favorites_service.toggle_favorite(customer_id, product_id)
+    except (Product.DoesNotExist, ValueError) as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=404)
 
-    favorite, created = FavoriteProduct.objects.get_or_create(
-        user=customer,
-        product=product
-    )
-
-    if not created:
-        favorite.delete()
-        action = 'removed'
-    else:
-        action = 'added'
-
-    count = FavoriteProduct.objects.filter(user=customer).count()
     return JsonResponse({
         'status': action,
         'count': count,
         'product_id': product_id
-    })
\ No newline at end of file
+    })
@@ -2,9 +2,11 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from ..forms.create_product_form import CreateProductForm
+from ..forms.product_import_form import ProductImportForm
 from ..models import Product, Category, ActionLog
+from ..services import manager_listing, product_bulk
+from ..services.product_import import import_products as run_product_import
 from django.contrib import messages
-import os
 
 
 def create_product(request):
@@ -53,9 +55,31 @@ def create_product(request):
     return render(request, 'product/create_product.html', context)
 
 
+def import_products(request):
+    """Импорт товаров из CSV/XLSX файла с отчётом по строкам"""
+    if not request.user.is_authenticated or request.user.role != 'MANAGER':
+        return redirect('login')
+
+    report = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            uploaded = form.cleaned_data['file']
+            report = run_product_import(uploaded.file, uploaded.name, request.user.manager_profile)
+            if report.saved:
+                messages.success(request, f'Импортировано товаров: {report.saved}')
+    else:
+        form = ProductImportForm()
+
+    return render(request, 'product/import_products.html', {
+        'form': form,
+        'report': report,
+    })
+
+
 def delete_products(request):
     """Удаляет продукт(ы) вместе с изображениями."""
-    if request.method == 'POST':
+    if request.method == 'POST' and request.user.is_authenticated and request.user.role == 'MANAGER':
         product_ids = request.POST.getlist('product_ids')
 
         # Проверка на пустой список
@@ -63,41 +87,61 @@ def delete_products(request):
             messages.warning(request, 'Не выбрано товаров для удаления')
             return redirect('manager_dashboard')
 
-        products = Product.objects.filter(id__in=product_ids)
+        # Журнал одной пачкой, удаление одним запросом, файлы - после фиксации в фоне
+        deleted_count = product_bulk.delete_products(request.user, product_ids)
 
         # Проверка на существование продуктов
-        if not products.exists():
+        if not deleted_count:
             messages.error(request, 'Выбранные товары не найдены')
             return redirect('manager_dashboard')
 
-        deleted_count = 0
-
-        # Удаляем каждый продукт по отдельности
-        for product in products:
-            # Логирование
-            ActionLog.objects.create(
-                user=request.user,
-                action_type='DELETE',
-                product_name=product.name,
-                product_id=product.id,
-                details=f"Товар удален: {product.name}"
-            )
-
-            # Удаляем продукт (это вызовет метод delete() модели)
-            product.delete()
-            deleted_count += 1
-
         messages.success(request, f'Удалено товаров: {deleted_count}')
         return redirect('manager_dashboard')
     return redirect('manager_dashboard')
 
 
+def _selected_products(request):
+    """
+    Товары для массовой операции: отмеченные в списке или, если выбрано
+    "все по фильтру", все товары с текущими фильтрами панели менеджера.
+    """
+    if request.POST.get('apply_to') == 'filtered':
+        return manager_listing.manager_products(manager_listing.parse_filters(request.POST))
+    return Product.objects.filter(id__in=request.POST.getlist('product_ids'))
+
+
 def deactivate_products(request):
     """Меняет статус продукта, убирая ищ наличия.
     Продукт становится не доступен для пользователя сайтом."""
-    if request.method == 'POST':
-        product_ids = request.POST.getlist('product_ids')
-        Product.objects.filter(id__in=product_ids).update(available=False)
+    if request.method == 'POST' and request.user.is_authenticated and request.user.role == 'MANAGER':
+        changed = product_bulk.set_availability(request.user, _selected_products(request), available=False)
+        messages.success(request, f'Снято с продажи товаров: {changed}')
+        return redirect('manager_dashboard')
+    return redirect('manager_dashboard')
+
+
+def activate_products(request):
+    """Возвращает выбранные товары в продажу"""
+    if request.method == 'POST' and request.user.is_authenticated and request.user.role == 'MANAGER':
+        changed = product_bulk.set_availability(request.user, _selected_products(request), available=True)
+        messages.success(request, f'Возвращено в продажу товаров: {changed}')
+        return redirect('manager_dashboard')
+    return redirect('manager_dashboard')
+
+
+def change_product_prices(request):
+    """Устанавливает выбранным товарам цену или меняет её на процент"""
+    if request.method == 'POST' and request.user.is_authenticated and request.user.role == 'MANAGER':
+        price = request.POST.get('price') or None
+        percent = request.POST.get('percent') or None
+        try:
+            changed = product_bulk.change_prices(
+                request.user, _selected_products(request), price=price, percent=percent
+            )
+        except ValueError as e:
+            messages.error(request, f'Цены не изменены: {e}')
+        else:
+            messages.success(request, f'Изменена цена товаров: {changed}')
         return redirect('manager_dashboard')
     return redirect('manager_dashboard')
 
@@ -1,64 +1,60 @@
+from django.http import JsonResponse
 from django.shortcuts import render
-import json
-from django.utils import timezone
-from store_app.models import Store
 
-def stores_view(request):
-    # Упрощенная версия - получаем все города
-    all_cities = Store.objects.values_list('city', flat=True).distinct().order_by('city')
-    print(f"all_cities: {list(all_cities)}")  # Исправлено!
-
-    # Фильтрация по городу
-    selected_city = request.GET.get('city')
-
-    if selected_city:
-        stores = Store.objects.filter(city=selected_city).prefetch_related('working_hours')
-    else:
-        stores = Store.objects.all().prefetch_related('working_hours')
-
-    # Подготавливаем данные для карты и шаблона
-    stores_data = []
-    for store in stores:
-        schedule = []
-        working_hours = store.working_hours.all().order_by('day_of_week')
+from store_app.services.branch_directory import get_branch_directory
+from store_app.services.store_locator import get_store_locator, valid_coordinates
 
-        for wh in working_hours:
-            if wh.is_closed:
-                time_str = "Выходной"
-            else:
-                open_time = wh.opening_time.strftime('%H:%M') if wh.opening_time else '--:--'
-                close_time = wh.closing_time.strftime('%H:%M') if wh.closing_time else '--:--'
-                time_str = f"{open_time} - {close_time}"
+MAX_NEAREST_STORES = 50
 
-            schedule.append({
-                'day': wh.get_day_of_week_display(),
-                'time': time_str,
-                'is_closed': wh.is_closed
-            })
 
-        is_open_now = store.is_open_now()
-
-        stores_data.append({
-            'id': store.id,
-            'city': store.city,
-            'address': store.address,
-            'latitude': float(store.latitude) if store.latitude else None,
-            'longitude': float(store.longitude) if store.longitude else None,
-            'schedule': schedule,
-            'is_open_now': is_open_now,
-            'status_color': 'green' if is_open_now else 'red',
-            'status_text': 'Открыт сейчас' if is_open_now else 'Закрыт'
-        })
+def stores_view(request):
+    """Страница филиалов с фильтром по городу"""
+    directory = get_branch_directory()
 
-    stores_with_coords = [s for s in stores_data if s['latitude'] and s['longitude']]
+    # Фильтрация по городу
+    selected_city = request.GET.get('city')
+    context = directory.context(city=selected_city)
+    stores = [branch for city_data in context['cities'] for branch in city_data['branches']]
 
-    context = {
-        'stores': stores_data,
-        'stores_json': json.dumps(stores_with_coords, ensure_ascii=False),
-        'cities': all_cities,
+    context.update({
+        'stores': stores,
+        'city_names': directory.city_names,
         'selected_city': selected_city,
-        'total_stores': len(stores_data),
-        'active_stores': len([s for s in stores_data if s['is_open_now']])
-    }
-
-    return render(request, 'basement/branches.html', context)
\ No newline at end of file
+        'total_stores': context['total_branches'],
+        'active_stores': context['active_branches'],
+    })
+
+    return render(request, 'basement/branches.html', context)
+
+
+def nearest_stores(request):
+    """API: ближайшие к точке филиалы (по умолчанию только открытые сейчас)"""
+    try:
+        latitude = float(request.GET.get('lat'))
+        longitude = float(request.GET.get('lon'))
+        k = int(request.GET.get('k', 5))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Укажите координаты lat и lon'}, status=400)
+
+    if not valid_coordinates(latitude, longitude):
+        return JsonResponse({'error': 'Некорректные координаты'}, status=400)
+
+    k = max(1, min(k, MAX_NEAREST_STORES))
+    only_open = request.GET.get('open', '1') != '0'
+    found = get_store_locator().nearest(latitude, longitude, k=k, only_open=only_open)
+
+    return JsonResponse({
+        'stores': [
+            {
+                'id': store.id,
+                'city': store.city,
+                'address': store.address,
+                'phone': store.phone,
+                'latitude': store.latitude,
+                'longitude': store.longitude,
+                'distance_km': round(distance, 3),
+                'is_open_now': is_open,
+            }
+            for store, distance, is_open in found
+        ]
+    })
@@ -0,0 +1,239 @@
+# Пул соединений с БД внутри процесса.
+# Без пула каждый запрос gunicorn открывал новое соединение с PostgreSQL (TCP, TLS,
+# аутентификация, запуск backend-процесса) - на лёгких страницах это заметная доля времени.
+# Пул не зависит от драйвера (psycopg2 или psycopg 3): соединения создаёт переданная
+# функция connect, пул только выдаёт, проверяет и возвращает их.
+# При выдаче соединение проверяется (закрыто ли, не истёк ли срок жизни, SELECT 1 после
+# простоя), при возврате откатывается незавершённая транзакция. Время ожидания и
+# исчерпание пула пишутся в лог store_project.db.pool.
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'MIN_SIZE': 2,               # Простаивающих соединений, которые не закрываются по MAX_IDLE
+    'MAX_SIZE': 10,              # Соединений на процесс (занятых и свободных)
+    'TIMEOUT': 10.0,             # Сколько ждать свободного соединения, сек
+    'MAX_IDLE': 300,             # Закрывать соединения, простаивающие дольше, сек
+    'MAX_LIFETIME': 3600,        # Пересоздавать соединения старше, сек
+    'HEALTH_CHECK_AFTER': 1.0,   # Проверять SELECT 1 соединения, простаивавшие дольше, сек
+    'SLOW_WAIT': 0.1,            # Ожидание дольше этого (сек) пишется в лог
+    'METRICS_INTERVAL': 60,      # Как часто писать сводку метрик в лог, сек
+}
+
+# Состояние транзакции из connection.info.transaction_status (одинаково в psycopg2 и psycopg 3)
+TRANSACTION_IDLE = 0
+TRANSACTION_UNKNOWN = 4
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за TIMEOUT"""
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с ограничением размера и метриками ожидания"""
+
+    def __init__(self, name='default', min_size=2, max_size=10, timeout=10.0, max_idle=300,
+                 max_lifetime=3600, health_check_after=1.0, slow_wait=0.1, metrics_interval=60):
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.slow_wait = slow_wait
+        self.metrics_interval = metrics_interval
+        self._idle = deque()         # (соединение, когда возвращено), последнее возвращённое - справа
+        self._created = {}           # id(соединения) -> когда создано
+        self._size = 0               # открытых соединений, включая создаваемые
+        self._condition = threading.Condition()
+        self._closed = False
+        self._metrics = dict.fromkeys((
+            'checkouts', 'waits', 'wait_time', 'max_wait_time', 'timeouts',
+            'connections_created', 'connections_closed', 'health_check_failures',
+        ), 0)
+        self._last_report = time.monotonic()
+
+    # Выдача
+
+    def getconn(self, connect):
+        """
+        Свободное проверенное соединение или новое, созданное connect(), если пул не заполнен.
+        Если все MAX_SIZE соединений заняты, ждёт не дольше TIMEOUT и бросает PoolTimeout.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                self._expire_idle()
+                conn = None
+                while True:
+                    if self._closed:
+                        raise PoolTimeout(f"Пул соединений {self.name} закрыт")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._record_timeout(time.monotonic() - started)
+                        raise PoolTimeout(
+                            f"Нет свободного соединения в пуле {self.name} "
+                            f"({self.max_size} из {self.max_size} заняты) за {self.timeout} с"
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+
+            if conn is None:
+                conn = self._open(connect)
+            elif not self._is_healthy(conn, returned_at):
+                continue
+            self._record_checkout(time.monotonic() - started, waited)
+            return conn
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created[id(conn)] = time.monotonic()
+            self._metrics['connections_created'] += 1
+        return conn
+
+    def _is_healthy(self, conn, returned_at):
+        """Проверяет соединение перед выдачей; негодное закрывает"""
+        now = time.monotonic()
+        if conn.closed or now - self._created.get(id(conn), now) > self.max_lifetime:
+            self._discard(conn)
+            return False
+        if now - returned_at < self.health_check_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception:
+            logger.info("Соединение пула %s не прошло проверку, пересоздаём", self.name, exc_info=True)
+            with self._condition:
+                self._metrics['health_check_failures'] += 1
+            self._discard(conn)
+            return False
+        return True
+
+    def _expire_idle(self):
+        # Вызывается под блокировкой. Самые давно простаивающие соединения - слева
+        now = time.monotonic()
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            conn, _ = self._idle.popleft()
+            self._close_locked(conn)
+
+    # Возврат
+
+    def putconn(self, conn):
+        """Возвращает соединение в пул: незавершённая транзакция откатывается, сломанное закрывается"""
+        try:
+            reusable = not conn.closed and self._reset(conn)
+        except Exception:
+            logger.info("Не удалось вернуть соединение в пул %s", self.name, exc_info=True)
+            reusable = False
+        if not reusable:
+            self._discard(conn)
+            return
+        with self._condition:
+            if self._closed:
+                self._close_locked(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def _reset(self, conn):
+        status = conn.info.transaction_status
+        if status == TRANSACTION_UNKNOWN:
+            return False
+        if status != TRANSACTION_IDLE:
+            conn.rollback()
+        if not conn.autocommit:
+            conn.autocommit = True
+        return True
+
+    def _discard(self, conn):
+        with self._condition:
+            self._close_locked(conn)
+            self._condition.notify()
+
+    def _close_locked(self, conn):
+        self._size -= 1
+        self._created.pop(id(conn), None)
+        self._metrics['connections_closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Закрывает свободные соединения; занятые закроются при возврате"""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_locked(conn)
+            self._condition.notify_all()
+
+    # Метрики
+
+    def _record_checkout(self, wait_time, waited):
+        with self._condition:
+            metrics = self._metrics
+            metrics['checkouts'] += 1
+            if waited:
+                metrics['waits'] += 1
+                metrics['wait_time'] += wait_time
+                metrics['max_wait_time'] = max(metrics['max_wait_time'], wait_time)
+            report = time.monotonic() - self._last_report >= self.metrics_interval
+            if report:
+                self._last_report = time.monotonic()
+        if waited and wait_time >= self.slow_wait:
+            logger.info("Ожидание соединения из пула %s: %.0f мс", self.name, wait_time * 1000,
+                        extra={'pool': self.name, 'wait_ms': round(wait_time * 1000)})
+        if report:
+            stats = self.stats()
+            logger.info("Пул соединений %s: %s", self.name,
+                        ' '.join(f'{key}={value}' for key, value in stats.items()), extra=stats)
+
+    def _record_timeout(self, wait_time):
+        # Вызывается под блокировкой
+        self._metrics['timeouts'] += 1
+        self._metrics['wait_time'] += wait_time
+        self._metrics['max_wait_time'] = max(self._metrics['max_wait_time'], wait_time)
+        logger.warning("Пул соединений %s исчерпан: ждали %.0f мс, заняты все %d соединений",
+                       self.name, wait_time * 1000, self.max_size,
+                       extra={'pool': self.name, 'wait_ms': round(wait_time * 1000), 'max_size': self.max_size})
+
+    def stats(self):
+        """Снимок метрик: размер пула, выдачи, ожидания (сек) и исчерпания"""
+        with self._condition:
+            stats = dict(self._metrics)
+            stats.update(
+                pool=self.name,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                max_size=self.max_size,
+            )
+        stats['wait_time'] = round(stats['wait_time'], 4)
+        stats['max_wait_time'] = round(stats['max_wait_time'], 4)
+        return stats
@@ -0,0 +1,85 @@
+# Бэкенд PostgreSQL с пулом соединений внутри процесса (см. store_project/db/pool.py).
+# Поведение стандартного бэкенда django.db.backends.postgresql не меняется, кроме того,
+# что connect() берёт соединение из пула, а close() возвращает его туда. Настройки пула -
+# в DATABASES[alias]['POOL']; CONN_MAX_AGE при этом должен быть 0: соединение возвращается
+# в пул в конце каждого запроса и не держится потоком.
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from store_project.db.pool import DEFAULT_SETTINGS, ConnectionPool, PoolTimeout
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Пулы всех потоков процесса: (alias, параметры подключения) -> ConnectionPool.
+    # Параметры входят в ключ, чтобы смена NAME (тестовая БД) не выдала соединение к старой базе
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_pool = None   # пул, из которого взято текущее соединение
+
+    def get_pool_settings(self):
+        conf = {key.lower(): value for key, value in DEFAULT_SETTINGS.items()}
+        conf.update((key.lower(), value) for key, value in self.settings_dict.get('POOL', {}).items())
+        return conf
+
+    def get_connection_pool(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            return None
+        key = (self.alias, repr(sorted(conn_params.items())))
+        pool = self._pools.get(key)
+        if pool is None:
+            if self.settings_dict.get('CONN_MAX_AGE', 0) != 0:
+                raise ImproperlyConfigured("Пул соединений несовместим с CONN_MAX_AGE, отличным от 0.")
+            with self._pools_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = self._pools[key] = ConnectionPool(name=self.alias, **self.get_pool_settings())
+        return pool
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_connection_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connection = pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+        self.connection_pool = pool
+        # Родительский метод выставляет уровень изоляции только при создании соединения,
+        # а соединение из пула могло быть создано другим потоком
+        self.isolation_level = base.IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', base.IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        pool, self.connection_pool = self.connection_pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+        # Соединение принадлежит пулу и в этом потоке больше не используется
+        self.connection = None
+
+    def close_if_health_check_failed(self):
+        if self.connection_pool is not None:
+            # Пул проверяет соединения при выдаче
+            return
+        return super().close_if_health_check_failed()
+
+    def close_pool(self):
+        super().close_pool()
+        with self._pools_lock:
+            keys = [key for key in self._pools if key[0] == self.alias]
+            pools = [self._pools.pop(key) for key in keys]
+        for pool in pools:
+            pool.close()
+
+    def pool_stats(self):
+        """Метрики пулов этого alias (по одному на набор параметров подключения)"""
+        return [pool.stats() for key, pool in list(self._pools.items()) if key[0] == self.alias]
@@ -1,6 +1,12 @@
+import logging
 import time
 from django.utils import timezone
 from store_app.models import PageView
+from store_app.services import visitor_rollups
+from store_app.services.pageview_buffer import get_pageview_buffer, is_buffer_enabled
+from store_app.services.staff_ips import is_staff_user, register_staff_ip
+
+logger = logging.getLogger(__name__)
 
 
 class AnalyticsMiddleware:
@@ -24,20 +30,36 @@ class AnalyticsMiddleware:
         return response
 
     def track_page_view(self, request, duration):
-        """Сохраняет информацию о просмотре страницы"""
+        """Сохраняет информацию о просмотре страницы.
+
+        Запись не делается в запросе: просмотр уходит в буфер процесса,
+        который пишет его в БД пачкой из фонового потока.
+        """
         try:
-            PageView.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            ip_address = self.get_client_ip(request)
+            # IP менеджеров попадают в реестр до записи просмотра, чтобы агрегаты
+            # сразу отнесли визит к менеджерским (в БД пишется только новый IP)
+            if is_staff_user(request.user):
+                register_staff_ip(ip_address)
+
+            page_view = PageView(
+                user_id=request.user.pk if request.user.is_authenticated else None,
                 session_key=request.session.session_key or 'anonymous',
                 url=request.path,
                 referer=request.META.get('HTTP_REFERER'),
-                ip_address=self.get_client_ip(request),
+                ip_address=ip_address,
                 user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-                duration=int(duration)
+                duration=int(duration),
+                timestamp=timezone.now(),
             )
-        except Exception as e:
+            if is_buffer_enabled():
+                get_pageview_buffer().put(page_view)
+            else:
+                page_view.save()
+                visitor_rollups.record_page_views([page_view])
+        except Exception:
             # Логируем ошибку, но не прерываем выполнение
-            print(f"Error tracking page view: {e}")
+            logger.exception("Error tracking page view")
 
     def get_client_ip(self, request):
         """Получает реальный IP адрес клиента"""
@@ -97,14 +97,35 @@ if missing_vars:
     print(f"Ошибка: Отсутствуют следующие переменные окружения: {', '.join(missing_vars)}", file=sys.stderr)
     sys.exit(1)
 
+# Соединения с БД переиспользуются между запросами. По умолчанию - пул внутри процесса
+# (store_project/db/pool.py): соединение берётся из пула в начале запроса и возвращается
+# в конце, при выдаче проверяется, ожидание и исчерпание пула пишутся в лог.
+# DB_POOL_ENABLED=False - постоянное соединение на поток на DB_CONN_MAX_AGE секунд.
+# Размер пула - на процесс: при N воркерах gunicorn до N * DB_POOL_MAX_SIZE соединений,
+# это должно укладываться в max_connections PostgreSQL.
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'True') == 'True'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'store_project.db.postgresql_pool' if DB_POOL_ENABLED else 'django.db.backends.postgresql',
         'NAME': os.getenv("NAME_DB"),
         'HOST': 'localhost',
         'PORT': '5432',
         'USER': os.getenv('USER_DB'),
         'PASSWORD': os.getenv('PASSWORD_DB'),
+        'CONN_MAX_AGE': 0 if DB_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # Проверять постоянное соединение перед повторным использованием в новом HTTP-запросе
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'MAX_IDLE': int(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            'HEALTH_CHECK_AFTER': float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', 1.0)),
+            'SLOW_WAIT': float(os.getenv('DB_POOL_SLOW_WAIT', 0.1)),
+            'METRICS_INTERVAL': int(os.getenv('DB_POOL_METRICS_INTERVAL', 60)),
+        },
     }
 }
 
@@ -164,6 +185,8 @@ AUTH_USER_MODEL = 'store_app.User'
 AUTHENTICATION_BACKENDS = [
     'store_app.auth_backends.RoleBasedAuthBackend',
 ]
+# Сколько секунд бэкенд входа помнит логины и email, по которым никто не найден (0 - не помнить)
+AUTH_UNKNOWN_IDENTIFIER_TTL = int(os.getenv('AUTH_UNKNOWN_IDENTIFIER_TTL', 300))
 
 # Настройки CSRF
 CSRF_COOKIE_SECURE = False  # Для разработки
@@ -183,9 +206,83 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'DEBUG',
         },
+        # Шаги входа (без паролей); подробный лог включается AUTH_DEBUG_LOGGING=True
+        'store_app.auth_backends': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if os.getenv('AUTH_DEBUG_LOGGING', 'False') == 'True' else 'WARNING',
+        },
+        # Метрики пула соединений: ожидание, исчерпание, периодическая сводка
+        'store_project.db.pool': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     },
 }
 
+# Буфер записи статистики посещений (см. store_app/services/pageview_buffer.py)
+# Просмотры копятся в очереди процесса и пишутся в БД пачками из фонового потока.
+ANALYTICS_BUFFER = {
+    'ENABLED': os.getenv('ANALYTICS_BUFFER_ENABLED', 'True') == 'True',
+    'MAX_QUEUE_SIZE': int(os.getenv('ANALYTICS_BUFFER_MAX_QUEUE_SIZE', 10000)),
+    'BATCH_SIZE': int(os.getenv('ANALYTICS_BUFFER_BATCH_SIZE', 500)),
+    'FLUSH_INTERVAL': float(os.getenv('ANALYTICS_BUFFER_FLUSH_INTERVAL', 2.0)),
+}
+# Как часто (сек) путь записи пересчитывает суточные агрегаты за сегодня.
+# Прошлые дни пересчитывает команда: python manage.py rollup_pageviews
+ANALYTICS_ROLLUP_REFRESH_INTERVAL = int(os.getenv('ANALYTICS_ROLLUP_REFRESH_INTERVAL', 60))
+# Приблизительный подсчёт уникальных посетителей (HyperLogLog) вместо COUNT(DISTINCT).
+# Точность 12 = 4096 регистров на строку агрегата, ошибка около 1.6%.
+# После включения пересчитайте историю: python manage.py rollup_pageviews --all
+ANALYTICS_APPROXIMATE_UNIQUES = os.getenv('ANALYTICS_APPROXIMATE_UNIQUES', 'False') == 'True'
+ANALYTICS_HLL_PRECISION = int(os.getenv('ANALYTICS_HLL_PRECISION', 12))
+# Сколько (сек) процесс держит в памяти реестр IP менеджеров (модель StaffIP)
+ANALYTICS_STAFF_IPS_TTL = int(os.getenv('ANALYTICS_STAFF_IPS_TTL', 300))
+# Сколько месяцев хранить сырые просмотры. Более старые месяцы команда
+# python manage.py compact_pageviews сворачивает в суточные агрегаты и удаляет.
+ANALYTICS_PAGEVIEW_RETENTION_MONTHS = int(os.getenv('ANALYTICS_PAGEVIEW_RETENTION_MONTHS', 12))
+
+# Индекс подсказок поиска в памяти процесса обновляется сигналами; изменения,
+# сделанные другими процессами, подхватываются полной перестройкой раз в столько секунд
+SEARCH_SUGGESTIONS_REBUILD_INTERVAL = int(os.getenv('SEARCH_SUGGESTIONS_REBUILD_INTERVAL', 600))
+# Общий для всех процессов кэш: версии каталога и справочников, страницы каталога,
+# избранное. По умолчанию - файлы на диске (CACHE_LOCATION); для одного процесса
+# подойдёт django.core.cache.backends.locmem.LocMemCache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+    }
+}
+# Двухуровневый кэш справочников (store_app/services/tiered_cache.py): значения живут
+# LOCAL_TTL секунд в памяти процесса перед общим кэшем; это же - максимальная задержка,
+# с которой другой процесс увидит изменение категорий и филиалов
+TIERED_CACHE = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': int(os.getenv('TIERED_CACHE_LOCAL_MAX_ENTRIES', 1024)),
+    'LOCAL_TTL': int(os.getenv('TIERED_CACHE_LOCAL_TTL', 5)),
+    'TTL': int(os.getenv('TIERED_CACHE_TTL', 3600)),
+}
+# Сколько секунд процесс помнит счётчики фильтров каталога для одной комбинации фильтров
+# (изменения товаров в этом же процессе сбрасывают их сразу)
+FACETS_CACHE_TTL = int(os.getenv('FACETS_CACHE_TTL', 60))
+# Время жизни закэшированных страниц каталога для анонимных посетителей, сек.
+# Изменения товаров, филиалов и категорий сбрасывают кэш раньше через версию каталога
+CATALOG_PAGE_CACHE_TTL = int(os.getenv('CATALOG_PAGE_CACHE_TTL', 300))
+# Файлы изображений без ссылок из товаров удаляет команда collect_media, но не раньше
+# чем через столько секунд (повторная загрузка того же фото успеет снова на него сослаться)
+MEDIA_GC_GRACE_SECONDS = int(os.getenv('MEDIA_GC_GRACE_SECONDS', 3600))
+
+# Уменьшенные копии изображений товаров (JPEG и WebP) создаются пулом фоновых потоков
+# после сохранения товара; пока копий нет, показывается исходное изображение
+IMAGE_DERIVATIVES = {
+    'ENABLED': os.getenv('IMAGE_DERIVATIVES_ENABLED', 'True') == 'True',
+    'WORKERS': int(os.getenv('IMAGE_DERIVATIVES_WORKERS', 2)),
+    'WIDTHS': (320, 640, 1280),
+    'QUALITY': int(os.getenv('IMAGE_DERIVATIVES_QUALITY', 80)),
+}
+
 # Тема для админки
 JAZZMIN_SETTINGS = {
     "site_title": "Gadgetia Admin",
@@ -208,4 +305,9 @@ if 'test' in sys.argv:
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
     }
-    DEBUG = False
\ No newline at end of file
+    ANALYTICS_BUFFER['ENABLED'] = False
+    DEBUG = False
+
+# Тесты не должны делить кэш между запусками - только память процесса
+if 'test' in sys.argv or 'pytest' in sys.modules:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
\ No newline at end of file
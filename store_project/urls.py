@@ -24,11 +24,12 @@ from django.views.generic import TemplateView
 from store_app.views.auth_views import login_view, CustomerSignUpView, ManagerSignUpView
 from store_app.views.contacts import branches_view
 from store_app.views.dashboard_views import manager_dashboard, get_stores_by_city, \
-    customer_profile, home, buy_page, sell_page
+    customer_profile, home, buy_page, sell_page, export_manager_products
 from store_app.views.favorite_views import favorites_view, toggle_favorite
 from store_app.views.product_views import create_product, delete_products, \
-    deactivate_products, edit_product, product_detail # product_list,
-from store_app.views.stores import stores_view
+    deactivate_products, activate_products, change_product_prices, edit_product, product_detail, \
+    import_products # product_list,
+from store_app.views.stores import nearest_stores, stores_view
 from store_project import settings
 
 urlpatterns = [
@@ -47,19 +48,24 @@ urlpatterns = [
     # Подвал
     path('home/contacts/', branches_view, name='contacts_view'), # Филиалы
     path('stores/', stores_view, name='stores'),  # Новый URL для страницы филиалов
+    path('stores/nearest/', nearest_stores, name='nearest_stores'),  # Ближайшие филиалы (JSON)
     path('privacy/', TemplateView.as_view(template_name='templates/basement/privacy.html'), name='privacy_policy'),  # (Не используется)
 
     # Dashboard URLs
     path('manager/dashboard/', manager_dashboard, name='manager_dashboard'),  # Отображает страницу менеджера.
+    path('manager/products/export/', export_manager_products, name='export_manager_products'),  # Выгрузка товаров в CSV.
     # Не используется пока.
     path('customer/dashboard/', customer_profile, name='customer_dashboard'), # Отображает страницу покупателя.
 
     # Product URLs
     path('manager/create-product/', create_product, name='create_product'), # Создание продукта.
+    path('manager/import-products/', import_products, name='import_products'), # Импорт товаров из файла.
     path('product/<int:id>/<slug:slug>/', product_detail, name='product_detail'),  # Просмотр продукта.
     path('product/edit/<int:pk>/', edit_product, name='edit_product'),  # Редактирование продукта.
     path('manager/delete-products/', delete_products, name='delete_products'), # Удаление продукта.
     path('manager/deactivate-products/', deactivate_products, name='deactivate_products'), # Снять с продажи.
+    path('manager/activate-products/', activate_products, name='activate_products'), # Вернуть в продажу.
+    path('manager/change-prices/', change_product_prices, name='change_product_prices'), # Массовое изменение цен.
 
     # Favorites URLs
     path('favorites/', favorites_view, name='favorites'),  # Для просмотра избранного
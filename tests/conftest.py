@@ -6,11 +6,48 @@ from factory.django import DjangoModelFactory
 from django.test import Client
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from store_app.models import Store, Category, Manager, Customer, Product, User
+from store_app.services.catalog_facets import invalidate_facets
+from store_app.services.product_search import reset_inverted_index
+from store_app.services.search_suggestions import reset_suggestion_index
+from store_app.services.staff_ips import invalidate_staff_ips
+from store_app.services.tiered_cache import get_tiered_cache
 
 
 User = get_user_model()
 
+
+@pytest.fixture(autouse=True)
+def sync_page_views(settings):
+    """В тестах просмотры страниц пишутся сразу, без фонового потока буфера"""
+    settings.ANALYTICS_BUFFER = {'ENABLED': False}
+
+
+@pytest.fixture(autouse=True)
+def clean_staff_ips_cache():
+    """Кэш реестра IP менеджеров живёт в процессе - сбрасываем его между тестами"""
+    invalidate_staff_ips()
+    yield
+    invalidate_staff_ips()
+
+
+@pytest.fixture(autouse=True)
+def clean_catalog_caches():
+    """Индексы и кэши каталога в памяти переживают откат транзакции теста - сбрасываем их"""
+    reset_inverted_index()
+    reset_suggestion_index()
+    invalidate_facets()
+    cache.clear()
+    get_tiered_cache().clear_local()
+    yield
+    reset_inverted_index()
+    reset_suggestion_index()
+    invalidate_facets()
+    cache.clear()
+    get_tiered_cache().clear_local()
+
 # Models/Product
 @pytest.fixture
 def test_store(db):
@@ -29,6 +66,29 @@ def test_category(db):
         slug="smartfony"
     )
 
+@pytest.fixture
+def test_media(settings, tmp_path):
+    """Файлы во временном каталоге, копии изображений создаются без пула потоков"""
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_DERIVATIVES = {'ENABLED': False, 'WIDTHS': (320, 640, 1280)}
+    return tmp_path
+
+
+@pytest.fixture
+def make_test_product(db, test_category, test_store, test_manager, test_media):
+    """Фабрика товаров с необязательным изображением (bytes или File)"""
+    def make(name, image=None, store=None, filename='photo.jpg'):
+        product = Product(name=name, price=10, store=store or test_store, category=test_category,
+                          created_by=test_manager)
+        if image is not None:
+            if isinstance(image, bytes):
+                image = ContentFile(image)
+            product.image.save(filename, image, save=False)
+        product.save()
+        return product
+    return make
+
+
 @pytest.fixture
 def test_product(db, test_category, test_store, test_manager):
     """Фикстура для создания тестового продукта"""
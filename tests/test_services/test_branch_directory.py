@@ -0,0 +1,99 @@
+import json
+import pytest
+from datetime import datetime, time
+from django.db import transaction
+from django.test import RequestFactory
+from store_app.models import Store, WorkingHours
+from store_app.services.branch_directory import get_branch_directory
+from store_app.views.contacts import branches_view
+from store_app.views.stores import stores_view
+
+MONDAY_NOON = datetime(2024, 1, 1, 12, 0)
+MONDAY_NIGHT = datetime(2024, 1, 1, 23, 0)
+
+
+@pytest.fixture
+def branches(test_store):
+    """Два филиала в Москве и один в Казани"""
+    test_store.latitude, test_store.longitude = 55.75, 37.61  # вне допустимых долгот
+    test_store.save()
+    second = Store.objects.create(city='Москва', address='ул. Арбат, д. 2', latitude=55.75, longitude=45.0)
+    kazan = Store.objects.create(city='Казань', address='ул. Баумана, д. 1', latitude=55.79, longitude=49.12)
+    Store.objects.create(city='Сочи', address='ул. Морская, д. 1', is_active=False)
+    for store in (test_store, second, kazan):
+        WorkingHours.objects.create(store=store, day_of_week=0, opening_time=time(10), closing_time=time(20))
+    return test_store, second, kazan
+
+
+@pytest.mark.django_db
+class TestBranchDirectory:
+    """Тесты для справочника филиалов"""
+
+    def test_context_structure(self, branches):
+        """Тест что филиалы сгруппированы по городам, а в JSON только корректные координаты"""
+        context = get_branch_directory().context(now=MONDAY_NOON)
+        assert [city['city'] for city in context['cities']] == ['Казань', 'Москва']
+        assert context['total_branches'] == 3
+        assert context['active_branches'] == 3
+
+        cities_json = json.loads(context['cities_json'])
+        moscow = next(city for city in cities_json if city['city'] == 'Москва')
+        assert [branch['address'] for branch in moscow['branches']] == ['ул. Арбат, д. 2']
+        assert moscow['branches'][0]['schedule'][0] == {
+            'day': 'Понедельник', 'time': '10:00 - 20:00', 'is_closed': False,
+        }
+
+    def test_open_flags_recomputed_per_request(self, branches, django_assert_num_queries):
+        """Тест что справочник берётся из памяти, а статусы считаются на момент запроса"""
+        directory = get_branch_directory()
+        with django_assert_num_queries(0):
+            night = directory.context(now=MONDAY_NIGHT)
+        assert night['active_branches'] == 0
+        assert json.loads(night['stores_json'])[0]['status_text'] == 'Закрыт'
+
+    def test_rebuilt_after_changes(self, branches, django_capture_on_commit_callbacks):
+        """Тест что изменения филиала и расписания перестраивают справочник"""
+        first = get_branch_directory()
+        assert get_branch_directory() is first
+
+        _, second, _ = branches
+        WorkingHours.objects.filter(store=second).update(closing_time=time(11))
+        with django_capture_on_commit_callbacks(execute=True):
+            WorkingHours.objects.get(store=second).save()
+        directory = get_branch_directory()
+        assert directory is not first
+        assert directory.context(now=MONDAY_NOON)['active_branches'] == 2
+
+        second.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            second.save()
+        assert get_branch_directory().context()['total_branches'] == 2
+
+    def test_invalidated_after_commit(self, branches, django_capture_on_commit_callbacks):
+        """Тест что справочник перестраивается только после фиксации транзакции"""
+        first = get_branch_directory()
+        _, second, _ = branches
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                second.is_active = False
+                second.save()
+                # До COMMIT другой запрос не должен собрать справочник под новой версией
+                assert get_branch_directory() is first
+
+        assert get_branch_directory() is first
+        for callback in callbacks:
+            callback()
+        assert get_branch_directory() is not first
+        assert get_branch_directory().context()['total_branches'] == 2
+
+    def test_views_render(self, branches):
+        """Тест что обе страницы филиалов отдаются из справочника"""
+        request = RequestFactory().get('/stores/', {'city': 'Казань'})
+        response = stores_view(request)
+        assert response.status_code == 200
+        assert 'Баумана' in response.content.decode()
+        assert 'Арбат' not in response.content.decode()
+
+        response = branches_view(RequestFactory().get('/home/contacts/'))
+        assert 'Арбат' in response.content.decode()
@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from store_app.models import Product, Store
+from store_app.services.catalog_cache import bump_catalog_version, get_catalog_version
+
+
+@pytest.fixture
+def latin_product(test_category, test_store, test_manager):
+    return Product.objects.create(
+        category=test_category, name='Pixel 9', description='Google phone', price=59999,
+        store=test_store, created_by=test_manager,
+    )
+
+
+@pytest.mark.django_db
+class TestCatalogPageCache:
+    """Тесты для кэша страниц каталога"""
+
+    def test_anonymous_page_served_from_cache(self, client, latin_product):
+        """Тест что повторный анонимный запрос с теми же фильтрами не выполняет запросов каталога"""
+        first = client.get(reverse('buy'), {'search': 'pixel', 'city': ''})
+        assert first['X-Catalog-Cache'] == 'miss'
+
+        # Остаются только запросы сессии и статистики просмотров из middleware
+        with CaptureQueriesContext(connection) as captured:
+            second = client.get(reverse('buy'), {'search': ' pixel '})
+        assert second['X-Catalog-Cache'] == 'hit'
+        assert second.content == first.content
+        assert not any('store_app_product' in query['sql'] for query in captured.captured_queries)
+
+    def test_catalog_change_bumps_version(self, client, latin_product, django_capture_on_commit_callbacks):
+        """Тест что изменение товара или филиала инвалидирует страницы"""
+        client.get(reverse('buy'))
+        version = get_catalog_version()
+
+        latin_product.price = 49999
+        with django_capture_on_commit_callbacks(execute=True):
+            latin_product.save()
+        assert get_catalog_version() > version
+
+        response = client.get(reverse('buy'))
+        assert response['X-Catalog-Cache'] == 'miss'
+        assert '49999' in response.content.decode()
+
+        version = get_catalog_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            Store.objects.create(city='Казань', address='ул. Баумана, д. 1')
+        assert get_catalog_version() > version
+
+    def test_version_bumped_after_commit(self, client, latin_product, django_capture_on_commit_callbacks):
+        """Тест что страница, запрошенная до фиксации изменения, не кэшируется под новой версией"""
+        version = get_catalog_version()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                latin_product.price = 49999
+                latin_product.save()
+                assert get_catalog_version() == version
+                client.get(reverse('buy'))
+
+        assert get_catalog_version() == version
+        for callback in callbacks:
+            callback()
+        assert get_catalog_version() > version
+        assert client.get(reverse('buy'))['X-Catalog-Cache'] == 'miss'
+
+    def test_authenticated_page_not_cached(self, client, test_manager_with_user, latin_product):
+        """Тест что страница авторизованного пользователя не попадает в кэш"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        response = client.get(reverse('buy'))
+        assert 'X-Catalog-Cache' not in response
+
+    def test_products_fragment_shared(self, client, test_manager_with_user, latin_product, test_category,
+                                      test_store, test_manager):
+        """Тест что фрагмент прокрутки общий для анонимных и менеджеров"""
+        for index in range(12):
+            Product.objects.create(
+                category=test_category, name=f'Accessory {index}', price=100 + index,
+                store=test_store, created_by=test_manager,
+            )
+        cursor = client.get(reverse('buy')).context['next_cursor']
+        params = {'cursor': cursor}
+
+        anonymous = client.get(reverse('buy'), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        assert anonymous['X-Catalog-Cache'] == 'miss'
+        assert 'Pixel 9' in anonymous.content.decode()
+
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        manager = client.get(reverse('buy'), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        assert manager['X-Catalog-Cache'] == 'hit'
+
+    def test_bump_without_version_key(self):
+        """Тест что версия создаётся, даже если ключа ещё нет в кэше"""
+        assert bump_catalog_version() > 0
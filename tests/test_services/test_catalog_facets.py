@@ -0,0 +1,82 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from store_app.models import Category, Product, Store
+from store_app.services.catalog_facets import facet_signature, get_facets
+
+
+@pytest.fixture
+def facet_catalog(test_category, test_store, test_manager):
+    """Две категории в двух городах"""
+    kazan = Store.objects.create(city='Казань', address='ул. Баумана, д. 1')
+    laptops = Category.objects.create(name='Ноутбуки', slug='noutbuki')
+    rows = [
+        (test_category, test_store, 'Phone A', 100),
+        (test_category, kazan, 'Phone B', 200),
+        (laptops, test_store, 'Laptop A', 1000),
+        (laptops, test_store, 'Laptop B', 1500),
+        (laptops, kazan, 'Laptop C', 3000),
+    ]
+    for category, store, name, price in rows:
+        Product.objects.create(
+            category=category, name=name, price=price, store=store,
+            created_by=test_manager, slug=name.lower().replace(' ', '-'),
+        )
+    Product.objects.create(
+        category=laptops, name='Laptop Old', price=10, store=kazan, available=False,
+        created_by=test_manager, slug='laptop-old',
+    )
+    return {'moscow': test_store, 'kazan': kazan, 'phones': test_category, 'laptops': laptops}
+
+
+@pytest.mark.django_db
+class TestCatalogFacets:
+    """Тесты для счётчиков фильтров каталога"""
+
+    def test_counts_without_filters(self, facet_catalog):
+        """Тест что без фильтров считаются все доступные товары"""
+        facets = get_facets({})
+        assert facets['total'] == 5
+        assert facets['cities'] == {'Москва': 3, 'Казань': 2}
+        assert facets['categories'] == {facet_catalog['phones'].id: 2, facet_catalog['laptops'].id: 3}
+        assert facets['price_min'] == Decimal('100') and facets['price_max'] == Decimal('3000')
+
+    def test_facet_ignores_own_filter(self, facet_catalog):
+        """Тест что счётчик фасета учитывает остальные фильтры, но не свой"""
+        facets = get_facets({'city': 'Казань', 'category': str(facet_catalog['laptops'].id)})
+        assert facets['total'] == 1
+        # Города - по выбранной категории
+        assert facets['cities'] == {'Москва': 2, 'Казань': 1}
+        # Категории - по выбранному городу
+        assert facets['categories'] == {facet_catalog['phones'].id: 1, facet_catalog['laptops'].id: 1}
+        assert facets['stores'] == {facet_catalog['kazan'].id: 1}
+        assert facets['price_min'] == facets['price_max'] == Decimal('3000')
+
+    def test_price_and_search_filters(self, facet_catalog):
+        """Тест что цена и поиск сужают все счётчики"""
+        facets = get_facets({'price_min': '150', 'search': 'laptop'})
+        assert facets['total'] == 3
+        assert facets['cities'] == {'Москва': 2, 'Казань': 1}
+
+    def test_memoised_per_signature(self, facet_catalog, django_assert_num_queries):
+        """Тест что повторный запрос с той же сигнатурой не обращается к БД"""
+        get_facets({'search': ' Phone '})
+        with django_assert_num_queries(0):
+            get_facets({'search': 'phone', 'store': ''})
+        assert facet_signature({'search': ' Phone '}) == facet_signature({'search': 'phone', 'store': ''})
+
+    def test_invalidated_on_product_change(self, facet_catalog, test_manager):
+        """Тест что изменение товара сбрасывает запомненные счётчики"""
+        assert get_facets({})['total'] == 5
+        Product.objects.filter(name='Laptop Old').update(available=True)
+        assert get_facets({})['total'] == 5
+
+        product = Product.objects.get(name='Laptop Old')
+        product.save()
+        assert get_facets({})['total'] == 6
+
+    def test_buy_page_shows_counts(self, client, facet_catalog):
+        """Тест что страница покупки выводит счётчики в фильтрах"""
+        response = client.get(reverse('buy'))
+        assert ('Казань', 2) in response.context['city_options']
+        assert 'Казань (2)' in response.content.decode()
@@ -0,0 +1,183 @@
+import threading
+import time
+import pytest
+from django.db import OperationalError, connection
+from store_app.models import Store
+from store_project.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeInfo:
+    transaction_status = 0
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise RuntimeError('server closed the connection')
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+        self.autocommit = True
+        self.rolled_back = False
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = 0
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    options = {'max_size': 2, 'timeout': 0.2, 'health_check_after': 0}
+    options.update(kwargs)
+    return ConnectionPool(**options)
+
+
+class TestConnectionPool:
+    """Тесты для пула соединений"""
+
+    def test_reuses_connections(self):
+        """Тест что возвращённое соединение выдаётся повторно без подключения"""
+        pool = make_pool()
+        first = pool.getconn(FakeConnection)
+        pool.putconn(first)
+
+        assert pool.getconn(FakeConnection) is first
+        stats = pool.stats()
+        assert stats['connections_created'] == 1
+        assert stats['checkouts'] == 2
+        assert stats['in_use'] == 1
+
+    def test_health_check_replaces_broken(self):
+        """Тест что соединение, не прошедшее проверку, заменяется новым"""
+        pool = make_pool()
+        first = pool.getconn(FakeConnection)
+        pool.putconn(first)
+        first.broken = True
+
+        second = pool.getconn(FakeConnection)
+
+        assert second is not first
+        assert first.closed
+        assert pool.stats()['health_check_failures'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_rolls_back_on_return(self):
+        """Тест что незавершённая транзакция откатывается при возврате"""
+        pool = make_pool()
+        conn = pool.getconn(FakeConnection)
+        conn.info.transaction_status = 2
+        conn.autocommit = False
+
+        pool.putconn(conn)
+
+        assert conn.rolled_back
+        assert conn.autocommit
+        assert pool.stats()['idle'] == 1
+
+    def test_exhaustion_times_out(self, caplog):
+        """Тест что при занятом пуле ожидание ограничено и учитывается в метриках"""
+        pool = make_pool()
+        pool.getconn(FakeConnection)
+        pool.getconn(FakeConnection)
+
+        with pytest.raises(PoolTimeout):
+            pool.getconn(FakeConnection)
+
+        stats = pool.stats()
+        assert stats['timeouts'] == 1
+        assert stats['max_wait_time'] >= 0.2
+        assert 'исчерпан' in caplog.text
+
+    def test_waits_for_returned_connection(self):
+        """Тест что ждущий поток получает соединение, как только его вернули"""
+        pool = make_pool(max_size=1, timeout=2)
+        conn = pool.getconn(FakeConnection)
+        timer = threading.Timer(0.1, pool.putconn, [conn])
+        timer.start()
+
+        assert pool.getconn(FakeConnection) is conn
+        timer.join()
+        stats = pool.stats()
+        assert stats['waits'] == 1
+        assert 0.05 < stats['wait_time'] < 2
+
+    def test_expires_old_connections(self):
+        """Тест что старые и долго простаивающие соединения закрываются"""
+        pool = make_pool(min_size=0, max_idle=0.05, max_lifetime=60)
+        idle = pool.getconn(FakeConnection)
+        pool.putconn(idle)
+        time.sleep(0.1)
+
+        assert pool.getconn(FakeConnection) is not idle
+        assert idle.closed
+
+        pool = make_pool(max_lifetime=0)
+        old = pool.getconn(FakeConnection)
+        pool.putconn(old)
+        assert pool.getconn(FakeConnection) is not old
+
+    def test_failed_connect_frees_slot(self):
+        """Тест что ошибка подключения не занимает место в пуле"""
+        pool = make_pool(max_size=1)
+
+        def fail():
+            raise OSError('connection refused')
+
+        with pytest.raises(OSError):
+            pool.getconn(fail)
+        assert pool.getconn(FakeConnection)
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql'
+                    or connection.settings_dict['ENGINE'] != 'store_project.db.postgresql_pool',
+                    reason='Бэкенд с пулом соединений не используется')
+@pytest.mark.django_db(transaction=True)
+class TestPooledBackend:
+    """Тесты для бэкенда PostgreSQL с пулом"""
+
+    def test_close_returns_connection(self):
+        """Тест что закрытие соединения Django возвращает его в пул"""
+        connection.close()
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+
+        assert connection.connection is raw
+        assert connection.pool_stats()[0]['connections_created'] >= 1
+
+    def test_rolled_back_between_requests(self):
+        """Тест что данные незавершённой транзакции не переживают возврат в пул"""
+        connection.set_autocommit(False)
+        # bulk_create - без сигналов: on_commit запрещён при ручном управлении транзакцией
+        Store.objects.bulk_create([Store(city='Тверь', address='ул. Пул, 1')])
+        connection.close()
+
+        assert not Store.objects.filter(address='ул. Пул, 1').exists()
+
+    def test_exhaustion_raises_operational_error(self, monkeypatch):
+        """Тест что исчерпание пула превращается в OperationalError Django"""
+        connection.close()
+        pool = connection.get_connection_pool(connection.get_connection_params())
+
+        def exhausted(connect):
+            raise PoolTimeout('Нет свободного соединения')
+
+        monkeypatch.setattr(pool, 'getconn', exhausted)
+        with pytest.raises(OperationalError):
+            connection.ensure_connection()
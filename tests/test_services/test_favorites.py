@@ -0,0 +1,114 @@
+import json
+from io import StringIO
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from store_app.models import Customer, FavoriteProduct, Product, User
+from store_app.services.favorites import (
+    get_favorite_ids, recount_favorite_counters, toggle_favorite, with_favorite_flag,
+)
+
+
+@pytest.fixture
+def buyer(db):
+    """Покупатель с учётной записью"""
+    customer = Customer.objects.create(email='buyer@example.com')
+    user = User.objects.create_user(
+        username='buyer', password='testpass123', role=User.Role.CUSTOMER, customer_profile=customer,
+    )
+    return user, customer
+
+
+@pytest.mark.django_db
+class TestFavorites:
+    """Тесты для избранного и его счётчиков"""
+
+    def test_toggle_updates_counters(self, buyer, test_product):
+        """Тест что переключение избранного поддерживает счётчики покупателя и товара"""
+        _, customer = buyer
+        assert toggle_favorite(customer.id, test_product.id) == ('added', 1)
+        customer.refresh_from_db()
+        test_product.refresh_from_db()
+        assert customer.favorite_count == 1
+        assert test_product.favorites_count == 1
+
+        assert toggle_favorite(customer.id, test_product.id) == ('removed', 0)
+        test_product.refresh_from_db()
+        assert test_product.favorites_count == 0
+        assert not FavoriteProduct.objects.exists()
+
+    def test_toggle_missing_product(self, buyer):
+        """Тест что для несуществующего товара ничего не меняется"""
+        _, customer = buyer
+        with pytest.raises(Product.DoesNotExist):
+            toggle_favorite(customer.id, 999999)
+        customer.refresh_from_db()
+        assert customer.favorite_count == 0
+
+    def test_favorite_ids_cached_until_toggle(self, buyer, test_product):
+        """Тест что набор избранного берётся из кэша и сбрасывается при переключении"""
+        _, customer = buyer
+        assert get_favorite_ids(customer.id) == frozenset()
+        with CaptureQueriesContext(connection) as queries:
+            get_favorite_ids(customer.id)
+        assert len(queries) == 0
+
+        toggle_favorite(customer.id, test_product.id)
+        assert get_favorite_ids(customer.id) == {test_product.id}
+
+    def test_product_delete_decrements_customer_counter(self, buyer, test_product):
+        """Тест что удаление товара уменьшает счётчики покупателей, добавивших его в избранное"""
+        _, customer = buyer
+        toggle_favorite(customer.id, test_product.id)
+        test_product.delete()
+        customer.refresh_from_db()
+        assert customer.favorite_count == 0
+        assert get_favorite_ids(customer.id) == frozenset()
+
+    def test_recount(self, buyer, test_product):
+        """Тест что пересчёт восстанавливает счётчики по таблице избранного"""
+        _, customer = buyer
+        FavoriteProduct.objects.create(user=customer, product=test_product)
+        recount_favorite_counters()
+        assert Customer.objects.get(pk=customer.pk).favorite_count == 1
+        assert Product.objects.get(pk=test_product.pk).favorites_count == 1
+        out = StringIO()
+        call_command('recount_favorites', stdout=out)
+        assert 'покупателей 1' in out.getvalue()
+
+    def test_toggle_view(self, client, buyer, test_product):
+        """Тест что представление переключения возвращает статус и счётчик из сервиса"""
+        user, _ = buyer
+        client.force_login(user)
+        response = client.post('/favorites/toggle/', {'product_id': test_product.id})
+        assert json.loads(response.content) == {
+            'status': 'added', 'count': 1, 'product_id': str(test_product.id),
+        }
+        response = client.post('/favorites/toggle/', {'product_id': 999999})
+        assert response.status_code == 404
+
+    def test_favorite_flag_annotation(self, buyer, test_product):
+        """Тест что товары аннотируются флагом is_favorite для покупателя и False для остальных"""
+        user, customer = buyer
+        toggle_favorite(customer.id, test_product.id)
+        products = with_favorite_flag(Product.objects.all(), user)
+        assert [product.is_favorite for product in products] == [True]
+
+        other = User.objects.create_user(username='other', password='x', role=User.Role.CUSTOMER,
+                                         customer_profile=Customer.objects.create(email='other@example.com'))
+        assert not with_favorite_flag(Product.objects.all(), other).get().is_favorite
+        assert not with_favorite_flag(Product.objects.all(), AnonymousUser()).get().is_favorite
+
+    def test_buy_page_marks_favorite_cards(self, client, buyer, test_product):
+        """Тест что при первой загрузке карточки избранных товаров отмечены сервером"""
+        user, customer = buyer
+        test_product.name = 'Test phone'
+        test_product.slug = ''
+        test_product.save()
+        toggle_favorite(customer.id, test_product.id)
+        client.force_login(user)
+        response = client.get('/buy/')
+        assert 'favorite-btn mb-2 active' in response.content.decode()
+        assert response.context['user_favorites'] == [test_product.id]
@@ -0,0 +1,83 @@
+import pytest
+from django.utils import timezone
+from store_app.models import PageView, PageViewDailyRollup
+from store_app.services.hyperloglog import HyperLogLog
+from store_app.services.visitor_rollups import merge_page_views, refresh_day
+
+
+class TestHyperLogLog:
+    """Тесты для скетча HyperLogLog"""
+
+    def test_small_cardinality_is_exact_enough(self):
+        """Тест что для малого числа значений оценка почти точная"""
+        sketch = HyperLogLog()
+        sketch.update(f'session-{i}' for i in range(100))
+        assert abs(sketch.count() - 100) <= 2
+
+    def test_duplicates_are_not_counted(self):
+        """Тест что повторы не увеличивают оценку"""
+        sketch = HyperLogLog()
+        for _ in range(5):
+            sketch.update(['a', 'b', 'c'])
+        assert sketch.count() == 3
+
+    def test_large_cardinality_within_error_bound(self):
+        """Тест что ошибка на большом числе значений в пределах 3 сигм"""
+        sketch = HyperLogLog(precision=12)
+        sketch.update(str(i) for i in range(50000))
+        assert abs(sketch.count() - 50000) / 50000 < 3 * sketch.relative_error
+
+    def test_merge_equals_union(self):
+        """Тест что объединение скетчей равно скетчу объединения"""
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        first.update(str(i) for i in range(0, 3000))
+        second.update(str(i) for i in range(2000, 5000))
+        union.update(str(i) for i in range(0, 5000))
+
+        assert first.merge(second).registers == union.registers
+
+    def test_serialization_roundtrip(self):
+        """Тест сериализации регистров"""
+        sketch = HyperLogLog(precision=10)
+        sketch.update(['x', 'y'])
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+        assert restored.precision == 10
+        assert restored.registers == sketch.registers
+
+    def test_merge_different_precision_fails(self):
+        """Тест что скетчи разной точности не объединяются"""
+        with pytest.raises(ValueError):
+            HyperLogLog(precision=10).merge(HyperLogLog(precision=12))
+
+
+@pytest.mark.django_db
+class TestApproximateRollups:
+    """Тесты для агрегатов посещений со скетчами"""
+
+    @pytest.fixture(autouse=True)
+    def approximate(self, settings):
+        settings.ANALYTICS_APPROXIMATE_UNIQUES = True
+
+    def test_refresh_day_stores_sketch(self):
+        """Тест что пересчёт дня сохраняет скетч и оценку"""
+        for key in ('a', 'b', 'a'):
+            PageView.objects.create(session_key=key, url='/buy/', ip_address='10.0.0.1')
+
+        refresh_day(timezone.now().date())
+
+        site = PageViewDailyRollup.objects.get(url='', visitor_class='CLIENT')
+        assert site.views == 3
+        assert site.unique_visitors == 2
+        assert HyperLogLog.from_bytes(site.visitor_sketch).count() == 2
+
+    def test_merge_batches_is_incremental(self):
+        """Тест что пачки вливаются без пересчёта и без задвоения уникальных"""
+        batch = [PageView(session_key='a', url='/buy/', ip_address='10.0.0.1') for _ in range(2)]
+        merge_page_views(batch)
+        merge_page_views([PageView(session_key='a', url='/stores/', ip_address='10.0.0.1'),
+                          PageView(session_key='b', url='/buy/', ip_address='10.0.0.1')])
+
+        site = PageViewDailyRollup.objects.get(url='', visitor_class='CLIENT')
+        assert site.views == 4
+        assert site.unique_visitors == 2
+        assert PageView.get_period_unique_visitors(days=30)['unique_visitors'] == 2
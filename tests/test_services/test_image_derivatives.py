@@ -0,0 +1,136 @@
+import io
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from PIL import Image
+from store_app.services import image_derivatives
+from store_app.services.image_derivatives import derivative_name
+
+
+def image_file(width=800, height=600, color='red', image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, image_format)
+    return ContentFile(buffer.getvalue())
+
+
+@pytest.mark.django_db
+class TestImageDerivatives:
+    """Тесты для уменьшенных копий изображений товаров"""
+
+    def test_created_after_commit(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что после фиксации создаются WebP и JPEG всех ширин без увеличения исходника"""
+        with django_capture_on_commit_callbacks(execute=True):
+            product = make_test_product('Camera', image_file(800, 600))
+
+        product.refresh_from_db()
+        derivatives = product.image_derivatives
+        assert derivatives['source'] == product.image.name
+        assert derivatives['widths'] == [320, 640, 800]
+        for width in derivatives['widths']:
+            for extension in ('webp', 'jpg'):
+                assert default_storage.exists(derivative_name(derivatives['hash'], width, extension))
+        with default_storage.open(derivative_name(derivatives['hash'], 320, 'webp')) as file:
+            with Image.open(file) as image:
+                assert image.format == 'WEBP'
+                assert image.size == (320, 240)
+
+    def test_not_created_before_commit(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что сохранение товара само копии не создаёт"""
+        with django_capture_on_commit_callbacks() as callbacks:
+            product = make_test_product('Camera', image_file())
+
+        product.refresh_from_db()
+        assert product.image_derivatives == {}
+        # Кроме копий, после фиксации сбрасываются кэши каталога
+        assert [callback.__module__ for callback in callbacks].count(image_derivatives.__name__) == 1
+
+    def test_same_content_shared(self, make_test_product, test_media, django_capture_on_commit_callbacks):
+        """Тест что одинаковые изображения разных товаров используют одни копии"""
+        with django_capture_on_commit_callbacks(execute=True):
+            first = make_test_product('First', image_file(color='blue'))
+            second = make_test_product('Second', image_file(color='blue'))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.image_derivatives['hash'] == second.image_derivatives['hash']
+        files = list((test_media / 'derivatives').rglob('*.*'))
+        assert len(files) == 6
+
+    def test_replaced_image_not_overwritten(self, make_test_product):
+        """Тест что копии устаревшего изображения не записываются товару"""
+        product = make_test_product('Camera', image_file(color='green'))
+        old_name = product.image.name
+        product.image.save('new.png', image_file(color='yellow'))
+
+        assert not image_derivatives.refresh_product_derivatives(product.id, old_name)
+        product.refresh_from_db()
+        assert product.image_derivatives == {}
+
+    def test_broken_image(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что файл, который не читается как изображение, не ломает сохранение"""
+        with django_capture_on_commit_callbacks(execute=True):
+            product = make_test_product('Broken', ContentFile(b'not an image'))
+
+        product.refresh_from_db()
+        assert product.image_derivatives == {}
+
+    def test_background_pool(self, settings, make_test_product, monkeypatch, django_capture_on_commit_callbacks):
+        """Тест что при включённом пуле задача уходит в фоновые потоки"""
+        settings.IMAGE_DERIVATIVES = {'ENABLED': True}
+        submitted = []
+        monkeypatch.setattr(image_derivatives.DerivativePool, 'submit',
+                            lambda pool, product_id, name: submitted.append((product_id, name)))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product = make_test_product('Camera', image_file())
+
+        assert submitted == [(product.id, product.image.name)]
+
+    def test_command_backfills(self, make_test_product):
+        """Тест что команда создаёт копии для товаров без них"""
+        product = make_test_product('Camera', image_file())
+        out = io.StringIO()
+
+        call_command('generate_image_derivatives', stdout=out)
+
+        product.refresh_from_db()
+        assert image_derivatives.is_ready(product)
+        assert 'созданы: 1' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestProductImageTag:
+    """Тесты для шаблонного тега product_image"""
+
+    template = Template('{% load product_images %}{% product_image product sizes="50vw" css_class="img-fluid" %}')
+
+    def test_srcset_when_ready(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что готовые копии выводятся через <picture> с srcset для WebP и JPEG"""
+        with django_capture_on_commit_callbacks(execute=True):
+            product = make_test_product('Camera', image_file(1600, 1200))
+        product.refresh_from_db()
+        digest = product.image_derivatives['hash']
+
+        html = self.template.render(Context({'product': product}))
+
+        assert '<source type="image/webp"' in html
+        assert f'/media/{derivative_name(digest, 320, "webp")} 320w' in html
+        assert f'/media/{derivative_name(digest, 1280, "jpg")} 1280w' in html
+        assert 'sizes="50vw"' in html and 'class="img-fluid"' in html
+        assert product.image.url not in html
+
+    def test_original_until_ready(self, make_test_product):
+        """Тест что до создания копий выводится исходное изображение"""
+        product = make_test_product('Camera', image_file())
+
+        html = self.template.render(Context({'product': product}))
+
+        assert f'src="{product.image.url}"' in html
+        assert 'srcset' not in html
+
+    def test_no_image(self, make_test_product):
+        """Тест что у товара без изображения тег ничего не выводит"""
+        product = make_test_product('Camera')
+        assert self.template.render(Context({'product': product})) == ''
@@ -0,0 +1,95 @@
+import pytest
+from django.urls import reverse
+from store_app.models import Product, Store
+from store_app.services.keyset_pagination import (
+    InvalidCursor, decode_cursor, encode_cursor, keyset_page,
+)
+
+ORDERING = ('name', 'price', 'id')
+
+
+@pytest.fixture
+def catalog(test_category, test_store, test_manager):
+    """Товары с одинаковыми названиями и ценами в двух магазинах"""
+    second_store = Store.objects.create(city='Казань', address='ул. Баумана, д. 1')
+    products = []
+    for index in range(15):
+        for store in (test_store, second_store):
+            products.append(Product.objects.create(
+                category=test_category, name=f'Phone {index % 5} v{index // 5}',
+                price=1000 + index % 2, store=store, created_by=test_manager,
+                slug=f'phone-{index}-{store.id}',
+            ))
+    return products
+
+
+@pytest.mark.django_db
+class TestKeysetPage:
+    """Тесты для постраничной выдачи по курсору"""
+
+    def test_pages_cover_all_rows_in_order(self, catalog):
+        """Тест что проход по курсорам даёт все товары в порядке сортировки без повторов"""
+        expected = list(Product.objects.order_by(*ORDERING))
+        seen = []
+        cursor = None
+        while True:
+            items, cursor = keyset_page(Product.objects.all(), ORDERING, cursor, per_page=4)
+            seen.extend(items)
+            if cursor is None:
+                break
+        assert seen == expected
+
+    def test_descending_field(self, catalog):
+        """Тест что убывающие поля сортировки тоже поддерживаются"""
+        ordering = ('-price', 'name', 'id')
+        first, cursor = keyset_page(Product.objects.all(), ordering, None, per_page=20)
+        rest, last_cursor = keyset_page(Product.objects.all(), ordering, cursor, per_page=20)
+        assert first + rest == list(Product.objects.order_by(*ordering))
+        assert last_cursor is None
+
+    def test_new_rows_do_not_shift_page(self, catalog, test_category, test_store, test_manager):
+        """Тест что товар, добавленный перед курсором, не дублирует выдачу"""
+        first, cursor = keyset_page(Product.objects.all(), ORDERING, None, per_page=10)
+        Product.objects.create(
+            category=test_category, name='AAA first', price=1, store=test_store,
+            created_by=test_manager, slug='aaa-first',
+        )
+        second, _ = keyset_page(Product.objects.all(), ORDERING, cursor, per_page=10)
+        assert not set(first) & set(second)
+        assert second[0] == list(Product.objects.order_by(*ORDERING))[11]
+
+    def test_cursor_roundtrip_and_validation(self, test_product):
+        """Тест что курсор кодирует значения и отвергает чужую сортировку"""
+        test_product.refresh_from_db()
+        cursor = encode_cursor(ORDERING, test_product)
+        assert decode_cursor(ORDERING, cursor) == [test_product.name, '29999.99', test_product.id]
+
+        with pytest.raises(InvalidCursor):
+            decode_cursor(('price', 'id'), cursor)
+        with pytest.raises(InvalidCursor):
+            decode_cursor(ORDERING, 'not-a-cursor')
+
+    def test_buy_page_ajax_with_cursor(self, client, catalog):
+        """Тест что бесконечная прокрутка на странице покупки идёт по курсору"""
+        response = client.get(reverse('buy'))
+        cursor = response.context['next_cursor']
+        assert len(response.context['products']) == 12
+        assert f'data-next-cursor="{cursor}"' in response.content.decode()
+
+        response = client.get(reverse('buy'), {'cursor': cursor}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        assert list(response.context['products']) == list(Product.objects.order_by(*ORDERING)[12:24])
+
+        response = client.get(reverse('buy'), {'cursor': 'broken'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        assert response.status_code == 400
+
+    def test_buy_page_search_pages(self, client, catalog):
+        """Тест что курсор работает и для выдачи по релевантности"""
+        response = client.get(reverse('buy'), {'search': 'phone'})
+        first_page = list(response.context['products'])
+
+        response = client.get(reverse('buy'), {'search': 'phone', 'cursor': response.context['next_cursor']},
+                              HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        second_page = list(response.context['products'])
+
+        assert len(first_page) == 12 and len(second_page) == 12
+        assert not set(first_page) & set(second_page)
@@ -0,0 +1,78 @@
+import csv
+import io
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from store_app.models import Category, Product, Store
+from store_app.services.manager_listing import manager_products, ordering_for, parse_filters
+
+
+@pytest.fixture
+def inventory(test_manager_with_user, test_store, test_category):
+    """Сорок товаров в двух филиалах и двух категориях"""
+    _, manager = test_manager_with_user
+    other_store = Store.objects.create(city='Казань', address='ул. Баумана, д. 1')
+    other_category = Category.objects.create(name='Laptops')
+    Product.objects.bulk_create([
+        Product(
+            name=f'Item {number:02d}', slug=f'item-{number:02d}', price=100 + number,
+            available=number % 4 != 0,
+            store=test_store if number % 2 else other_store,
+            category=test_category if number < 20 else other_category,
+            created_by=manager,
+        )
+        for number in range(40)
+    ])
+    return other_store, other_category
+
+
+@pytest.mark.django_db
+class TestManagerListing:
+    """Тесты для списка товаров панели менеджера"""
+
+    def test_filters_pushed_to_db(self, inventory):
+        """Тест что фильтры по филиалу, категории, статусу и названию применяются в запросе"""
+        other_store, other_category = inventory
+        products = manager_products(parse_filters({
+            'store': str(other_store.id), 'category': str(other_category.id), 'status': 'available', 'q': 'item 2',
+        }))
+        assert sorted(product.name for product in products) == ['Item 22', 'Item 26']
+
+    def test_column_sorting(self, inventory):
+        """Тест сортировки по колонкам в обе стороны и порядка по умолчанию"""
+        assert ordering_for('-price') == ('-price', '-id')
+        assert ordering_for('unknown') == ('-available', 'updated_at', 'id')
+        prices = list(manager_products(parse_filters({'sort': '-price'})).values_list('price', flat=True))
+        assert prices == sorted(prices, reverse=True)
+
+    def test_paginated_page_queries(self, client, test_manager_with_user, inventory):
+        """Тест что страница выводит не больше 50 товаров и число запросов не зависит от их количества"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('manager_dashboard'), {'sort': 'name'})
+        assert response.status_code == 200
+        assert len(response.context['products']) == 40
+        assert response.context['page_obj'].paginator.count == 40
+        product_queries = [query for query in queries if 'store_app_product' in query['sql']]
+        assert len(product_queries) == 2  # COUNT и страница с JOIN категорий и филиалов
+
+        response = client.get(reverse('manager_dashboard'), {'sort': '-name', 'page': 99})
+        assert response.context['page_obj'].number == 1
+
+    def test_csv_export(self, client, test_manager_with_user, inventory):
+        """Тест что выгрузка CSV идёт потоком и учитывает фильтры"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        response = client.get(reverse('export_manager_products'), {'status': 'unavailable', 'sort': 'name'})
+        assert response.streaming
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows[0][:2] == ['ID', 'Название']
+        assert [row[1] for row in rows[1:]] == [f'Item {number:02d}' for number in range(0, 40, 4)]
+
+    def test_export_requires_manager(self, client):
+        """Тест что выгрузка недоступна без входа"""
+        response = client.get(reverse('export_manager_products'))
+        assert response.status_code == 302
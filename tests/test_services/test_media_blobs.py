@@ -0,0 +1,145 @@
+import io
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from store_app.models import MediaBlob, Product
+from store_app.services import media_blobs, product_bulk
+from store_app.services.content_storage import product_image_storage
+
+
+def refcount(name):
+    return MediaBlob.objects.get(name=name).refcount
+
+
+@pytest.mark.django_db
+class TestContentStorage:
+    """Тесты для хранилища изображений по хэшу содержимого"""
+
+    def test_identical_uploads_stored_once(self, make_test_product, test_media):
+        """Тест что одинаковое фото у двух товаров лежит на диске один раз"""
+        first = make_test_product('First', b'same photo')
+        second = make_test_product('Second', b'same photo')
+        third = make_test_product('Third', b'other photo')
+
+        assert first.image.name == second.image.name != third.image.name
+        assert first.image.name.startswith('products/')
+        assert first.image.name.endswith('.jpg')
+        assert len(list((test_media / 'products').rglob('*.jpg'))) == 2
+        assert refcount(first.image.name) == 2
+        assert refcount(third.image.name) == 1
+
+
+@pytest.mark.django_db
+class TestMediaBlobs:
+    """Тесты для учёта ссылок на файлы и сборки мусора"""
+
+    def test_replace_and_clear_image(self, make_test_product):
+        """Тест что замена и очистка изображения переносят ссылки"""
+        product = make_test_product('Camera', b'old photo')
+        old_name = product.image.name
+        product = Product.objects.get(pk=product.pk)
+
+        product.image.save('new.jpg', ContentFile(b'new photo'))
+        assert refcount(old_name) == 0
+        assert refcount(product.image.name) == 1
+
+        new_name = product.image.name
+        product.image = None
+        product.save()
+        assert refcount(new_name) == 0
+
+    def test_save_without_image_change(self, make_test_product):
+        """Тест что сохранение без смены изображения не меняет счётчик"""
+        product = make_test_product('Camera', b'photo')
+        product = Product.objects.get(pk=product.pk)
+        product.price = 20
+        product.save()
+        Product.objects.only('id', 'price').get(pk=product.pk).save()
+
+        assert refcount(product.image.name) == 1
+
+    def test_delete_releases_without_removing_file(self, make_test_product):
+        """Тест что удаление товара снимает ссылку, а общий файл остаётся"""
+        first = make_test_product('First', b'shared')
+        second = make_test_product('Second', b'shared')
+        name = first.image.name
+
+        first.delete()
+
+        assert refcount(name) == 1
+        assert product_image_storage().exists(name)
+        second.category.delete()  # каскадное удаление тоже снимает ссылку
+        assert refcount(name) == 0
+
+    def test_collect_garbage(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что файлы без ссылок удаляются после фиксации, используемые - остаются"""
+        kept = make_test_product('Kept', b'kept')
+        dropped = make_test_product('Dropped', b'dropped')
+        name = dropped.image.name
+        dropped.delete()
+
+        assert media_blobs.collect_garbage(grace_seconds=3600) == (0, 0)
+        with django_capture_on_commit_callbacks(execute=True):
+            assert media_blobs.collect_garbage(grace_seconds=0) == (1, 0)
+
+        assert not product_image_storage().exists(name)
+        assert not MediaBlob.objects.filter(name=name).exists()
+        assert product_image_storage().exists(kept.image.name)
+
+    def test_collect_rolled_back_keeps_files(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что при откате транзакции сборки файлы не удаляются"""
+        product = make_test_product('Dropped', b'dropped')
+        name = product.image.name
+        product.delete()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    media_blobs.collect_garbage(grace_seconds=0)
+                    raise RuntimeError
+        assert callbacks == []
+        assert product_image_storage().exists(name)
+        assert MediaBlob.objects.filter(name=name).exists()
+
+    def test_collect_skips_untracked_references(self, make_test_product):
+        """Тест что файл, на который сослались в обход учёта, не удаляется"""
+        product = make_test_product('Camera', b'photo')
+        MediaBlob.objects.filter(name=product.image.name).update(refcount=0)
+
+        assert media_blobs.collect_garbage(grace_seconds=0) == (0, 0)
+        assert refcount(product.image.name) == 1
+
+    def test_bulk_delete(self, make_test_product, test_manager_with_user, test_store,
+                         django_capture_on_commit_callbacks):
+        """Тест что массовое удаление снимает ссылки одним обновлением на файл"""
+        user, _ = test_manager_with_user
+        products = [make_test_product(f'Bulk {n}', b'bulk photo') for n in range(3)]
+        name = products[0].image.name
+
+        product_bulk.delete_products(user, [product.id for product in products[:2]])
+        assert refcount(name) == 1
+
+    def test_recount_and_orphans(self, make_test_product, test_media):
+        """Тест что пересчёт исправляет счётчики, а файлы без учёта попадают в сборку"""
+        product = make_test_product('Camera', b'photo')
+        MediaBlob.objects.all().delete()
+        orphan = product_image_storage().save('products/lost.jpg', ContentFile(b'lost'))
+
+        assert media_blobs.recount() == 1
+        assert refcount(product.image.name) == 1
+        assert media_blobs.register_orphans() == 1
+        assert refcount(orphan) == 0
+
+    def test_command(self, make_test_product, django_capture_on_commit_callbacks):
+        """Тест что команда удаляет файлы без ссылок"""
+        product = make_test_product('Camera', b'photo')
+        name = product.image.name
+        product.delete()
+        out = io.StringIO()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command('collect_media', grace=0, recount=True, orphans=True, stdout=out)
+
+        assert not product_image_storage().exists(name)
+        assert 'Удалено файлов изображений: 1' in out.getvalue()
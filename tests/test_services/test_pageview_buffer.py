@@ -0,0 +1,76 @@
+import pytest
+from django.test import RequestFactory
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from store_app.models import PageView
+from store_app.services.pageview_buffer import PageViewBuffer
+from store_project.middleware.analytics_middleware import AnalyticsMiddleware
+
+
+def make_page_view(url='/buy/'):
+    return PageView(session_key='anonymous', url=url, ip_address='127.0.0.1')
+
+
+@pytest.mark.django_db
+class TestPageViewBuffer:
+    """Тесты для буфера пакетной записи просмотров"""
+
+    def test_put_does_not_write_until_flush(self):
+        """Тест что просмотры пишутся только при сбросе буфера"""
+        buffer = PageViewBuffer(max_queue_size=10, batch_size=5)
+        for i in range(3):
+            assert buffer.put(make_page_view(f'/page/{i}/'))
+
+        assert PageView.objects.count() == 0
+        assert buffer.flush() == 3
+        assert PageView.objects.count() == 3
+        assert buffer.stats()['written'] == 3
+
+    def test_flush_writes_in_batches(self):
+        """Тест что сброс пишет всё содержимое очереди пачками"""
+        buffer = PageViewBuffer(max_queue_size=100, batch_size=4)
+        for _ in range(10):
+            buffer.put(make_page_view())
+
+        assert buffer.flush() == 10
+        assert buffer.stats()['pending'] == 0
+
+    def test_overflow_is_dropped_and_counted(self):
+        """Тест что при переполнении события отбрасываются и считаются"""
+        buffer = PageViewBuffer(max_queue_size=2, batch_size=10)
+        results = [buffer.put(make_page_view()) for _ in range(5)]
+
+        assert results == [True, True, False, False, False]
+        stats = buffer.stats()
+        assert stats['enqueued'] == 2
+        assert stats['dropped'] == 3
+
+    def test_stop_drains_queue(self):
+        """Тест что остановка дописывает очередь"""
+        buffer = PageViewBuffer(max_queue_size=10, batch_size=5)
+        buffer.put(make_page_view())
+        buffer.stop()
+        assert PageView.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestAnalyticsMiddlewareBuffering:
+    """Тесты для постановки просмотров в буфер из middleware"""
+
+    def test_page_view_goes_to_buffer(self, settings, monkeypatch):
+        """Тест что при включенном буфере middleware не пишет в БД сам"""
+        settings.ANALYTICS_BUFFER = {'ENABLED': True}
+        buffer = PageViewBuffer()
+        monkeypatch.setattr(
+            'store_project.middleware.analytics_middleware.get_pageview_buffer', lambda: buffer
+        )
+
+        request = RequestFactory().get('/buy/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        AnalyticsMiddleware(lambda r: None)(request)
+
+        assert PageView.objects.count() == 0
+        assert buffer.stats()['pending'] == 1
+        buffer.flush()
+        assert PageView.objects.get().url == '/buy/'
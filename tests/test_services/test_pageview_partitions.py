@@ -0,0 +1,60 @@
+import pytest
+from datetime import date, datetime
+from django.core.management import call_command
+from store_app.models import PageView, PageViewDailyRollup
+from store_app.services.pageview_partitions import add_months, compact_expired, retention_cutoff
+from store_app.services.visitor_rollups import refresh_range
+
+
+def create_view(timestamp, session_key='a'):
+    return PageView.objects.create(
+        session_key=session_key, url='/buy/', ip_address='10.0.0.1', timestamp=timestamp
+    )
+
+
+class TestRetentionHelpers:
+    """Тесты для вспомогательных функций горизонта хранения"""
+
+    def test_add_months_crosses_year(self):
+        assert add_months(date(2025, 11, 15), 3) == date(2026, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+    def test_retention_cutoff(self):
+        assert retention_cutoff(today=date(2026, 10, 17), months=12) == date(2025, 10, 1)
+
+
+@pytest.mark.django_db
+class TestCompactExpired:
+    """Тесты для свёртки старых просмотров (обычная таблица, без секций)"""
+
+    def test_old_views_are_rolled_up_and_deleted(self):
+        """Тест что старые просмотры попадают в агрегаты и удаляются"""
+        create_view(datetime(2025, 1, 10), 'a')
+        create_view(datetime(2025, 1, 10), 'b')
+        create_view(datetime(2025, 3, 5))
+        recent = create_view(datetime(2025, 6, 1))
+
+        months = compact_expired(retention_cutoff_day=date(2025, 4, 1))
+
+        assert months == [date(2025, 1, 1), date(2025, 3, 1)]
+        assert list(PageView.objects.values_list('id', flat=True)) == [recent.id]
+        rollup = PageViewDailyRollup.objects.get(date=date(2025, 1, 10), url='')
+        assert (rollup.views, rollup.unique_visitors) == (2, 2)
+
+    def test_dry_run_changes_nothing(self):
+        """Тест что --dry-run ничего не удаляет"""
+        create_view(datetime(2020, 1, 1))
+        call_command('compact_pageviews', retention_months=1, dry_run=True)
+        assert PageView.objects.count() == 1
+        assert not PageViewDailyRollup.objects.exists()
+
+    def test_recompute_keeps_compacted_rollups(self, settings):
+        """Тест что пересчёт агрегатов не затирает свёрнутые дни"""
+        settings.ANALYTICS_PAGEVIEW_RETENTION_MONTHS = 1
+        old_day = add_months(retention_cutoff(), -2)
+        create_view(datetime.combine(old_day, datetime.min.time()))
+        compact_expired()
+
+        refresh_range(old_day, date.today())
+
+        assert PageViewDailyRollup.objects.get(date=old_day, url='').views == 1
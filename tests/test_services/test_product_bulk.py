@@ -0,0 +1,167 @@
+import pytest
+from decimal import Decimal
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from store_app.models import ActionLog, Customer, FavoriteProduct, Product, User
+from store_app.services import catalog_cache, media_blobs, product_bulk
+from store_app.views import product_views
+
+
+@pytest.fixture
+def batch(test_manager, test_store, test_category, test_media):
+    """Тридцать товаров, у каждого - файл изображения"""
+    products = []
+    for number in range(30):
+        product = Product(
+            name=f'Bulk {number:02d}', slug=f'bulk-{number:02d}', price=10,
+            store=test_store, category=test_category, created_by=test_manager,
+        )
+        product.image.save(f'bulk-{number:02d}.jpg', ContentFile(b'jpeg'), save=False)
+        products.append(product)
+    return Product.objects.bulk_create(products)
+
+
+@pytest.mark.django_db
+class TestBulkDelete:
+    """Тесты для массового удаления товаров"""
+
+    def test_delete_logs_and_removes(self, batch, test_manager_with_user, django_capture_on_commit_callbacks):
+        """Тест что товары удаляются, журнал пишется по записи на товар, файлы удаляет сборщик мусора"""
+        user, _ = test_manager_with_user
+        ids = [product.id for product in batch]
+        with django_capture_on_commit_callbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                assert product_bulk.delete_products(user, ids) == 30
+        assert len(queries) < 15  # число запросов не зависит от числа товаров
+        assert not Product.objects.filter(id__in=ids).exists()
+        assert ActionLog.objects.filter(action_type='DELETE', product_id__in=ids).count() == 30
+        assert all(default_storage.exists(product.image.name) for product in batch)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            media_blobs.collect_garbage(grace_seconds=0)
+        assert not any(default_storage.exists(product.image.name) for product in batch)
+
+    def test_derived_data_updated_once(self, batch, test_manager_with_user):
+        """Тест что версия каталога меняется один раз, а счётчики избранного уменьшаются"""
+        user, _ = test_manager_with_user
+        customer = Customer.objects.create(email='bulk@example.com', favorite_count=2)
+        FavoriteProduct.objects.create(user=customer, product=batch[0])
+        FavoriteProduct.objects.create(user=customer, product=batch[1])
+        version = catalog_cache.get_catalog_version()
+
+        product_bulk.delete_products(user, [product.id for product in batch[:5]])
+        assert catalog_cache.get_catalog_version() == version + 1
+        customer.refresh_from_db()
+        assert customer.favorite_count == 0
+
+    def test_delete_view(self, client, batch, test_manager_with_user):
+        """Тест что представление удаляет выбранные товары и сообщает их число"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        response = client.post(reverse('delete_products'), {'product_ids': [batch[0].id, batch[1].id]}, follow=True)
+        assert 'Удалено товаров: 2' in [str(message) for message in response.context['messages']]
+        assert Product.objects.count() == 28
+
+    def test_delete_view_requires_manager(self, client, rf, batch):
+        """Тест что удалять товары может только менеджер"""
+        ids = {'product_ids': [batch[0].id, batch[1].id]}
+        assert client.post(reverse('delete_products'), ids).status_code == 302  # аноним - на вход
+
+        customer = User.objects.create_user(username='shopper', email='shopper@example.com', password='testpass123',
+                                            role=User.Role.CUSTOMER, first_name='Пётр', last_name='Петров')
+        client.force_login(customer)
+        assert client.post(reverse('delete_products'), ids).status_code in (302, 403)
+        # Представление проверяет роль само, не полагаясь только на middleware
+        request = rf.post(reverse('delete_products'), ids)
+        request.user = customer
+        assert product_views.delete_products(request).status_code == 302
+
+        assert Product.objects.count() == 30
+        assert not ActionLog.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBulkUpdates:
+    """Тесты для массового снятия с продажи, возврата и изменения цен"""
+
+    def test_deactivate_and_activate(self, batch, test_manager_with_user):
+        """Тест что статус меняется одним запросом, а в журнал пишутся старое и новое значение"""
+        user, _ = test_manager_with_user
+        selection = Product.objects.filter(id__in=[product.id for product in batch[:10]])
+        with CaptureQueriesContext(connection) as queries:
+            assert product_bulk.set_availability(user, selection, available=False) == 10
+        assert len([query for query in queries if query['sql'].startswith('UPDATE')]) == 1
+        assert Product.objects.filter(available=False).count() == 10
+
+        log = ActionLog.objects.filter(action_type='DEACTIVATE').first()
+        assert log.changed_fields == {'available': {'old': 'True', 'new': 'False'}}
+
+        # Повторно снимать уже снятые товары нечего
+        assert product_bulk.set_availability(user, selection, available=False) == 0
+        assert product_bulk.set_availability(user, Product.objects.all(), available=True) == 10
+        assert ActionLog.objects.filter(action_type='ACTIVATE').count() == 10
+
+    def test_percent_price_change(self, batch, test_manager_with_user):
+        """Тест изменения цены на процент с округлением до копеек и журналом по товару"""
+        user, _ = test_manager_with_user
+        Product.objects.filter(id=batch[0].id).update(price=Decimal('99.99'))
+        assert product_bulk.change_prices(user, Product.objects.all(), percent='12.5') == 30
+        assert Product.objects.get(id=batch[0].id).price == Decimal('112.49')
+        assert Product.objects.get(id=batch[1].id).price == Decimal('11.25')
+        log = ActionLog.objects.get(action_type='PRICE', product_id=batch[0].id)
+        assert log.changed_fields == {'price': {'old': '99.99', 'new': '112.49'}}
+
+    def test_set_price_and_validation(self, batch, test_manager_with_user):
+        """Тест установки цены: неизменившиеся товары не попадают в журнал, некорректные значения отклоняются"""
+        user, _ = test_manager_with_user
+        assert product_bulk.change_prices(user, Product.objects.all(), price='10') == 0
+        assert product_bulk.change_prices(user, Product.objects.filter(id=batch[0].id), price='15.50') == 1
+        assert Product.objects.get(id=batch[0].id).price == Decimal('15.50')
+        for kwargs in ({'percent': '-100'}, {'price': '0'}, {'price': 'abc'}, {}):
+            with pytest.raises(ValueError):
+                product_bulk.change_prices(user, Product.objects.all(), **kwargs)
+
+    def test_rejects_non_finite_and_out_of_range(self, batch, test_manager_with_user):
+        """Тест что NaN, бесконечность и значения, не помещающиеся в цену, отклоняются как ValueError"""
+        user, _ = test_manager_with_user
+        Product.objects.filter(id=batch[0].id).update(price=Decimal('50000000'))
+        for kwargs in ({'price': 'NaN'}, {'price': 'sNaN'}, {'price': 'Infinity'}, {'price': '-Infinity'},
+                       {'percent': 'NaN'}, {'percent': 'Infinity'}, {'price': '1e12'},
+                       {'price': '1e40'}, {'percent': '1e9'}, {'percent': '100'}):
+            with pytest.raises(ValueError):
+                product_bulk.change_prices(user, Product.objects.all(), **kwargs)
+
+        assert not Product.objects.exclude(price__in=[Decimal('10'), Decimal('50000000')]).exists()
+        assert not ActionLog.objects.filter(action_type='PRICE').exists()
+        assert product_bulk.change_prices(user, Product.objects.all(), price='99999999.99') == 30
+
+    def test_price_view_reports_invalid_number(self, client, batch, test_manager_with_user):
+        """Тест что некорректная цена показывается сообщением, а не ошибкой сервера"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        response = client.post(reverse('change_product_prices'),
+                               {'product_ids': [batch[0].id], 'price': 'NaN'}, follow=True)
+        assert response.status_code == 200
+        assert any('Цены не изменены' in str(message) for message in response.context['messages'])
+
+    def test_filtered_selection_view(self, client, batch, test_manager_with_user, test_store):
+        """Тест что операция применяется ко всем товарам по фильтру панели менеджера"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+        for product in batch[:3]:
+            Product.objects.filter(id=product.id).update(name=f'Special {product.id}')
+        response = client.post(reverse('deactivate_products'), {
+            'apply_to': 'filtered', 'store': str(test_store.id), 'q': 'special',
+        })
+        assert response.status_code == 302
+        assert Product.objects.filter(available=False).count() == 3
+
+    def test_views_require_manager(self, client, batch):
+        """Тест что массовые операции недоступны без входа менеджера"""
+        client.post(reverse('change_product_prices'), {'product_ids': [batch[0].id], 'price': '1'})
+        client.post(reverse('deactivate_products'), {'product_ids': [batch[0].id]})
+        product = Product.objects.get(id=batch[0].id)
+        assert product.price == Decimal('10') and product.available
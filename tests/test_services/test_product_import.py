@@ -0,0 +1,215 @@
+import io
+import pytest
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from store_app.models import Product, Store
+from store_app.services import catalog_cache
+from store_app.services.product_import import ProductImporter, import_products
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+@pytest.mark.django_db
+class TestProductImport:
+    """Тесты для импорта товаров из CSV"""
+
+    def test_import_creates_products(self, test_manager, test_store, test_category):
+        """Тест что строки CSV с разделителем-запятой создают товары со слагами"""
+        data = (
+            'name,category,store,price,available\n'
+            f'Phone One,Смартфоны,{test_store.id},100.50,1\n'
+            f'Phone Two,смартфоны,"Москва, ул. Тестовая, д. 1",200,нет\n'
+        )
+        report = import_products(csv_file(data), 'products.csv', test_manager)
+
+        assert report.rows == 2
+        assert report.saved == 2
+        assert report.error_count == 0
+        one = Product.objects.get(name='Phone One')
+        two = Product.objects.get(name='Phone Two')
+        assert one.price == Decimal('100.50') and one.available
+        assert one.slug == 'phone-one' and one.created_by == test_manager
+        assert two.store == test_store and not two.available
+
+    def test_semicolon_and_export_headers(self, test_manager, test_store, test_category):
+        """Тест что понимается разделитель «;», BOM и заголовки выгрузки из панели менеджера"""
+        data = (
+            '\ufeffID;Название;Категория;Город;Адрес филиала;Цена;Доступен;Обновлён\n'
+            '1;Phone Three;Смартфоны;Москва;ул. Тестовая, д. 1;1 299,90;True;2025-01-01\n'
+        )
+        report = import_products(csv_file(data), 'export.csv', test_manager)
+
+        assert report.error_count == 0
+        assert Product.objects.get(name='Phone Three').price == Decimal('1299.90')
+
+    def test_existing_product_updated(self, test_manager, test_store, test_category,
+                                      django_capture_on_commit_callbacks):
+        """Тест что совпадение (название, филиал) обновляет товар и сохраняет его слаг"""
+        product = Product.objects.create(
+            name='Phone Four', slug='phone-four-old', price=10, description='old',
+            store=test_store, category=test_category, created_by=test_manager,
+        )
+        version = catalog_cache.get_catalog_version()
+        data = f'name,category,store,price,description\nPhone Four,Смартфоны,{test_store.id},15,new\n'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            report = import_products(csv_file(data), 'products.csv', test_manager)
+
+        assert report.saved == 1
+        assert Product.objects.count() == 1
+        product.refresh_from_db()
+        assert product.price == Decimal('15.00')
+        assert product.description == 'new'
+        assert product.slug == 'phone-four-old'
+        assert catalog_cache.get_catalog_version() != version
+
+    def test_update_keeps_missing_columns(self, test_manager, test_store, test_category):
+        """Тест что файл без необязательных колонок меняет цену, но не стирает описание, ссылку и наличие"""
+        Product.objects.create(
+            name='Phone Five', price=10, description='Описание', external_url='https://example.com/five',
+            available=False, store=test_store, category=test_category, created_by=test_manager,
+        )
+        data = f'name,category,store,price\nPhone Five,Смартфоны,{test_store.id},20\nPhone Six,Смартфоны,{test_store.id},30\n'
+
+        report = import_products(csv_file(data), 'products.csv', test_manager)
+
+        assert report.saved == 2
+        five = Product.objects.get(name='Phone Five')
+        assert five.price == Decimal('20')
+        assert five.description == 'Описание'
+        assert five.external_url == 'https://example.com/five'
+        assert not five.available
+        assert Product.objects.get(name='Phone Six').available
+
+    def test_xlsx_import(self, test_manager, test_store, test_category):
+        """Тест импорта из книги XLSX"""
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Название', 'Категория', 'Филиал', 'Цена', 'В наличии'])
+        sheet.append(['Phone Seven', 'Смартфоны', test_store.id, 199.9, 'нет'])
+        sheet.append(['Phone Eight', 'Смартфоны', f'{test_store.city}, {test_store.address}', 250, None])
+        file = io.BytesIO()
+        workbook.save(file)
+        file.seek(0)
+
+        report = import_products(file, 'products.xlsx', test_manager)
+
+        assert report.error_count == 0 and report.saved == 2
+        seven = Product.objects.get(name='Phone Seven')
+        assert seven.price == Decimal('199.90') and not seven.available
+        assert Product.objects.get(name='Phone Eight').available
+
+    def test_corrupt_xlsx_reported(self, test_manager):
+        """Тест что повреждённый XLSX даёт ошибку в строке 1, а не исключение"""
+        report = import_products(io.BytesIO(b'not a zip file'), 'products.xlsx', test_manager)
+
+        assert report.rows == 0
+        assert report.errors[0][0] == 1
+        assert 'XLSX' in report.errors[0][1]
+
+    def test_row_errors_reported(self, test_manager, test_store, test_category):
+        """Тест что ошибочные строки попадают в отчёт с номером строки, остальные сохраняются"""
+        data = (
+            'name,category,store,price\n'
+            f'Good,Смартфоны,{test_store.id},10\n'
+            f'Bad price,Смартфоны,{test_store.id},abc\n'
+            f'Bad category,Ноутбуки,{test_store.id},10\n'
+            'Bad store,Смартфоны,999999,10\n'
+        )
+        report = import_products(csv_file(data), 'products.csv', test_manager)
+
+        assert report.rows == 4
+        assert report.saved == 1
+        assert [line for line, _ in report.errors] == [3, 4, 5]
+        assert 'price' in report.errors[0][1]
+        assert 'category' in report.errors[1][1]
+        assert 'store' in report.errors[2][1]
+        assert list(Product.objects.values_list('name', flat=True)) == ['Good']
+
+    def test_missing_columns(self, test_manager):
+        """Тест что файл без обязательных колонок ничего не импортирует"""
+        report = import_products(csv_file('title,cost\nX,1\n'), 'products.csv', test_manager)
+
+        assert report.saved == 0
+        assert report.errors[0][0] == 1
+        assert 'name' in report.errors[0][1]
+
+    def test_unique_slugs_across_batches(self, test_manager, test_store, test_category):
+        """Тест что одинаковые названия в разных филиалах и пачках получают разные слаги"""
+        Product.objects.create(
+            name='Same', slug='same', price=10,
+            store=test_store, category=test_category, created_by=test_manager,
+        )
+        stores = [Store.objects.create(city='Тверь', address=f'ул. {n}') for n in range(5)]
+        rows = [['name', 'category', 'store', 'price']]
+        rows += [['Same', 'Смартфоны', str(store.id), '10'] for store in stores]
+
+        report = ProductImporter(test_manager, batch_size=2).run(rows)
+
+        assert report.saved == 5
+        slugs = list(Product.objects.values_list('slug', flat=True))
+        assert len(slugs) == len(set(slugs)) == 6
+
+    def test_duplicate_rows_last_wins(self, test_manager, test_store, test_category):
+        """Тест что повтор товара в одном файле не ломает пачку, сохраняется последняя строка"""
+        data = (
+            'name,category,store,price\n'
+            f'Twice,Смартфоны,{test_store.id},10\n'
+            f'Twice,Смартфоны,{test_store.id},20\n'
+        )
+        report = import_products(csv_file(data), 'products.csv', test_manager)
+
+        assert report.error_count == 0
+        assert Product.objects.get(name='Twice').price == Decimal('20.00')
+
+
+@pytest.mark.django_db
+class TestProductImportEntryPoints:
+    """Тесты для страницы и команды импорта"""
+
+    def test_view_imports_file(self, client, test_manager_with_user, test_category):
+        """Тест что менеджер загружает файл и видит отчёт"""
+        user, manager = test_manager_with_user
+        client.force_login(user)
+        upload = SimpleUploadedFile(
+            'products.csv',
+            f'name,category,store,price\nWeb phone,Смартфоны,{manager.store_id},10\n'.encode(),
+        )
+
+        response = client.post(reverse('import_products'), {'file': upload})
+
+        assert response.status_code == 200
+        assert response.context['report'].saved == 1
+        assert Product.objects.filter(name='Web phone', created_by=manager).exists()
+
+    def test_view_rejects_other_formats(self, client, test_manager_with_user):
+        """Тест что файл неподдерживаемого формата отклоняется формой"""
+        user, _ = test_manager_with_user
+        client.force_login(user)
+
+        response = client.post(reverse('import_products'), {'file': SimpleUploadedFile('a.txt', b'x')})
+
+        assert response.context['report'] is None
+        assert response.context['form'].errors
+
+    def test_view_requires_manager(self, client):
+        """Тест что анонимный пользователь перенаправляется на вход"""
+        response = client.get(reverse('import_products'))
+        assert response.status_code == 302
+
+    def test_command(self, tmp_path, test_manager, test_store, test_category):
+        """Тест что команда импортирует файл с диска"""
+        path = tmp_path / 'products.csv'
+        path.write_text(f'name,category,store,price\nCli phone,Смартфоны,{test_store.id},10\n', encoding='utf-8')
+        out = io.StringIO()
+
+        call_command('import_products', str(path), manager=test_manager.id, stdout=out)
+
+        assert Product.objects.filter(name='Cli phone').exists()
+        assert 'сохранено: 1' in out.getvalue()
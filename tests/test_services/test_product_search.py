@@ -0,0 +1,102 @@
+import pytest
+from django.urls import reverse
+from store_app.models import Product
+from store_app.services.product_search import InvertedIndex, search_products, tokenize
+
+
+class TestInvertedIndex:
+    """Тесты для индекса товаров в памяти"""
+
+    def build_index(self):
+        index = InvertedIndex()
+        index.build([
+            (1, 'Смартфон Galaxy', 'Большой экран', 'Смартфоны'),
+            (2, 'Чехол для смартфона', 'Кожаный', 'Аксессуары'),
+            (3, 'Ноутбук', 'Подходит для работы со смартфоном', 'Ноутбуки'),
+        ])
+        return index
+
+    def test_tokenize(self):
+        """Тест что слова приводятся к нижнему регистру, а ё к е"""
+        assert tokenize('Чёрный iPhone-15!') == ['черный', 'iphone', '15']
+
+    def test_prefix_search_ranks_name_first(self):
+        """Тест что совпадение в названии весит больше, чем в описании"""
+        scores = self.build_index().search(['смартф'])
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        assert ranked[0] == 1
+        assert set(ranked) == {1, 2, 3}
+        assert scores[3] < scores[2]
+
+    def test_all_terms_required(self):
+        """Тест что товар должен содержать все слова запроса"""
+        assert set(self.build_index().search(['смартф', 'кожан'])) == {2}
+
+    def test_remove_and_update(self):
+        """Тест что удаление и обновление товара меняют выдачу"""
+        index = self.build_index()
+        index.remove(1)
+        assert 1 not in index.search(['galaxy'])
+
+        index.add(3, 'Ноутбук Galaxy Book', '', 'Ноутбуки')
+        assert set(index.search(['galaxy'])) == {3}
+        assert index.search(['работы']) == {}
+
+
+@pytest.mark.django_db
+class TestSearchProducts:
+    """Тесты для поиска товаров через модели"""
+
+    def test_search_by_description_and_category(self, test_product):
+        """Тест что товар находится по описанию и по названию категории"""
+        assert list(search_products(Product.objects.all(), 'описание')) == [test_product]
+        assert list(search_products(Product.objects.all(), 'смартфоны тест')) == [test_product]
+        assert not search_products(Product.objects.all(), 'ноутбук').exists()
+
+    def test_results_ordered_by_relevance(self, test_product, test_category, test_store, test_manager):
+        """Тест что совпадение в названии выше совпадения в описании"""
+        accessory = Product.objects.create(
+            category=test_category, name='Чехол', description='Тестовый чехол для смартфона',
+            price=999, store=test_store, created_by=test_manager,
+        )
+        leader = Product.objects.create(
+            category=test_category, name='Смартфон флагман', description='',
+            price=99999, store=test_store, created_by=test_manager,
+        )
+        results = list(search_products(Product.objects.all(), 'смартфон'))
+        assert results[0] in (leader, test_product)
+        assert results[-1] == accessory
+
+    def test_index_follows_saves(self, test_product):
+        """Тест что изменения товара и категории сразу попадают в поиск"""
+        assert search_products(Product.objects.all(), 'тестовый').exists()
+
+        test_product.name = 'Планшет'
+        test_product.description = ''
+        test_product.save()
+        assert list(search_products(Product.objects.all(), 'планшет')) == [test_product]
+        assert not search_products(Product.objects.all(), 'тестовый').exists()
+
+        category = test_product.category
+        category.name = 'Гаджеты'
+        category.save()
+        assert list(search_products(Product.objects.all(), 'гаджет')) == [test_product]
+
+        test_product.delete()
+        assert not search_products(Product.objects.all(), 'планшет').exists()
+
+    def test_empty_query(self, test_product):
+        """Тест что запрос без слов ничего не находит"""
+        assert not search_products(Product.objects.all(), '!!!').exists()
+
+    def test_buy_page_uses_search(self, client, test_category, test_store, test_manager):
+        """Тест что страница покупки фильтрует товары поиском"""
+        product = Product.objects.create(
+            category=test_category, name='iPhone 15 Pro', description='Флагманский смартфон',
+            price=99999, store=test_store, created_by=test_manager,
+        )
+        response = client.get(reverse('buy'), {'search': 'флагман'})
+        assert list(response.context['products']) == [product]
+
+        response = client.get(reverse('buy'), {'search': 'холодильник'})
+        assert list(response.context['products']) == []
@@ -0,0 +1,93 @@
+import pytest
+from django.core.management import call_command
+from django.test import RequestFactory
+from store_app.models import Category
+from store_app.services.search_suggestions import (
+    PrefixIndex, get_suggestion_index, suggest, suggestion_keys,
+)
+from store_app.views.dashboard_views import search_suggestions
+
+
+class TestPrefixIndex:
+    """Тесты для префиксного индекса названий"""
+
+    def test_keys_start_at_every_word(self):
+        """Тест что ключи начинаются с каждого слова названия"""
+        assert suggestion_keys('Apple  iPhone 15') == {'apple iphone 15', 'iphone 15', '15'}
+
+    def test_lookup_by_word_prefix(self):
+        """Тест что поиск находит название по началу любого слова"""
+        index = PrefixIndex()
+        index.build([(1, 'Apple iPhone 15'), (2, 'Чехол для iPhone'), (3, 'Samsung Galaxy')])
+        assert sorted(object_id for object_id, _ in index.lookup('iph', 10)) == [1, 2]
+        assert index.lookup('iphone 1', 10) == [(1, 'Apple iPhone 15')]
+        assert index.lookup('xiaomi', 10) == []
+
+    def test_add_remove_and_limit(self):
+        """Тест что добавление, переименование, удаление и лимит работают"""
+        index = PrefixIndex()
+        index.build([])
+        for object_id in range(5):
+            index.add(object_id, f'Ноутбук {object_id}')
+        assert len(index.lookup('ноут', 3)) == 3
+
+        index.add(0, 'Планшет')
+        assert index.lookup('план', 10) == [(0, 'Планшет')]
+        assert len(index.lookup('ноут', 10)) == 4
+
+        index.remove(0)
+        assert index.lookup('план', 10) == []
+        assert len(index) == 4
+
+
+@pytest.mark.django_db
+class TestSuggestionIndex:
+    """Тесты для подсказок поиска из памяти"""
+
+    def test_suggestions_without_queries(self, test_product, django_assert_num_queries):
+        """Тест что после построения подсказки не обращаются к БД"""
+        get_suggestion_index()
+        with django_assert_num_queries(0):
+            result = suggest('тестов')
+        assert result['products'] == [{'id': test_product.id, 'name': test_product.name}]
+
+    def test_signals_update_index(self, test_product, test_category):
+        """Тест что сохранение и удаление товаров и категорий обновляют индекс"""
+        get_suggestion_index()
+
+        test_product.available = False
+        test_product.save()
+        assert suggest('тестов')['products'] == []
+
+        test_product.available = True
+        test_product.name = 'Игровой ноутбук'
+        test_product.save()
+        assert suggest('ноут')['products'] == [{'id': test_product.id, 'name': 'Игровой ноутбук'}]
+
+        category = Category.objects.create(name='Ноутбуки', slug='noutbuki')
+        assert suggest('ноут')['categories'] == [{'id': category.id, 'name': 'Ноутбуки'}]
+
+        category.delete()
+        test_product.delete()
+        assert suggest('ноут') == {'products': [], 'categories': []}
+
+    def test_view_response(self, test_product):
+        """Тест что представление отдаёт подсказки и отсекает короткие запросы"""
+        request = RequestFactory().get('/search/suggestions/', {'q': 'смарт'})
+        response = search_suggestions(request)
+        assert response.status_code == 200
+        assert b'"categories"' in response.content
+        assert 'Смартфоны' in response.content.decode('unicode_escape')
+
+        request = RequestFactory().get('/search/suggestions/', {'q': 'с'})
+        assert search_suggestions(request).content == b'{"suggestions": []}'
+
+    def test_stats_and_rebuild_command(self, test_product, capsys):
+        """Тест что команда перестраивает индекс и сообщает его размер"""
+        call_command('rebuild_suggestions')
+        assert 'товаров 1, категорий 1' in capsys.readouterr().out
+
+        stats = get_suggestion_index().stats()
+        assert stats['built'] is True
+        assert stats['entries'] == 3
+        assert stats['memory_bytes'] > 0
@@ -0,0 +1,115 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from store_app.models import Category, Product
+from store_app.services import slugs
+
+
+def create_category(name, slug):
+    return Category.objects.create(name=name, slug=slug)
+
+
+@pytest.mark.django_db
+class TestSlugAllocation:
+    """Тесты для подбора уникальных слагов"""
+
+    def test_smallest_free_suffix(self):
+        """Тест что выбирается наименьший свободный вариант base, base-1, base-2..."""
+        create_category('Phones', 'phones')
+        create_category('Phones 1', 'phones-1')
+        create_category('Phones 3', 'phones-3')
+
+        assert slugs.allocate_slug(Category, 'Phones') == 'phones-2'
+        assert slugs.allocate_slug(Category, 'Tablets') == 'tablets'
+
+    def test_similar_slugs_not_counted(self):
+        """Тест что слаги с другим продолжением не считаются занятыми вариантами"""
+        create_category('iPhone 13 Pro', 'iphone-13-pro')
+        create_category('iPhone 13 mini', 'iphone-13-mini')
+        create_category('iPhone 130', 'iphone-130')
+
+        assert slugs.allocate_slug(Category, 'iPhone 13') == 'iphone-13'
+
+    def test_single_query_for_any_collisions(self):
+        """Тест что подбор делает один запрос независимо от числа занятых суффиксов"""
+        create_category('Phones', 'phones')
+        Category.objects.bulk_create([Category(name=f'Phones {n}', slug=f'phones-{n}') for n in range(1, 40)])
+
+        with CaptureQueriesContext(connection) as queries:
+            slug = slugs.allocate_slug(Category, 'Phones')
+
+        assert slug == 'phones-40'
+        assert len(queries) == 1
+
+    def test_bulk_allocation(self):
+        """Тест что пачка получает разные слаги одним запросом, в том числе для одинаковых названий"""
+        create_category('Phones', 'phones')
+        bases = ['phones', 'phones', 'laptops', 'phones-1', 'laptops']
+
+        with CaptureQueriesContext(connection) as queries:
+            allocated = slugs.allocate_slugs(Category, bases)
+
+        assert allocated == ['phones-1', 'phones-2', 'laptops', 'phones-1-1', 'laptops-1']
+        assert len(queries) == 1
+
+
+@pytest.mark.django_db
+class TestModelSlugs:
+    """Тесты для слагов при сохранении моделей"""
+
+    def test_category_save_allocates_suffix(self):
+        """Тест что категория с занятым слагом получает суффикс"""
+        create_category('Audio', 'audio')
+        category = Category.objects.create(name='Audio')
+        assert category.slug == 'audio-1'
+
+    def test_product_save_queries_constant(self, test_store, test_category, test_manager):
+        """Тест что число запросов при сохранении товара не растёт с числом совпадений"""
+        def save_product():
+            product = Product(name='iPhone 13', price=10, store=test_store, category=test_category,
+                              created_by=test_manager)
+            with CaptureQueriesContext(connection) as queries:
+                product.save()
+            return product, len(queries)
+
+        Product.objects.create(name='iPhone 13 old', slug='iphone-13', price=10, store=test_store,
+                               category=test_category, created_by=test_manager)
+        first, first_count = save_product()
+        Product.objects.bulk_create([
+            Product(name=f'iPhone 13 n{n}', slug=f'iphone-13-{n}', price=10, store=test_store,
+                    category=test_category, created_by=test_manager)
+            for n in range(2, 30)
+        ])
+        first.name = 'iPhone 13 moved'
+        first.save()
+        second, second_count = save_product()
+
+        assert first.slug == 'iphone-13-1'
+        assert second.slug == 'iphone-13-30'
+        assert second_count == first_count
+
+    def test_retry_on_race(self, monkeypatch):
+        """Тест что если слаг заняли между подбором и сохранением, подбор повторяется"""
+        create_category('Audio', 'audio')
+        allocate = slugs.allocate_slugs
+        calls = []
+
+        def stale_allocate(model, bases):
+            calls.append(bases)
+            # Первый подбор "не видит" параллельно сохранённую категорию
+            return ['audio'] if len(calls) == 1 else allocate(model, bases)
+
+        monkeypatch.setattr(slugs, 'allocate_slugs', stale_allocate)
+        category = Category.objects.create(name='Audio')
+
+        assert category.slug == 'audio-1'
+        assert len(calls) == 2
+
+    def test_other_integrity_errors_raised(self, test_product):
+        """Тест что ошибка уникальности не по слагу не повторяется и пробрасывается"""
+        duplicate = Product(name=test_product.name, price=10, store=test_product.store,
+                            category=test_product.category, created_by=test_product.created_by)
+
+        with pytest.raises(IntegrityError):
+            duplicate.save()
+        assert duplicate.slug == ''
@@ -0,0 +1,50 @@
+import pytest
+from django.test import RequestFactory
+from django.contrib.sessions.backends.db import SessionStore
+from store_app.models import PageView, StaffIP
+from store_app.services.staff_ips import get_staff_ips, register_staff_ip
+from store_project.middleware.analytics_middleware import AnalyticsMiddleware
+
+
+@pytest.mark.django_db
+class TestStaffIPRegistry:
+    """Тесты для реестра IP менеджеров"""
+
+    def test_register_new_ip(self):
+        """Тест что новый IP сохраняется и сразу виден в кэше"""
+        assert register_staff_ip('10.1.1.1') is True
+        assert '10.1.1.1' in get_staff_ips()
+        assert StaffIP.objects.filter(ip_address='10.1.1.1').exists()
+
+    def test_known_ip_is_not_written_again(self, django_assert_num_queries):
+        """Тест что известный IP не вызывает запросов к БД"""
+        register_staff_ip('10.1.1.1')
+        with django_assert_num_queries(0):
+            assert register_staff_ip('10.1.1.1') is False
+
+    def test_cached_set_has_no_queries(self, django_assert_num_queries):
+        """Тест что повторные обращения к реестру берутся из памяти"""
+        get_staff_ips()
+        with django_assert_num_queries(0):
+            for _ in range(100):
+                PageView.get_manager_ips()
+
+    def test_cache_expires_after_ttl(self, settings):
+        """Тест что по истечении TTL реестр перечитывается из БД"""
+        get_staff_ips()
+        StaffIP.objects.create(ip_address='10.2.2.2')
+        assert '10.2.2.2' not in get_staff_ips()
+
+        settings.ANALYTICS_STAFF_IPS_TTL = 0
+        assert '10.2.2.2' in get_staff_ips()
+
+    def test_middleware_registers_manager_ip(self, test_manager_with_user):
+        """Тест что middleware добавляет IP менеджера в реестр"""
+        user, manager = test_manager_with_user
+        request = RequestFactory().get('/manager/dashboard/', REMOTE_ADDR='10.3.3.3')
+        request.user = user
+        request.session = SessionStore()
+
+        AnalyticsMiddleware(lambda r: None)(request)
+
+        assert '10.3.3.3' in PageView.get_manager_ips()
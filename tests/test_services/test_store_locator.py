@@ -0,0 +1,106 @@
+import json
+import pytest
+from datetime import datetime, time
+from django.test import RequestFactory
+from store_app.models import Category, Product, Store, WorkingHours
+from store_app.services.store_locator import KDTree, get_store_locator, haversine_km, to_unit_vector
+from store_app.views.stores import nearest_stores
+
+MONDAY_NOON = datetime(2024, 1, 1, 12, 0)
+MOSCOW = (55.7558, 37.6173)
+
+
+@pytest.fixture
+def located_stores(test_store):
+    """Филиалы в Москве, Твери, Казани и Новосибирске; тверской филиал открыт только до 11:00"""
+    test_store.latitude, test_store.longitude = 55.76, 37.62
+    test_store.save()
+    tver = Store.objects.create(city='Тверь', address='ул. Советская, д. 1', latitude=56.86, longitude=35.90)
+    kazan = Store.objects.create(city='Казань', address='ул. Баумана, д. 1', latitude=55.79, longitude=49.12)
+    novosibirsk = Store.objects.create(city='Новосибирск', address='Красный пр., д. 1', latitude=55.03, longitude=82.92)
+    Store.objects.create(city='Сочи', address='ул. Морская, д. 1', latitude=43.60, longitude=39.73, is_active=False)
+    Store.objects.create(city='Омск', address='ул. Ленина, д. 1')
+    for store in (test_store, kazan, novosibirsk):
+        WorkingHours.objects.create(store=store, day_of_week=0, opening_time=time(9), closing_time=time(21))
+    WorkingHours.objects.create(store=tver, day_of_week=0, opening_time=time(9), closing_time=time(11))
+    return test_store, tver, kazan, novosibirsk
+
+
+class TestKDTree:
+    """Тесты для k-d дерева"""
+
+    def test_nearest_matches_brute_force(self):
+        """Тест что поиск по дереву совпадает с полным перебором"""
+        points = [(to_unit_vector(lat, lon), (lat, lon))
+                  for lat in range(-80, 81, 7) for lon in range(-180, 180, 11)]
+        tree = KDTree(points)
+        for target in ((55.75, 37.61), (0.0, 179.9), (-33.9, 151.2)):
+            vector = to_unit_vector(*target)
+            expected = sorted(points, key=lambda point: sum((a - b) ** 2 for a, b in zip(vector, point[0])))[:5]
+            assert [value for _, value in tree.nearest(vector, 5)] == [value for _, value in expected]
+
+    def test_haversine_distance(self):
+        """Тест что расстояние Москва - Казань считается по дуге большого круга"""
+        assert haversine_km(*MOSCOW, 55.7961, 49.1064) == pytest.approx(719, abs=2)
+
+
+@pytest.mark.django_db
+class TestStoreLocator:
+    """Тесты для поиска ближайших филиалов"""
+
+    def test_nearest_open_stores(self, located_stores, django_assert_num_queries):
+        """Тест что возвращаются ближайшие открытые филиалы по возрастанию расстояния без запросов к БД"""
+        moscow, tver, kazan, _ = located_stores
+        locator = get_store_locator()
+        with django_assert_num_queries(0):
+            found = locator.nearest(*MOSCOW, k=2, now=MONDAY_NOON)
+        assert [store.id for store, _, _ in found] == [moscow.id, kazan.id]
+        assert found[0][1] < 1
+        assert all(is_open for _, _, is_open in found)
+
+        with_closed = locator.nearest(*MOSCOW, k=2, only_open=False, now=MONDAY_NOON)
+        assert [(store.id, is_open) for store, _, is_open in with_closed] == [(moscow.id, True), (tver.id, False)]
+
+    def test_within_radius(self, located_stores):
+        """Тест что в радиус попадают только активные филиалы с координатами"""
+        moscow, tver, kazan, _ = located_stores
+        locator = get_store_locator()
+        assert sorted(locator.within_radius(*MOSCOW, 200)) == sorted([moscow.id, tver.id])
+        assert sorted(locator.within_radius(*MOSCOW, 1000)) == sorted([moscow.id, tver.id, kazan.id])
+
+    def test_rebuilt_after_store_change(self, located_stores, django_capture_on_commit_callbacks):
+        """Тест что индекс перестраивается после фиксации изменения филиала"""
+        _, tver, _, _ = located_stores
+        first = get_store_locator()
+        assert get_store_locator() is first
+
+        tver.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            tver.save()
+        assert tver.id not in get_store_locator().within_radius(*MOSCOW, 200)
+
+    def test_nearest_stores_api(self, located_stores):
+        """Тест что API возвращает филиалы с расстоянием и проверяет координаты"""
+        factory = RequestFactory()
+        response = nearest_stores(factory.get('/stores/nearest/', {'lat': MOSCOW[0], 'lon': MOSCOW[1], 'k': 3, 'open': '0'}))
+        assert response.status_code == 200
+        stores = json.loads(response.content)['stores']
+        assert [store['city'] for store in stores] == ['Москва', 'Тверь', 'Казань']
+        assert stores[1]['distance_km'] == pytest.approx(haversine_km(*MOSCOW, 56.86, 35.90), abs=0.01)
+
+        assert nearest_stores(factory.get('/stores/nearest/', {'lat': 'x', 'lon': 1})).status_code == 400
+        assert nearest_stores(factory.get('/stores/nearest/', {'lat': 95, 'lon': 1})).status_code == 400
+
+    def test_buy_page_radius_filter(self, client, located_stores, test_manager):
+        """Тест что на странице покупки можно оставить только товары филиалов в радиусе"""
+        moscow, _, kazan, _ = located_stores
+        category = Category.objects.create(name='Phones')
+        for store, name in ((moscow, 'Moscow phone'), (kazan, 'Kazan phone')):
+            Product.objects.create(
+                name=name, category=category, store=store, price=100, created_by=test_manager, available=True,
+            )
+
+        response = client.get('/buy/', {'lat': MOSCOW[0], 'lon': MOSCOW[1], 'radius': 50})
+        names = [product.name for product in response.context['products']]
+        assert names == ['Moscow phone']
+        assert response.context['facets']['total'] == 1
@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime, time
+from django.test import RequestFactory
+from store_app.models import Store, WorkingHours
+from store_app.services.store_schedule import build_intervals, is_open_at
+from store_app.views.contacts import branches_view
+
+# 2024-01-01 - понедельник
+MONDAY_NOON = datetime(2024, 1, 1, 12, 0)
+MONDAY_NIGHT = datetime(2024, 1, 1, 22, 0)
+SUNDAY_NOON = datetime(2024, 1, 7, 12, 0)
+
+
+@pytest.fixture
+def weekday_store(test_store):
+    """Филиал, работающий в будни с 10 до 20, в выходные закрыт"""
+    for day in range(7):
+        WorkingHours.objects.create(
+            store=test_store, day_of_week=day, is_closed=day >= 5,
+            opening_time=time(10) if day < 5 else None,
+            closing_time=time(20) if day < 5 else None,
+        )
+    test_store.refresh_from_db()
+    return test_store
+
+
+class TestScheduleIntervals:
+    """Тесты для интервального представления расписания"""
+
+    def test_build_intervals_skips_closed_days(self):
+        """Тест что выходные и неполные записи не дают интервалов"""
+        hours = [
+            WorkingHours(day_of_week=1, opening_time=time(9), closing_time=time(18)),
+            WorkingHours(day_of_week=0, opening_time=time(10, 30), closing_time=time(19)),
+            WorkingHours(day_of_week=6, is_closed=True),
+            WorkingHours(day_of_week=5, opening_time=time(10)),
+        ]
+        assert build_intervals(hours) == [[37800, 68400], [86400 + 32400, 86400 + 64800]]
+
+    def test_is_open_at_boundaries(self):
+        """Тест что границы интервала включаются"""
+        intervals = [[36000, 72000]]
+        assert is_open_at(intervals, datetime(2024, 1, 1, 10, 0))
+        assert is_open_at(intervals, datetime(2024, 1, 1, 20, 0))
+        assert not is_open_at(intervals, datetime(2024, 1, 1, 9, 59, 59))
+        assert not is_open_at(intervals, datetime(2024, 1, 2, 12, 0))
+        assert not is_open_at([], MONDAY_NOON)
+
+
+@pytest.mark.django_db
+class TestStoreOpenNow:
+    """Тесты для статуса "открыт сейчас" филиала"""
+
+    def test_intervals_rebuilt_on_save(self, weekday_store):
+        """Тест что сохранение расписания пересобирает интервалы филиала"""
+        assert len(weekday_store.schedule_intervals) == 5
+        assert weekday_store.is_open_now(MONDAY_NOON)
+        assert not weekday_store.is_open_now(MONDAY_NIGHT)
+        assert not weekday_store.is_open_now(SUNDAY_NOON)
+
+        sunday = WorkingHours.objects.get(store=weekday_store, day_of_week=6)
+        sunday.is_closed = False
+        sunday.opening_time = time(11)
+        sunday.closing_time = time(16)
+        sunday.save()
+        weekday_store.refresh_from_db()
+        assert weekday_store.is_open_now(SUNDAY_NOON)
+
+        WorkingHours.objects.filter(store=weekday_store, day_of_week=0).delete()
+        weekday_store.refresh_from_db()
+        assert not weekday_store.is_open_now(MONDAY_NOON)
+
+    def test_is_open_now_without_queries(self, weekday_store, django_assert_num_queries):
+        """Тест что статус считается без запросов к БД"""
+        with django_assert_num_queries(0):
+            weekday_store.is_open_now()
+
+    def test_branches_view_queries_do_not_grow(self, weekday_store, django_assert_max_num_queries):
+        """Тест что число запросов страницы филиалов не зависит от числа филиалов"""
+        for index in range(5):
+            store = Store.objects.create(city='Казань', address=f'ул. Баумана, д. {index + 1}')
+            WorkingHours.objects.create(store=store, day_of_week=0, opening_time=time(9), closing_time=time(18))
+
+        with django_assert_max_num_queries(3):
+            response = branches_view(RequestFactory().get('/branches/'))
+        assert response.status_code == 200
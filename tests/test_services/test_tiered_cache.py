@@ -0,0 +1,190 @@
+import threading
+import time
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from store_app.forms.create_product_form import CreateProductForm
+from store_app.models import Category, Store
+from store_app.services import reference_data
+from store_app.services.tiered_cache import LocalLRU, TieredCache, get_tiered_cache
+
+
+@pytest.fixture
+def tiered():
+    cache.clear()
+    return TieredCache(local_ttl=60, lock_wait=2)
+
+
+class TestLocalLRU:
+    """Тесты для LRU в памяти процесса"""
+
+    def test_evicts_least_recently_used(self):
+        """Тест что при переполнении вытесняется давно не читавшийся ключ"""
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, ttl=60)
+        lru.set('b', 2, ttl=60)
+        lru.get('a')
+        lru.set('c', 3, ttl=60)
+
+        assert lru.get('a') == 1
+        assert lru.get('c') == 3
+        assert len(lru) == 2
+
+    def test_expires(self):
+        """Тест что запись со истёкшим сроком не возвращается"""
+        lru = LocalLRU()
+        lru.set('a', 1, ttl=10, now=100)
+
+        assert lru.get('a', now=105) == 1
+        assert lru.get('a', now=111) is lru.get('missing')
+        assert len(lru) == 0
+
+
+class TestTieredCache:
+    """Тесты для двухуровневого кэша"""
+
+    def test_local_then_shared(self, tiered):
+        """Тест что второе чтение идёт из памяти, а другой процесс берёт значение из общего кэша"""
+        calls = []
+        assert tiered.get_or_set('key', lambda: calls.append(1) or 'value') == 'value'
+        assert tiered.get_or_set('key', lambda: calls.append(1) or 'other') == 'value'
+        other_process = TieredCache(local_ttl=60)
+        assert other_process.get_or_set('key', lambda: calls.append(1) or 'other') == 'value'
+
+        assert calls == [1]
+        assert tiered.stats()['local_hits'] == 1
+        assert other_process.stats()['shared_hits'] == 1
+
+    def test_none_is_cached(self, tiered):
+        """Тест что None тоже кэшируется и не вычисляется повторно"""
+        calls = []
+        tiered.get_or_set('none', lambda: calls.append(1))
+        tiered.clear_local()
+        tiered.get_or_set('none', lambda: calls.append(1))
+        assert calls == [1]
+
+    def test_single_flight_threads(self, tiered):
+        """Тест что одновременные промахи по одному ключу вычисляются одним потоком"""
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        threads = [threading.Thread(target=lambda: results.append(tiered.get_or_set('hot', compute)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ['value'] * 8
+
+    def test_waits_for_other_process(self, tiered):
+        """Тест что при чужой блокировке значение ждут из общего кэша, а не вычисляют"""
+        cache.add('slow:lock', 'other-process', 10)
+        timer = threading.Timer(0.2, lambda: cache.set('slow', 'from other process'))
+        timer.start()
+
+        value = tiered.get_or_set('slow', lambda: 'computed here')
+        timer.join()
+
+        assert value == 'from other process'
+        assert cache.get('slow:lock') == 'other-process'
+
+    def test_lock_released_on_error(self, tiered):
+        """Тест что ошибка вычисления снимает блокировку"""
+        def fail():
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            tiered.get_or_set('broken', fail)
+        assert cache.get('broken:lock') is None
+        assert tiered.get_or_set('broken', lambda: 'ok') == 'ok'
+
+    def test_versioned_keys(self, tiered):
+        """Тест что смена версии пространства имён делает старые значения недостижимыми"""
+        assert tiered.get_or_set_versioned('ns', 'key', lambda: 'old') == 'old'
+        tiered.bump_version('ns')
+        assert tiered.get_or_set_versioned('ns', 'key', lambda: 'new') == 'new'
+
+
+@pytest.mark.django_db
+class TestReferenceData:
+    """Тесты для справочников каталога в кэше"""
+
+    def test_cached_without_queries(self, test_category, test_store, django_assert_num_queries):
+        """Тест что повторное чтение справочников не обращается к БД"""
+        reference_data.categories()
+        reference_data.stores()
+
+        with django_assert_num_queries(0):
+            assert reference_data.categories() == [{'id': test_category.id, 'name': 'Смартфоны', 'slug': 'smartfony'}]
+            assert reference_data.cities() == ['Москва']
+            assert reference_data.store_choices() == [(test_store.id, str(test_store))]
+
+    def test_invalidated_by_signals(self, test_category, test_store, django_capture_on_commit_callbacks):
+        """Тест что сохранение и удаление категорий и филиалов сбрасывают справочники"""
+        reference_data.categories()
+        reference_data.stores()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Category.objects.create(name='Audio', slug='audio')
+            Store.objects.create(city='Тверь', address='ул. Новая, 1')
+        assert [category['name'] for category in reference_data.categories()] == ['Audio', 'Смартфоны']
+        assert reference_data.cities() == ['Москва', 'Тверь']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            test_category.delete()
+        assert [category['name'] for category in reference_data.categories()] == ['Audio']
+
+    def test_invalidated_after_commit(self, test_category, django_capture_on_commit_callbacks):
+        """Тест что версия справочников меняется только после фиксации транзакции"""
+        reference_data.categories()
+        version = get_tiered_cache().version(reference_data.NAMESPACE)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                Category.objects.create(name='Audio', slug='audio')
+                # Чтение до COMMIT не должно закэшировать старый список под новой версией
+                assert get_tiered_cache().version(reference_data.NAMESPACE) == version
+                assert [category['name'] for category in reference_data.categories()] == ['Смартфоны']
+
+        assert get_tiered_cache().version(reference_data.NAMESPACE) == version
+        for callback in callbacks:
+            callback()
+        assert get_tiered_cache().version(reference_data.NAMESPACE) != version
+        assert [category['name'] for category in reference_data.categories()] == ['Audio', 'Смартфоны']
+
+    def test_form_choices_without_queries(self, test_category, test_store, django_assert_num_queries):
+        """Тест что форма товара выводит списки категорий и филиалов без запросов"""
+        reference_data.categories()
+        reference_data.stores()
+
+        with django_assert_num_queries(0):
+            form = CreateProductForm()
+            choices = list(form.fields['category'].choices)
+            html = str(form['store'])
+
+        assert choices == [('', 'Выберите категорию'), (test_category.id, 'Смартфоны')]
+        assert str(test_store) in html
+
+    def test_form_still_validates_choice(self, test_category, test_store):
+        """Тест что выбор несуществующей категории отклоняется"""
+        form = CreateProductForm(data={
+            'category': 999999, 'name': 'Phone', 'price': '10', 'store': test_store.id, 'available': True,
+        })
+        assert not form.is_valid()
+        assert 'category' in form.errors
+
+    def test_stores_by_city(self, client, test_store):
+        """Тест что AJAX-список филиалов города строится из справочника"""
+        Store.objects.create(city='Тверь', address='ул. Новая, 1')
+
+        response = client.get(reverse('get_stores_by_city'), {'city': 'Москва'})
+
+        assert response.json() == {'stores': [{'id': test_store.id, 'address': test_store.address}]}
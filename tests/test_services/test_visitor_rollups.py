@@ -0,0 +1,72 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from store_app.models import PageView, PageViewDailyRollup
+from store_app.services.staff_ips import register_staff_ip
+from store_app.services.visitor_rollups import refresh_day
+
+
+def create_view(session_key, url='/buy/', ip='10.0.0.1', user=None, timestamp=None):
+    return PageView.objects.create(
+        session_key=session_key,
+        url=url,
+        ip_address=ip,
+        user=user,
+        timestamp=timestamp or timezone.now(),
+    )
+
+
+@pytest.mark.django_db
+class TestVisitorRollups:
+    """Тесты для суточных агрегатов посещений"""
+
+    def test_refresh_day_counts_unique_sessions(self):
+        """Тест подсчёта просмотров и уникальных сессий за день"""
+        create_view('a', url='/buy/')
+        create_view('a', url='/stores/')
+        create_view('b', url='/buy/')
+
+        refresh_day(timezone.now().date())
+
+        assert PageView.get_today_unique_visitors() == 2
+        site = PageViewDailyRollup.objects.get(url='', visitor_class='CLIENT')
+        assert site.views == 3
+        buy = PageViewDailyRollup.objects.get(url='/buy/', visitor_class='CLIENT')
+        assert buy.unique_visitors == 2
+
+    def test_manager_ips_are_excluded_from_clients(self, test_admin_user):
+        """Тест что посещения с IP менеджеров не считаются клиентскими"""
+        register_staff_ip('10.0.0.9')
+        create_view('admin', ip='10.0.0.9', user=test_admin_user)
+        create_view('anon-from-office', ip='10.0.0.9')
+        create_view('client', ip='10.0.0.1')
+
+        refresh_day(timezone.now().date())
+
+        assert PageView.get_today_unique_visitors() == 1
+        totals = PageView.get_visits_totals()
+        assert totals == {'total_visits': 3, 'manager_visits': 2, 'client_visits': 1}
+
+    def test_refresh_day_replaces_previous_rollup(self):
+        """Тест что повторный пересчёт не удваивает данные"""
+        create_view('a')
+        day = timezone.now().date()
+        refresh_day(day)
+        create_view('b')
+        refresh_day(day)
+
+        assert PageView.get_today_unique_visitors() == 2
+        assert PageViewDailyRollup.objects.filter(date=day, url='').count() == 1
+
+    def test_stats_ordered_by_date(self):
+        """Тест статистики по дням из агрегатов"""
+        yesterday = timezone.now() - timedelta(days=1)
+        create_view('old', timestamp=yesterday)
+        create_view('new')
+
+        call_command('rollup_pageviews', days=1)
+
+        stats = PageView.get_unique_visitors_stats(days=30)
+        assert [row['date'] for row in stats] == [yesterday.date(), timezone.now().date()]
+        assert [row['unique_visitors'] for row in stats] == [1, 1]
@@ -1,5 +1,7 @@
 import pytest
-from store_app.auth_backends import RoleBasedAuthBackend
+from django.core.cache import cache
+from django.db import transaction
+from store_app.auth_backends import RoleBasedAuthBackend, _unknown_key
 from store_app.models import User
 
 
@@ -113,3 +115,86 @@ class TestRoleBasedAuthBackend:
             password='testpass123'
         )
         assert user is None
+
+
+@pytest.fixture
+def customer_user(db):
+    return User.objects.create_user(
+        username='shopper',
+        email='shopper@example.com',
+        password='testpass123',
+        role=User.Role.CUSTOMER,
+        first_name='Пётр',
+        last_name='Петров',
+    )
+
+
+@pytest.mark.django_db
+class TestRoleBasedAuthBackendQueries:
+    """Тесты для числа запросов и кэша неизвестных логинов RoleBasedAuthBackend"""
+
+    def test_customer_by_email_single_query(self, customer_user, django_assert_num_queries):
+        """Тест что покупатель по email находится одним запросом"""
+        backend = RoleBasedAuthBackend()
+        with django_assert_num_queries(1):
+            assert backend.authenticate(None, username='shopper@example.com', password='testpass123') == customer_user
+
+    def test_customer_by_username_fails(self, customer_user):
+        """Тест что покупатель не входит по username"""
+        backend = RoleBasedAuthBackend()
+        assert backend.authenticate(None, username='shopper', password='testpass123') is None
+
+    def test_unknown_identifier_cached(self, django_assert_num_queries):
+        """Тест что повторный вход с неизвестным логином не обращается к БД"""
+        backend = RoleBasedAuthBackend()
+        with django_assert_num_queries(1):
+            assert backend.authenticate(None, username='ghost@example.com', password='testpass123') is None
+        with django_assert_num_queries(0):
+            assert backend.authenticate(None, username='ghost@example.com', password='testpass123') is None
+
+    def test_cache_disabled(self, settings, django_assert_num_queries):
+        """Тест что при нулевом TTL неизвестные логины не запоминаются"""
+        settings.AUTH_UNKNOWN_IDENTIFIER_TTL = 0
+        backend = RoleBasedAuthBackend()
+        backend.authenticate(None, username='ghost', password='testpass123')
+        with django_assert_num_queries(1):
+            backend.authenticate(None, username='ghost', password='testpass123')
+
+    def test_registration_clears_unknown(self, django_capture_on_commit_callbacks):
+        """Тест что только что зарегистрированный покупатель сразу может войти"""
+        backend = RoleBasedAuthBackend()
+        assert backend.authenticate(None, username='new@example.com', password='testpass123') is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user = User.objects.create_user(username='new_customer', email='new@example.com', password='testpass123',
+                                            role=User.Role.CUSTOMER, first_name='Анна', last_name='Иванова')
+
+        assert backend.authenticate(None, username='new@example.com', password='testpass123') == user
+
+    def test_unknown_cleared_after_commit(self, django_capture_on_commit_callbacks):
+        """Тест что отметка «не найден», поставленная до фиксации регистрации, снимается после неё"""
+        backend = RoleBasedAuthBackend()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                user = User.objects.create_user(username='new_customer', email='new@example.com',
+                                                password='testpass123', role=User.Role.CUSTOMER,
+                                                first_name='Анна', last_name='Иванова')
+                # Вход из другого запроса до COMMIT: пользователя ещё не видно
+                cache.set(_unknown_key('new@example.com'), True)
+
+        assert backend.authenticate(None, username='new@example.com', password='testpass123') is None
+        for callback in callbacks:
+            callback()
+        assert backend.authenticate(None, username='new@example.com', password='testpass123') == user
+
+    def test_password_not_logged(self, test_manager_with_user, caplog, capsys):
+        """Тест что пароль не попадает ни в лог, ни в stdout"""
+        backend = RoleBasedAuthBackend()
+        with caplog.at_level('DEBUG', logger='store_app.auth_backends'):
+            backend.authenticate(None, username='test_manager', password='secret-value')
+            backend.authenticate(None, username='test_manager', password='testpass123')
+
+        assert [record.outcome for record in caplog.records] == ['wrong_password', 'success']
+        assert 'secret-value' not in caplog.text
+        assert capsys.readouterr().out == ''